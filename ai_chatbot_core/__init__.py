@@ -3,17 +3,47 @@ This module provides core functionality for the AI chatbot application.
 
 It includes classes for managing chats and interacting with the AI model.
 
+The public classes and the submodules are loaded on first access, so
+importing the package is cheap, and aiohttp is only imported once the
+first request is sent.
+
 Authors: sioxty
 Copyright: Copyright 2025 sioxty
 License: MIT
 """
 
-import types
-
-from .chat import Chat
-from .chat_maneger import ChatManager
+import importlib
 
 __author__ = "sioxty"
 __version__ = "0.2.1"
 __license__ = "MIT"
 __email__ = "maksymslushayev@gmail.com"
+
+# Public names and the submodules defining them, loaded by __getattr__.
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "Chat": ".chat",
+    "ChatManager": ".chat_maneger",
+    "Transport": ".transport",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif not name.startswith("__"):
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as error:
+            if error.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
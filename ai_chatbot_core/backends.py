@@ -0,0 +1,172 @@
+import time
+from typing import Callable
+
+from .config import api_url
+
+LEAST_IN_FLIGHT = "least_in_flight"
+WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+
+
+class Backend:
+    """
+    An OpenAI-compatible chat completions endpoint with its API key.
+
+    Attributes:
+        url (str): The chat completions URL.
+        api_key (str): The API key for the endpoint.
+        weight (int): Relative share of requests.
+        in_flight (int): Requests currently being sent to the backend.
+        requests (int): Total requests sent to the backend.
+        failures (int): Consecutive failed requests.
+        errors (int): Total failed requests.
+        unavailable_until (float): Clock time until which the backend is
+            skipped, e.g. after its quota was exhausted.
+        current_weight (int): Weighted round-robin state of the backend.
+    """
+
+    def __init__(self, api_key: str, url: str = api_url, weight: int = 1):
+        """
+        Initializes a backend.
+
+        Args:
+            api_key (str): The API key for the endpoint.
+            url (str, optional): The chat completions URL.
+                Defaults to config.api_url.
+            weight (int, optional): Relative share of requests.
+                Defaults to 1.
+        """
+        self.api_key: str = str(api_key)
+        self.url: str = str(url)
+        self.weight: int = max(int(weight), 1)
+        self.in_flight: int = 0
+        self.requests: int = 0
+        self.failures: int = 0
+        self.errors: int = 0
+        self.unavailable_until: float = 0.0
+        self.current_weight: int = 0
+
+
+class BackendPool:
+    """
+    Distributes requests over several backends.
+
+    Backends are picked by fewest requests in flight relative to their
+    weight, or by smooth weighted round-robin. A backend that exhausts its
+    quota (429), rejects its key (401/403) or fails max_failures times in
+    a row is skipped for a cooldown, so traffic fails over to the others.
+    If every backend is cooling down, the one available soonest is used.
+    """
+
+    def __init__(
+        self,
+        backends: list[Backend],
+        strategy: str = LEAST_IN_FLIGHT,
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the pool.
+
+        Args:
+            backends (list[Backend]): The backends to use.
+            strategy (str, optional): LEAST_IN_FLIGHT or
+                WEIGHTED_ROUND_ROBIN. Defaults to LEAST_IN_FLIGHT.
+            max_failures (int, optional): Consecutive failures after which a
+                backend cools down. Defaults to 3.
+            cooldown (float, optional): Seconds an unhealthy backend is
+                skipped, unless the server gives a Retry-After.
+                Defaults to 30.0.
+            clock (Callable[[], float], optional): Returns the current time
+                in seconds. Defaults to time.monotonic.
+        """
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        if strategy not in (LEAST_IN_FLIGHT, WEIGHTED_ROUND_ROBIN):
+            raise ValueError(f"Unknown strategy: {strategy}")
+        self.backends: list[Backend] = list(backends)
+        self.strategy: str = strategy
+        self.max_failures: int = int(max_failures)
+        self.cooldown: float = float(cooldown)
+        self.clock: Callable[[], float] = clock
+
+    def is_available(self, backend: Backend) -> bool:
+        """Whether a backend is not cooling down."""
+        return backend.unavailable_until <= self.clock()
+
+    def select(self, exclude: list[Backend] = ()) -> Backend:
+        """
+        Picks the backend for the next request.
+
+        Args:
+            exclude (list[Backend], optional): Backends already tried for
+                this request; used only if nothing else is left.
+                Defaults to ().
+
+        Returns:
+            Backend: The chosen backend.
+        """
+        candidates: list[Backend] = [
+            backend for backend in self.backends
+            if backend not in exclude and self.is_available(backend)
+        ]
+        if not candidates:
+            candidates = [backend for backend in self.backends if backend not in exclude] or self.backends
+            return min(candidates, key=lambda backend: backend.unavailable_until)
+        if self.strategy == WEIGHTED_ROUND_ROBIN:
+            total: int = sum(backend.weight for backend in candidates)
+            for backend in candidates:
+                backend.current_weight += backend.weight
+            chosen: Backend = max(candidates, key=lambda backend: backend.current_weight)
+            chosen.current_weight -= total
+            return chosen
+        return min(candidates, key=lambda backend: (backend.in_flight / backend.weight, backend.requests))
+
+    def has_alternative(self, exclude: list[Backend]) -> bool:
+        """
+        Checks whether an available backend is left for a retry.
+
+        Args:
+            exclude (list[Backend]): Backends already tried.
+
+        Returns:
+            bool: True if another backend can be tried right away.
+        """
+        return any(backend not in exclude and self.is_available(backend) for backend in self.backends)
+
+    @staticmethod
+    def is_failure(status: int = None) -> bool:
+        """
+        Checks whether an outcome counts as a failure of the backend.
+
+        Args:
+            status (int, optional): The HTTP status, or None for a
+                connection error or timeout. Defaults to None.
+
+        Returns:
+            bool: True for 401, 403, 429, 5xx and connection errors.
+        """
+        return status is None or status in (401, 403, 429) or status >= 500
+
+    def report(self, backend: Backend, status: int = None, retry_after: float = None) -> None:
+        """
+        Records the outcome of a request and starts a cooldown if needed.
+
+        Statuses 401, 403, 429 and 5xx, and connection errors, count as
+        backend failures; any other status resets the failure count.
+
+        Args:
+            backend (Backend): The backend the request was sent to.
+            status (int, optional): The HTTP status, or None for a
+                connection error or timeout. Defaults to None.
+            retry_after (float, optional): Seconds the server asked to wait.
+                Defaults to None.
+        """
+        if not self.is_failure(status):
+            backend.failures = 0
+            return
+        backend.failures += 1
+        backend.errors += 1
+        if status in (401, 403, 429) or backend.failures >= self.max_failures:
+            cooldown: float = self.cooldown if retry_after is None else retry_after
+            backend.unavailable_until = self.clock() + cooldown
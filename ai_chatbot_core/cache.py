@@ -0,0 +1,416 @@
+import asyncio
+import hashlib
+import random
+import re
+import sqlite3
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from .types import Message, Model
+
+WHITESPACE = re.compile(r"\s+")
+WORD = re.compile(r"\w+")
+MINHASH_PRIME = (1 << 61) - 1
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes message text for cache keys by collapsing whitespace.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def hash_messages(model: Model, messages: list[Message]) -> str:
+    """
+    Hashes a model and a normalized message list.
+
+    Args:
+        model (Model): The model of the request.
+        messages (list[Message]): The messages sent with the request.
+
+    Returns:
+        str: A hex digest identifying the request.
+    """
+    digest = hashlib.blake2b(model.value.encode("utf-8"), digest_size=16)
+    for message in messages:
+        digest.update(b"\0" + message.role.encode("utf-8") + b"\0")
+        digest.update(normalize(message.content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MinHash:
+    """
+    Estimates the Jaccard similarity of texts from word shingles.
+
+    Texts are compared case-insensitively by their words, ignoring
+    punctuation. Signatures are stable across processes, so they can be
+    stored on disk.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        """
+        Initializes the hash family.
+
+        Args:
+            num_perm (int, optional): Number of hash functions, i.e. the
+                signature length. Defaults to 64.
+            shingle_size (int, optional): Number of words per shingle.
+                Defaults to 3.
+            seed (int, optional): Seed of the hash functions. Defaults to 1.
+        """
+        generator = random.Random(seed)
+        self.shingle_size: int = int(shingle_size)
+        self.permutations: list[tuple[int, int]] = [
+            (generator.randrange(1, MINHASH_PRIME), generator.randrange(0, MINHASH_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        """
+        Computes the MinHash signature of a text.
+
+        Args:
+            text (str): The text to sign.
+
+        Returns:
+            tuple[int, ...]: The signature.
+        """
+        words: list[str] = WORD.findall(text.casefold()) or [""]
+        size: int = min(self.shingle_size, len(words))
+        shingles: set[int] = {
+            zlib.crc32(" ".join(words[index:index + size]).encode("utf-8"))
+            for index in range(len(words) - size + 1)
+        }
+        return tuple(
+            min((a * shingle + b) % MINHASH_PRIME for shingle in shingles)
+            for a, b in self.permutations
+        )
+
+    @staticmethod
+    def similarity(first: tuple[int, ...], second: tuple[int, ...]) -> float:
+        """
+        Estimates the Jaccard similarity of two signatures.
+
+        Args:
+            first (tuple[int, ...]): A signature.
+            second (tuple[int, ...]): Another signature of the same length.
+
+        Returns:
+            float: The estimated similarity between 0 and 1.
+        """
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+class CacheEntry:
+    """
+    A cached response.
+
+    Attributes:
+        key (str): Hash of the model and the full message list.
+        context (str): Hash of the model and every message but the last.
+        signature (tuple[int, ...]): MinHash of the last message, or None.
+        content (str): The cached response.
+        expires (float): Clock time after which the entry is stale.
+    """
+
+    __slots__ = ("key", "context", "signature", "content", "expires")
+
+    def __init__(self, key: str, context: str, signature: tuple, content: str, expires: float):
+        self.key: str = key
+        self.context: str = context
+        self.signature: tuple = signature
+        self.content: str = content
+        self.expires: float = expires
+
+
+class ResponseCache:
+    """
+    Caches AI responses by model and normalized message list.
+
+    Exact lookups hash the model with every message. In near-duplicate
+    mode, a request whose earlier messages match exactly and whose last
+    message is similar enough to a cached one, by MinHash estimate, is a
+    hit too. Entries expire after the TTL and the least recently used
+    entries are evicted beyond max_entries. Subclasses implement the
+    storage primitives.
+
+    Attributes:
+        hits (int): Exact hits.
+        near_hits (int): Near-duplicate hits.
+        misses (int): Lookups that found nothing.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 3600.0,
+        similarity: float = None,
+        minhash: MinHash = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached responses.
+                Defaults to 10000.
+            ttl (float, optional): Seconds a response stays valid.
+                Defaults to 3600.0.
+            similarity (float, optional): Minimum estimated similarity of
+                the last message for a near-duplicate hit. If None,
+                only exact matches are hits. Defaults to None.
+            minhash (MinHash, optional): The hash family for near-duplicate
+                mode. Defaults to MinHash().
+            clock (Callable[[], float], optional): Returns the current time
+                in seconds. Defaults to time.time.
+        """
+        self.max_entries: int = int(max_entries)
+        self.ttl: float = float(ttl)
+        self.similarity: float = similarity
+        self.minhash: MinHash = MinHash() if minhash is None and similarity is not None else minhash
+        self.clock: Callable[[], float] = clock
+        self.hits: int = 0
+        self.near_hits: int = 0
+        self.misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups that were exact or near-duplicate hits."""
+        lookups: int = self.hits + self.near_hits + self.misses
+        return (self.hits + self.near_hits) / lookups if lookups else 0.0
+
+    async def get(self, model: Model, messages: list[Message]) -> str:
+        """
+        Looks up a cached response.
+
+        Args:
+            model (Model): The model of the request.
+            messages (list[Message]): The messages sent with the request.
+
+        Returns:
+            str: The cached response, or None on a miss.
+        """
+        now: float = self.clock()
+        entry: CacheEntry = await self._load(hash_messages(model, messages), now)
+        if entry is not None:
+            self.hits += 1
+            return entry.content
+        if self.similarity is not None and messages:
+            signature: tuple = self.minhash.signature(messages[-1].content)
+            context: str = hash_messages(model, messages[:-1])
+            best: CacheEntry = None
+            best_score: float = self.similarity
+            for candidate in await self._candidates(context, now):
+                score: float = MinHash.similarity(signature, candidate.signature)
+                if score >= best_score:
+                    best, best_score = candidate, score
+            if best is not None:
+                self.near_hits += 1
+                return best.content
+        self.misses += 1
+        return None
+
+    async def set(self, model: Model, messages: list[Message], content: str) -> None:
+        """
+        Caches a response.
+
+        Args:
+            model (Model): The model of the request.
+            messages (list[Message]): The messages sent with the request.
+            content (str): The response.
+        """
+        signature: tuple = None
+        context: str = None
+        if self.similarity is not None and messages:
+            signature = self.minhash.signature(messages[-1].content)
+            context = hash_messages(model, messages[:-1])
+        entry = CacheEntry(hash_messages(model, messages), context, signature, content, self.clock() + self.ttl)
+        await self._store(entry)
+
+    async def close(self) -> None:
+        """Releases resources held by the cache."""
+
+    async def _load(self, key: str, now: float) -> CacheEntry:
+        """Returns the fresh entry for a key and marks it used, or None."""
+        raise NotImplementedError
+
+    async def _candidates(self, context: str, now: float) -> list[CacheEntry]:
+        """Returns the fresh entries that share a context."""
+        raise NotImplementedError
+
+    async def _store(self, entry: CacheEntry) -> None:
+        """Stores an entry and evicts the least recently used ones."""
+        raise NotImplementedError
+
+
+class MemoryResponseCache(ResponseCache):
+    """Keeps cached responses in an in-process LRU dict."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.__contexts: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    async def _load(self, key: str, now: float) -> CacheEntry:
+        entry: CacheEntry = self.__entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= now:
+            self.__remove(key)
+            return None
+        self.__entries.move_to_end(key)
+        return entry
+
+    async def _candidates(self, context: str, now: float) -> list[CacheEntry]:
+        candidates: list[CacheEntry] = []
+        for key in list(self.__contexts.get(context, ())):
+            entry: CacheEntry = await self._load(key, now)
+            if entry is not None:
+                candidates.append(entry)
+        return candidates
+
+    async def _store(self, entry: CacheEntry) -> None:
+        if entry.key in self.__entries:
+            self.__remove(entry.key)
+        self.__entries[entry.key] = entry
+        if entry.context is not None:
+            self.__contexts.setdefault(entry.context, set()).add(entry.key)
+        while len(self.__entries) > self.max_entries:
+            self.__remove(next(iter(self.__entries)))
+
+    def __remove(self, key: str) -> None:
+        """Removes an entry and its context index."""
+        entry: CacheEntry = self.__entries.pop(key)
+        if entry.context is not None:
+            keys: set[str] = self.__contexts[entry.context]
+            keys.discard(key)
+            if not keys:
+                del self.__contexts[entry.context]
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Keeps cached responses in an SQLite database, so they survive restarts
+    and are shared by worker processes on one host. Queries run on a
+    dedicated thread.
+    """
+
+    def __init__(self, path: str, *args, **kwargs):
+        """
+        Initializes the cache. The database is opened on first use.
+
+        Args:
+            path (str): Path of the database file.
+            *args: Passed to ResponseCache.
+            **kwargs: Passed to ResponseCache.
+        """
+        super().__init__(*args, **kwargs)
+        self.path: str = str(path)
+        self.__connection: sqlite3.Connection = None
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+
+    async def close(self) -> None:
+        await self.__run(self.__close)
+        self.__executor.shutdown(wait=False)
+
+    async def _load(self, key: str, now: float) -> CacheEntry:
+        return await self.__run(self.__load, key, now)
+
+    async def _candidates(self, context: str, now: float) -> list[CacheEntry]:
+        return await self.__run(self.__candidates, context, now)
+
+    async def _store(self, entry: CacheEntry) -> None:
+        await self.__run(self.__store, entry, self.clock())
+
+    async def __run(self, function, *args):
+        """Runs a function on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, function, *args)
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens the database and creates the schema if needed."""
+        if self.__connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    context TEXT,
+                    signature BLOB,
+                    content TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_context ON responses (context);
+                CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+                """
+            )
+            self.__connection = connection
+        return self.__connection
+
+    @staticmethod
+    def __to_entry(row: tuple) -> CacheEntry:
+        """Builds an entry from a database row."""
+        key, context, signature, content, expires = row
+        if signature is not None:
+            signature = struct.unpack(f"<{len(signature) // 8}Q", signature)
+        return CacheEntry(key, context, signature, content, expires)
+
+    def __load(self, key: str, now: float) -> CacheEntry:
+        connection: sqlite3.Connection = self.__connect()
+        with connection:
+            row = connection.execute(
+                "SELECT key, context, signature, content, expires FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[4] <= now:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return self.__to_entry(row)
+
+    def __candidates(self, context: str, now: float) -> list[CacheEntry]:
+        rows = self.__connect().execute(
+            "SELECT key, context, signature, content, expires FROM responses "
+            "WHERE context = ? AND expires > ?",
+            (context, now),
+        ).fetchall()
+        return [self.__to_entry(row) for row in rows]
+
+    def __store(self, entry: CacheEntry, now: float) -> None:
+        signature: bytes = None
+        if entry.signature is not None:
+            signature = struct.pack(f"<{len(entry.signature)}Q", *entry.signature)
+        connection: sqlite3.Connection = self.__connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.context, signature, entry.content, entry.expires, now),
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __close(self) -> None:
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
@@ -1,25 +1,122 @@
-import aiohttp
-import re
+import asyncio
 import logging
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Union
 
+from .cache import ResponseCache
+from .coalesce import RequestCoalescer
 from .config import api_url
+from .history import HistoryPolicy, SlidingWindow, estimate_message_tokens
+from .metrics import RequestEvent
+from .offload import Offloader
+from .routing import ModelRouter
+from .serialization import dumps, loads
+from .storage import ChatStorage
+from .summary import Summarizer
+from .think import ThinkFilter
+from .transport import Transport
 from .types import Message, StartMessage, Model
 
+if TYPE_CHECKING:
+    import aiohttp
+
 
 logger = logging.getLogger("agent")
 
 
-def remove_think_content(text: str) -> str:
+def remove_think_content(text: str, sink: Callable[[str], None] = None) -> str:
     """
     Removes content enclosed within <think> tags from a given string.
 
+    The text is scanned once by a ThinkFilter, so an unterminated <think>
+    block removes everything after its opening tag.
+
     Args:
         text (str): The input string potentially containing <think> tags.
+        sink (Callable[[str], None], optional): Receives the removed think
+            content. Defaults to None.
 
     Returns:
         str: The string with <think> content removed.
     """
-    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
+    think_filter = ThinkFilter(sink)
+    return (think_filter.feed(text) + think_filter.flush()).strip()
+
+
+def parse_reply(content: dict, sink: Callable[[str], None] = None) -> tuple[str, str, dict, int]:
+    """
+    Extracts the AI's message from a decoded chat completion.
+
+    Args:
+        content (dict): The decoded response body.
+        sink (Callable[[str], None], optional): Receives the removed think
+            content. Defaults to None.
+
+    Returns:
+        tuple[str, str, dict, int]: The role, the content without
+            <think> blocks, the token usage or None, and the number of
+            think characters removed.
+    """
+    ai_message: dict = content["choices"][0]["message"]
+    think_filter = ThinkFilter(sink)
+    ai_content: str = (think_filter.feed(ai_message["content"]) + think_filter.flush()).strip()
+    return ai_message["role"], ai_content, content.get("usage"), think_filter.think_chars
+
+
+def parse_completion(body: bytes, keep_think: bool = False) -> tuple[str, str, dict, int, list[str]]:
+    """
+    Decodes a chat completion body and extracts the AI's message.
+
+    This is the CPU-heavy part of handling a large reply, kept free of
+    callbacks so it can run in a worker thread or process.
+
+    Args:
+        body (bytes): The JSON response body.
+        keep_think (bool, optional): Whether to return the removed think
+            content. Defaults to False.
+
+    Returns:
+        tuple[str, str, dict, int, list[str]]: The values returned by
+            parse_reply, followed by the removed think pieces.
+    """
+    thoughts: list[str] = []
+    reply: tuple[str, str, dict, int] = parse_reply(loads(body), thoughts.append if keep_think else None)
+    return reply + (thoughts,)
+
+
+async def iter_sse_data(response: "aiohttp.ClientResponse") -> AsyncIterator[str]:
+    """
+    Parses a server-sent-events body incrementally.
+
+    Reads the response as chunks arrive and yields the data of every
+    complete event. Lines split across chunk boundaries are reassembled.
+
+    Args:
+        response (aiohttp.ClientResponse): The streaming response.
+
+    Yields:
+        str: The data field of each event.
+    """
+    buffer: bytes = b""
+    data: list[str] = []
+    async for chunk in response.content.iter_any():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if not line:
+                if data:
+                    yield "\n".join(data)
+                    data = []
+            elif line.startswith(b"data:"):
+                data.append(line[5:].decode("utf-8").removeprefix(" "))
+    if buffer.startswith(b"data:"):
+        data.append(buffer[5:].decode("utf-8").removeprefix(" "))
+    if data:
+        yield "\n".join(data)
+
+
+class ResponseError(Exception):
+    """Raised when the AI API gives no usable response to a message."""
 
 
 class Chat:
@@ -34,9 +131,19 @@ class Chat:
         self,
         api_key: str,
         user_id: int = 1,
-        start_message: str = None,
+        start_message: Union[str, StartMessage] = None,
         model: Model = Model.DEEPSEEK_R1,
         history: bool = True,
+        transport: Transport = None,
+        on_think: Callable[[str], None] = None,
+        history_policy: HistoryPolicy = None,
+        storage: ChatStorage = None,
+        cache: ResponseCache = None,
+        coalescer: RequestCoalescer = None,
+        summarizer: Summarizer = None,
+        offloader: Offloader = None,
+        router: ModelRouter = None,
+        lock: asyncio.Lock = None,
     ):
         """
         Initializes a new chat session.
@@ -44,24 +151,73 @@ class Chat:
         Args:
             api_key (str): The API key for accessing the chat service.
             user_id (int, optional): The ID of the user. Defaults to 1.
-            start_message (str, optional): The initial message.
-                Defaults to None.
+            start_message (str | StartMessage, optional): The initial
+                message. A StartMessage instance is used as is, so it can
+                be shared between chats. Defaults to None.
             model (Model, optional): The AI model to use.
                 Defaults to Model.DEEPSEEK_R1.
             history (bool, optional): Whether to store the chat history.
                 Defaults to True.
+            transport (Transport, optional): Shared transport to send
+                requests through. If None, the chat creates and owns its
+                own transport. Defaults to None.
+            on_think (Callable[[str], None], optional): Receives the <think>
+                content removed from responses instead of dropping it.
+                Defaults to None.
+            history_policy (HistoryPolicy, optional): Decides which part of
+                the history is sent with each request. If None, a
+                SlidingWindow fitted to the model's context is used.
+                Defaults to None.
+            storage (ChatStorage, optional): Storage that new messages are
+                appended to. If None, the history is kept in memory only.
+                Defaults to None.
+            cache (ResponseCache, optional): Cache of responses consulted
+                before every upstream request. Defaults to None.
+            coalescer (RequestCoalescer, optional): Shares identical
+                in-flight requests between chats. Defaults to None.
+            summarizer (Summarizer, optional): Compresses the oldest turns
+                into a summary in the background once the history grows
+                too long. Defaults to None.
+            offloader (Offloader, optional): Decodes large non-streaming
+                replies and strips their <think> content in a worker pool
+                instead of on the event loop. Defaults to None.
+            router (ModelRouter, optional): Picks the model for every
+                turn, with fallback and hedged requests. If None, every
+                turn uses model. Defaults to None.
+            lock (asyncio.Lock, optional): The lock that serializes turns,
+                shared by every Chat of the same user, e.g. one reloaded
+                after eviction. If None, the chat creates its own.
+                Defaults to None.
         """
         self.api_key: str = str(api_key)
         self.user_id: int = int(user_id)
         self.model: Model = model
         self.__history: bool = bool(history)
-        self.messages: list[Message] = [StartMessage(start_message)]
+        if not isinstance(start_message, StartMessage):
+            start_message = StartMessage(start_message)
+        self.start_message: StartMessage = start_message
+        self.messages: list[Message] = [start_message]
+        self.__owns_transport: bool = transport is None
+        self.transport: Transport = Transport() if transport is None else transport
+        self.on_think: Callable[[str], None] = on_think
+        self.history_policy: HistoryPolicy = (
+            SlidingWindow() if history_policy is None else history_policy
+        )
+        self.storage: ChatStorage = storage
+        self.cache: ResponseCache = cache
+        self.coalescer: RequestCoalescer = coalescer
+        self.summarizer: Summarizer = summarizer
+        self.offloader: Offloader = offloader
+        self.router: ModelRouter = router
+        self.__lock: asyncio.Lock = lock
+        self.__summary_task: asyncio.Task = None
 
     async def add_message(self, role: str, content: str):
         """
         Adds a new message to the chat history.
 
-        The message is stored as a Message object in the chat's message list.
+        The message is stored as a Message object in the chat's message list
+        and appended to the chat's storage, if any.
         This method is used to record both user inputs and AI responses.
         
         The role parameter specifies whether the message is from the user
@@ -75,15 +231,18 @@ class Chat:
         Returns:
             None
         """
-        self.messages.append(Message(content, role))
+        message = Message(content, role)
+        self.messages.append(message)
+        if self.storage is not None:
+            await self.storage.append(self.user_id, [message])
 
     async def get_messages(self) -> list[dict]:
         """
         Retrieves the chat history as a list of dictionaries.
 
         This method is used to format the chat history into a structure
-        that can be sent to the AI API.
-        Retrieves the chat history as a list of dictionaries.
+        that can be sent to the AI API. Only the messages chosen by the
+        chat's history policy are included.
 
         Each dictionary represents a message and contains the following keys:
         - "role": The role of the message sender.
@@ -92,7 +251,42 @@ class Chat:
         Returns:
             list[dict]: A list of dictionaries representing the chat history.
         """
-        return [message.get_content() for message in self.messages]
+        messages: list[Message] = self.history_policy.select(self.messages, self.model)
+        return [message.get_content() for message in messages]
+
+    async def get_payload(
+        self,
+        stream: bool = False,
+        messages: list[Message] = None,
+        model: Model = None,
+    ) -> bytes:
+        """
+        Builds the encoded JSON request body for the AI API.
+
+        Each message keeps its own encoded form, so the body is a join of
+        cached fragments rather than a re-serialization of the history.
+
+        Args:
+            stream (bool, optional): Whether to request a streaming
+                response. Defaults to False.
+            messages (list[Message], optional): The messages to send. If
+                None, they are chosen by the history policy.
+                Defaults to None.
+            model (Model, optional): The model to ask. If None, the chat's
+                model. Defaults to None.
+
+        Returns:
+            bytes: The request body.
+        """
+        if messages is None:
+            messages = self.history_policy.select(self.messages, self.model)
+        return b"".join((
+            b'{"model":',
+            dumps((model or self.model).value),
+            b',"messages":[',
+            b",".join([message.to_json() for message in messages]),
+            b'],"stream":true}' if stream else b"]}",
+        ))
 
     async def get_response(self, content: str) -> str:
         """
@@ -100,8 +294,14 @@ class Chat:
 
         This method sends the current chat history to the AI API,
         receives the AI's response, and adds it to the chat history.
-        It also handles API errors and returns a user-friendly error message
-        if something goes wrong.
+        Transient failures are retried by the transport. With a
+        coalescer, concurrent chats sending an identical request body share
+        one upstream call, and each adds the reply to its own history
+        (the <think> content goes to the on_think of the chat whose call
+        ran). With a router, the model is picked per turn, a failing model
+        falls back to the next one, and a slow one is hedged. If the
+        request still fails, the user's message is removed from the
+        history again and a user-friendly error message is returned.
 
         Args:
             content (str): The content of the user's message.
@@ -109,55 +309,502 @@ class Chat:
         Returns:
             str: The AI's response or an error message.
         """
-        await self.add_message("user", str(content))
+        try:
+            return await self._get_response(content)
+        except ResponseError:
+            return "An error occurred while processing your request."
+
+    async def _get_response(self, content: str) -> str:
+        """
+        Runs a turn like get_response, but raises on failure.
+
+        Args:
+            content (str): The content of the user's message.
+
+        Returns:
+            str: The AI's response.
+
+        Raises:
+            ResponseError: If the request failed. On this or any other
+                error, and on cancellation, the user's message has been
+                removed from the history again.
+        """
+        async with self.get_lock():
+            await self.add_message("user", str(content))
+
+            messages: list[Message] = self.history_policy.select(self.messages, self.model)
+            cached: str = await self._get_cached(messages)
+            if cached is not None:
+                return cached
+            try:
+                if self.router is None:
+                    role, ai_content = await self.__send(messages, self.model)
+                else:
+                    role, ai_content = await self._race(
+                        self.__get_models(messages), lambda model: self.__send(messages, model)
+                    )
+            except BaseException:
+                await self._remove_last_message()
+                raise
+            if self.__history:
+                await self.add_message(role, ai_content)
+                self.__schedule_summary()
+            if self.cache is not None:
+                await self.cache.set(self.model, messages, ai_content)
+            return ai_content
+
+    async def stream_response(self, content: str) -> AsyncIterator[str]:
+        """
+        Streams a response from the AI model for a given message.
+
+        Sends the chat history with streaming enabled and yields text
+        deltas as they arrive, with <think> content removed on the fly.
+        The assembled reply is added to the chat history only once the
+        stream completes. With a router, models are raced on their first
+        piece of text, and a model that fails before sending any text is
+        replaced by the next one. If the request fails, or the caller
+        stops reading before the stream ends, the user's message is
+        removed from the history again.
+
+        Args:
+            content (str): The content of the user's message.
+
+        Yields:
+            str: Pieces of the AI's response, or an error message.
+        """
+        async with self.get_lock():
+            await self.add_message("user", str(content))
+
+            messages: list[Message] = self.history_policy.select(self.messages, self.model)
+            cached: str = await self._get_cached(messages)
+            if cached is not None:
+                yield cached
+                return
+            role: str = "assistant"
+            parts: list[str] = []
+            if self.router is None:
+                pieces: AsyncIterator[tuple[str, str]] = self._stream(messages, self.model)
+            else:
+                pieces = self.__stream_routed(messages)
+            completed: bool = False
+            failed: bool = False
+            try:
+                try:
+                    async for role, text in pieces:
+                        parts.append(text)
+                        yield text
+                finally:
+                    await pieces.aclose()
+                completed = True
+            except ResponseError:
+                failed = True
+            finally:
+                if not completed:
+                    await self._remove_last_message()
+            if failed:
+                yield "An error occurred while processing your request."
+                return
+
+            ai_content: str = "".join(parts).strip()
+            if self.__history:
+                await self.add_message(role, ai_content)
+                self.__schedule_summary()
+            if self.cache is not None:
+                await self.cache.set(self.model, messages, ai_content)
+
+    @property
+    def busy(self) -> bool:
+        """Whether a turn or a background summary is running."""
+        if self.__lock is not None and self.__lock.locked():
+            return True
+        return self.__summary_task is not None and not self.__summary_task.done()
+
+    def get_lock(self) -> asyncio.Lock:
+        """
+        Returns the lock that serializes turns on this chat.
+
+        get_response and stream_response hold it for a whole turn, so
+        concurrent messages to one chat are processed in arrival order
+        and their history entries never interleave. Chats created by a
+        ChatManager share the lock with every other Chat of their user.
+
+        Returns:
+            asyncio.Lock: The chat's turn lock.
+        """
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+        return self.__lock
+
+    async def _get_cached(self, messages: list[Message]) -> str:
+        """
+        Looks up a cached response and adds it to the history on a hit.
+
+        Args:
+            messages (list[Message]): The messages that would be sent.
+
+        Returns:
+            str: The cached response, or None on a miss or without a cache.
+        """
+        if self.cache is None:
+            return None
+        cached: str = await self.cache.get(self.model, messages)
+        if cached is not None and self.__history:
+            await self.add_message("assistant", cached)
+        return cached
+
+    async def _remove_last_message(self) -> None:
+        """Removes the newest message, e.g. the user message of a failed turn."""
+        self.messages.pop()
+        if self.storage is not None:
+            await self.storage.remove_last(self.user_id)
+
+    def __get_models(self, messages: list[Message]) -> list[Model]:
+        """Returns the router's candidate models for the messages."""
+        return self.router.select(sum(estimate_message_tokens(message) for message in messages))
+
+    async def __send(self, messages: list[Message], model: Model) -> tuple[str, str]:
+        """
+        Requests a reply from one model, sharing identical in-flight
+        requests through the coalescer.
+
+        Raises:
+            ResponseError: If the request failed.
+        """
+        data: bytes = await self.get_payload(messages=messages, model=model)
+        if self.coalescer is None:
+            reply: tuple[str, str] = await self._request(data, model, sink=self.on_think)
+        else:
+            reply = await self.coalescer.run(data, lambda: self._request(data, model, sink=self.on_think))
+        if reply is None:
+            raise ResponseError("The AI API gave no usable response")
+        return reply
+
+    async def _race(
+        self,
+        models: list[Model],
+        attempt: Callable[[Model], Awaitable],
+        discard: Callable[[object], Awaitable] = None,
+    ):
+        """
+        Tries models in order until one of them answers.
+
+        The first model is asked first. If its attempt fails, the next
+        model is asked. If it has not answered within the router's
+        hedge_delay, the next model is asked as well, and the first
+        successful answer wins; the remaining attempts are cancelled.
+
+        Args:
+            models (list[Model]): The candidate models, best first.
+            attempt (Callable[[Model], Awaitable]): Asks a model and
+                returns its answer, raising ResponseError on failure.
+            discard (Callable[[object], Awaitable], optional): Releases
+                an answer that arrived after the winning one.
+                Defaults to None.
+
+        Returns:
+            The winning answer.
+
+        Raises:
+            ResponseError: If every model failed.
+        """
+        remaining = iter(models)
+        attempts: dict[asyncio.Task, Model] = {}
+        hedge_delay: float = None if self.router is None else self.router.hedge_delay
+        hedged: bool = False
+
+        def launch() -> bool:
+            model: Model = next(remaining, None)
+            if model is None:
+                return False
+            attempts[asyncio.ensure_future(attempt(model))] = model
+            return True
+
+        launch()
+        try:
+            while attempts:
+                timeout: float = None if hedged else hedge_delay
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if launch():
+                        self.router.hedges += 1
+                    continue
+                for task in done:
+                    model: Model = attempts.pop(task)
+                    error: BaseException = task.exception()
+                    if error is None:
+                        if model is not models[0] and self.router is not None:
+                            self.router.backup_wins += 1
+                        return task.result()
+                    if not isinstance(error, ResponseError):
+                        raise error
+                if not attempts and launch():
+                    self.router.fallbacks += 1
+            raise ResponseError("The AI API gave no usable response")
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.wait(attempts)
+                for task in attempts:
+                    if discard is not None and not task.cancelled() and task.exception() is None:
+                        await discard(task.result())
+
+    async def _stream(self, messages: list[Message], model: Model) -> AsyncIterator[tuple[str, str]]:
+        """
+        Streams a reply from one model, with <think> content removed.
+
+        Args:
+            messages (list[Message]): The messages to send.
+            model (Model): The model to ask.
 
-        headers: dict[str, str] = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
-        messages: list[dict] = await self.get_messages()
-        data: dict[str, list | str] = {"model": self.model.value, "messages": messages}
+        Yields:
+            tuple[str, str]: The role and each visible piece of the reply.
 
-        async with aiohttp.ClientSession() as session:
+        Raises:
+            ResponseError: If the request failed, possibly after some
+                pieces were yielded.
+        """
+        import aiohttp
+
+        data: bytes = await self.get_payload(stream=True, messages=messages, model=model)
+        think_filter = ThinkFilter(self.on_think)
+        event = RequestEvent(model)
+        role: str = "assistant"
+        started: bool = False
+        try:
+            async with self.transport.request(api_url, self.api_key, data, model, event) as response:
+                if response.status != 200:
+                    logger.error(f"Error: {response.status}")
+                    logger.error(await response.text())
+                else:
+                    async for data in iter_sse_data(response):
+                        if data == "[DONE]":
+                            break
+                        chunk: dict = loads(data)
+                        event.set_usage(chunk.get("usage"))
+                        choices: list[dict] = chunk.get("choices") or []
+                        if not choices:
+                            continue
+                        delta: dict = choices[0].get("delta") or {}
+                        role = delta.get("role") or role
+                        text: str = think_filter.feed(delta.get("content") or "")
+                        if not started:
+                            text = text.lstrip()
+                        if text:
+                            started = True
+                            yield role, text
+                    text = think_filter.flush()
+                    event.think_chars = think_filter.think_chars
+                    if not started:
+                        text = text.lstrip()
+                    if text:
+                        yield role, text
+                    return
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            logger.error(f"Aiohttp client error: {error}")
+        finally:
+            if self.router is not None:
+                self.router.observe(event)
+        raise ResponseError("The AI API gave no usable response")
+
+    async def __stream_routed(self, messages: list[Message]) -> AsyncIterator[tuple[str, str]]:
+        """
+        Streams a reply from the models picked by the router, racing
+        them on the first piece of text.
+
+        Each attempt streams in its own task into a queue, so the winning
+        stream keeps running in the task that started it.
+        """
+        end: object = object()
+
+        async def produce(model: Model, queue: asyncio.Queue) -> None:
+            try:
+                async for piece in self._stream(messages, model):
+                    await queue.put(piece)
+            except Exception as error:
+                await queue.put(error)
+                return
+            await queue.put(end)
+
+        async def start(model: Model) -> tuple[asyncio.Task, asyncio.Queue, object]:
+            queue: asyncio.Queue = asyncio.Queue()
+            producer: asyncio.Task = asyncio.ensure_future(produce(model, queue))
             try:
-                async with session.post(
-                    api_url, headers=headers, json=data
-                ) as response:
-                    if response.status == 200:
-                        return await self._process_response(response)
-                    else:
-                        logger.error(f"Error: {response.status}")
-                        logger.error(await response.text())
-                        return "An error occurred while processing your request."
-            except aiohttp.ClientError as error:
-                logger.error(f"Aiohttp client error: {error}")
-                return "An error occurred while processing your request."
-
-    async def _process_response(self, response: aiohttp.ClientResponse) -> str:
+                first = await queue.get()
+            except BaseException:
+                producer.cancel()
+                raise
+            if isinstance(first, Exception):
+                raise first
+            return producer, queue, first
+
+        async def discard(started: tuple[asyncio.Task, asyncio.Queue, object]) -> None:
+            started[0].cancel()
+
+        producer, queue, piece = await self._race(self.__get_models(messages), start, discard)
+        try:
+            while piece is not end:
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+                piece = await queue.get()
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def _request(
+        self,
+        data: bytes,
+        model: Model = None,
+        sink: Callable[[str], None] = None,
+    ) -> tuple[str, str]:
+        """
+        Sends a request body to the AI API and processes the reply.
+
+        Failures are logged rather than raised, so a result shared by
+        coalesced callers never depends on which chat started the call.
+
+        Args:
+            data (bytes): The request body.
+            model (Model, optional): The model the body is for. If None,
+                the chat's model. Defaults to None.
+            sink (Callable[[str], None], optional): Receives the removed
+                <think> content. Defaults to None.
+
+        Returns:
+            tuple[str, str]: The role and processed content of the AI's
+                message, or None if the request failed.
+        """
+        import aiohttp
+
+        model = model or self.model
+        event = RequestEvent(model)
+        try:
+            async with self.transport.request(api_url, self.api_key, data, model, event) as response:
+                if response.status == 200:
+                    return await self._process_response(response, sink, event)
+                logger.error(f"Error: {response.status}")
+                logger.error(await response.text())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            logger.error(f"Aiohttp client error: {error}")
+        finally:
+            if self.router is not None:
+                self.router.observe(event)
+        return None
+
+    async def _process_response(
+        self,
+        response: "aiohttp.ClientResponse",
+        sink: Callable[[str], None] = None,
+        event: RequestEvent = None,
+    ) -> tuple[str, str]:
         """
         Processes the response from the AI API.
 
-        Extracts the AI's message from the response, removes any <think>
-        content, adds the message to the chat history, and returns the
-        processed content.
+        Extracts the AI's message from the response and removes any
+        <think> content. With an offloader, bodies at or above its
+        threshold are decoded and filtered in its pool, and the removed
+        think content is passed to the sink afterwards.
 
         Args:
             response (aiohttp.ClientResponse): The response from the AI API.
+            sink (Callable[[str], None], optional): Receives the removed
+                <think> content. Defaults to None.
+            event (RequestEvent, optional): Receives the token usage and
+                the size of the removed think content. Defaults to None.
+
+        Returns:
+            tuple[str, str]: The role and processed content of the AI's
+                message.
+        """
+        if self.offloader is not None:
+            body: bytes = await response.read()
+            if self.offloader.should_offload(len(body)):
+                role, ai_content, usage, think_chars, thoughts = await self.offloader.run(
+                    parse_completion, body, sink is not None
+                )
+                for thought in thoughts:
+                    sink(thought)
+            else:
+                role, ai_content, usage, think_chars = parse_reply(loads(body), sink)
+        else:
+            content: dict = await response.json(loads=loads)
+            role, ai_content, usage, think_chars = parse_reply(content, sink)
+        if event is not None:
+            event.set_usage(usage)
+            event.think_chars = think_chars
+        return role, ai_content
+
+    async def summarize(self) -> bool:
+        """
+        Compresses the oldest turns into a summary if the history is too long.
+
+        The summary is requested without holding the turn lock, so turns
+        continue meanwhile. The history is then replaced in one step
+        without yielding to the event loop, keeping the messages added in
+        the meantime. If the summarized messages changed in the meantime,
+        e.g. because the chat was cleared, the summary is discarded.
+        Chats with a summarizer call this in the background after every
+        turn.
 
         Returns:
-            str: The processed content of the AI's message.
+            bool: True if the history was summarized.
         """
-        content: dict = await response.json()
-        ai_message: dict = content["choices"][0]["message"]
-        ai_content: str = remove_think_content(ai_message["content"])
-        if self.__history:
-            await self.add_message(ai_message["role"], ai_content)
-        return ai_content
+        if self.summarizer is None:
+            return False
+        cut: int = self.summarizer.get_cut(self.messages)
+        if not cut:
+            return False
+        old: list[Message] = self.messages[:cut]
+        start: int = 1 if isinstance(old[0], StartMessage) else 0
+        data: bytes = self.summarizer.get_payload(old[start:], self.model)
+        reply: tuple[str, str] = await self._request(data, self.summarizer.model)
+        if reply is None or len(self.messages) < cut or any(
+            message is not kept for message, kept in zip(old, self.messages)
+        ):
+            return False
+        self.messages = old[:start] + [self.summarizer.get_message(reply[1])] + self.messages[cut:]
+        if self.storage is not None:
+            await self.storage.save(self.user_id, self.model, self.messages)
+        return True
+
+    def __schedule_summary(self) -> None:
+        """Starts summarizing in the background if it is due."""
+        if self.summarizer is None or (self.__summary_task is not None and not self.__summary_task.done()):
+            return
+        if self.summarizer.get_cut(self.messages):
+            self.__summary_task = asyncio.ensure_future(self.__run_summary())
+
+    async def __run_summary(self) -> None:
+        try:
+            await self.summarize()
+        except Exception as error:
+            logger.error(f"Summarization failed: {error}")
 
     async def clear_chat(self) -> None:
-        """Clears the chat history and resets it with a start message."""
+        """Clears the chat history and resets it with the chat's start message."""
         self.messages.clear()
-        self.messages.append(StartMessage())
+        self.messages.append(self.start_message)
+        if self.storage is not None:
+            await self.storage.save(self.user_id, self.model, self.messages)
+
+    async def close(self) -> None:
+        """
+        Cancels a running summarization and closes the transport if it is
+        owned by this chat.
+        """
+        if self.__summary_task is not None and not self.__summary_task.done():
+            self.__summary_task.cancel()
+            await asyncio.gather(self.__summary_task, return_exceptions=True)
+        if self.__owns_transport:
+            await self.transport.close()
+
+    async def __aenter__(self) -> "Chat":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
 
     def __eq__(self, other: object) -> bool:
         """
@@ -1,28 +1,161 @@
+import asyncio
+import inspect
+import weakref
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Sequence, Union
+
+from .backends import BackendPool
+from .cache import ResponseCache
 from .chat import Chat
-from .types import Model
+from .chat_store import ChatStore
+from .coalesce import RequestCoalescer
+from .history import HistoryPolicy
+from .limiter import ConcurrencyLimiter
+from .metrics import Instrumentation
+from .offload import Offloader
+from .paged_history import PagedHistory
+from .rate_limit import RateLimiter
+from .routing import ModelRouter
+from .snapshot import SnapshotError, read_snapshot, write_snapshot
+from .storage import ChatStorage
+from .summary import Summarizer
+from .transport import Transport
+from .types import Message, Model, StartMessage
+
+
+class BatchResult:
+    """
+    The outcome of one message sent by ChatManager.gather_responses.
+
+    Attributes:
+        user_id (int): The ID of the user the message was sent for.
+        content (str): The message that was sent.
+        response (str): The AI's response, or None if the item failed.
+        error (BaseException): The exception that failed the item, or None.
+    """
+
+    __slots__ = ("user_id", "content", "response", "error")
+
+    def __init__(self, user_id: int, content: str, response: str = None, error: BaseException = None):
+        self.user_id: int = user_id
+        self.content: str = content
+        self.response: str = response
+        self.error: BaseException = error
+
+    @property
+    def ok(self) -> bool:
+        """Whether the item got a response."""
+        return self.error is None
+
 
 class ChatManager:
     """
     Manages multiple chat instances for different users.
 
     This class handles the creation, retrieval, addition, and removal of chat instances.
-    It also manages the API key, default model, and start message for all chats.
+    It also manages the API key, default model, and start message for all chats,
+    and owns the transport whose pooled connections are shared by every chat.
+    Use it as an async context manager to close the transport cleanly.
+
+    Turns of one user are serialized by a lock the manager keeps per user ID,
+    so a chat reloaded after eviction waits for a turn still running on its
+    evicted predecessor. An optional ConcurrencyLimiter caps upstream requests
+    across all chats.
     """
     
     
-    def __init__(self, api_key: str, model: Model = Model.DEEPSEEK_R1, start_message: str = None):
+    def __init__(
+        self,
+        api_key: str,
+        model: Model = Model.DEEPSEEK_R1,
+        start_message: str = None,
+        transport: Transport = None,
+        history_policy: HistoryPolicy = None,
+        max_chats: int = None,
+        idle_ttl: float = None,
+        on_evict: Callable[[Chat], Union[None, Awaitable[None]]] = None,
+        storage: ChatStorage = None,
+        limiter: ConcurrencyLimiter = None,
+        rate_limiter: RateLimiter = None,
+        backends: BackendPool = None,
+        cache: ResponseCache = None,
+        coalescer: RequestCoalescer = None,
+        summarizer: Summarizer = None,
+        instrumentation: Instrumentation = None,
+        offloader: Offloader = None,
+        router: ModelRouter = None,
+    ):
         """
         Initializes the ManegerChat with an API key, default model, and start message.
 
         Args:
             api_key (str): The API key for accessing the chat service.
             model (Model, optional): The default model to use for new chats. Defaults to Model.DEEPSEEK_R1.
-            start_message (str, optional): The default start message for new chats. Defaults to "You are a helpful assistant.".
+            start_message (str, optional): The default start message for new chats. It is created once and
+                shared by all chats. Defaults to "You are a helpful assistant.".
+            transport (Transport, optional): The transport shared by all chats. If None, a new one
+                with default pool settings is created and owned by the manager. Defaults to None.
+            history_policy (HistoryPolicy, optional): The history policy for new chats. If None,
+                each chat uses a SlidingWindow fitted to its model. Defaults to None.
+            max_chats (int, optional): Maximum number of chats kept in memory; the least recently
+                used chat is evicted first. If None, the number is not limited. Defaults to None.
+            idle_ttl (float, optional): Seconds of inactivity after which a chat is evicted.
+                If None, chats never expire. Defaults to None.
+            on_evict (Callable[[Chat], None | Awaitable[None]], optional): Called with every
+                evicted chat after it was closed; a returned awaitable is awaited, so the chat
+                can be persisted asynchronously. Chats with a turn or summary running are not
+                evicted until they finish. Defaults to None.
+            storage (ChatStorage, optional): Where chat histories are persisted and loaded from when
+                they are not in memory. If None, nothing is kept outside of `chats`, so evicted chats
+                are freed and only passed to on_evict; pass a MemoryStorage to reload them within
+                the process instead. Defaults to None.
+            limiter (ConcurrencyLimiter, optional): Global and per-model limit on upstream requests in
+                flight, installed on the transport. Defaults to None.
+            rate_limiter (RateLimiter, optional): Request and token quotas per API key and model,
+                applied before each upstream call and installed on the transport. Defaults to None.
+            backends (BackendPool, optional): Endpoints and API keys that requests are balanced over
+                with failover, installed on the transport. When given, api_key is only used by chats
+                talking to a transport without a pool. Defaults to None.
+            cache (ResponseCache, optional): Response cache shared by all chats. Defaults to None.
+            coalescer (RequestCoalescer, optional): Lets chats sending identical requests at the same
+                time share one upstream call. Defaults to None.
+            summarizer (Summarizer, optional): Compresses the oldest turns of long chats into a
+                summary in the background. Defaults to None.
+            instrumentation (Instrumentation, optional): Receives the measurements of every upstream
+                request, installed on the transport. Defaults to None.
+            offloader (Offloader, optional): Pool shared by all chats for decoding large replies and
+                stripping their <think> content off the event loop. Its threshold and pool size are
+                set on the Offloader. The manager closes it on close(); it starts again if used
+                later, so it can be shared with other managers. Defaults to None.
+            router (ModelRouter, optional): Picks the model for every turn of every chat from observed
+                latency, error rate and request size, with fallback and hedged requests. The chats'
+                own model is then only used for their history window and cache. Defaults to None.
         """
         self.__api_key: str = api_key
-        self.chats: dict[int, Chat] = {}
+        self.on_evict: Callable[[Chat], Union[None, Awaitable[None]]] = on_evict
+        self.__evicted: deque[Chat] = deque()
+        self.chats: ChatStore = ChatStore(max_chats, idle_ttl, self.__evicted.append)
         self.model: Model = model
-        self.__start_message: str = "You are a helpful assistant." if start_message is None else start_message
+        self.__start_message: StartMessage = StartMessage(start_message)
+        self.__owns_transport: bool = transport is None
+        self.transport: Transport = Transport() if transport is None else transport
+        if limiter is not None:
+            self.transport.limiter = limiter
+        if rate_limiter is not None:
+            self.transport.rate_limiter = rate_limiter
+        if backends is not None:
+            self.transport.backends = backends
+        if instrumentation is not None:
+            self.transport.instrumentation = instrumentation
+        self.history_policy: HistoryPolicy = history_policy
+        self.cache: ResponseCache = cache
+        self.coalescer: RequestCoalescer = coalescer
+        self.summarizer: Summarizer = summarizer
+        self.offloader: Offloader = offloader
+        self.router: ModelRouter = router
+        self.storage: ChatStorage = storage
+        self.__opening: dict[int, asyncio.Future] = {}
+        self.__locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
     
     async def __create_chat(self, user_id: int) -> Chat:
         """
@@ -34,14 +167,45 @@ class ChatManager:
         Returns:
             Chat: The newly created chat instance.
         """
-        chat = Chat(
+        chat = self.__new_chat(user_id, self.model, self.__start_message)
+        await self.add_chat(chat) 
+        return chat
+
+    def __new_chat(self, user_id: int, model: Model, start_message: StartMessage) -> Chat:
+        """Returns a chat wired to the manager's shared components."""
+        return Chat(
             api_key=self.__api_key,
             user_id=user_id,
-            start_message=self.__start_message,
-            model=self.model
+            start_message=start_message,
+            model=model,
+            transport=self.transport,
+            history_policy=self.history_policy,
+            cache=self.cache,
+            coalescer=self.coalescer,
+            summarizer=self.summarizer,
+            offloader=self.offloader,
+            router=self.router,
+            lock=self.get_lock(user_id),
         )
-        await self.add_chat(chat) 
-        return chat
+
+    def get_lock(self, user_id: int) -> asyncio.Lock:
+        """
+        Returns the lock that serializes the turns of a user.
+
+        The lock is shared by every Chat of the user, including one that
+        was evicted mid-turn and the one reloaded in its place. It is kept
+        for as long as any of them is referenced.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            asyncio.Lock: The user's turn lock.
+        """
+        lock: asyncio.Lock = self.__locks.get(user_id)
+        if lock is None:
+            lock = self.__locks[user_id] = asyncio.Lock()
+        return lock
     
     async def connect_chat(self, user_id: int) -> Chat:
         """
@@ -53,25 +217,313 @@ class ChatManager:
         Returns:
             Chat: The connected or newly created chat instance.
         """
-        chat = await self.get_chat(user_id)
+        chat = self.chats.get(user_id)
         if chat is None:
-            chat = await self.__create_chat(user_id)                  
+            chat = await self.__open_chat(user_id, create=True)
+        await self.__release_evicted()
         return chat
     
     async def get_chat(self, user_id: int) -> Chat:
         """
         Retrieves a chat instance for a given user ID.
 
+        Chats that are not in memory are loaded from the storage.
+
         Args:
             user_id (int): The ID of the user whose chat to retrieve.
 
         Returns:
             Chat: The chat instance if found, otherwise None.
         """
-        return self.chats.get(user_id)
+        chat = self.chats.get(user_id)
+        if chat is None:
+            chat = await self.__open_chat(user_id, create=False)
+        await self.__release_evicted()
+        return chat
+
+    async def __open_chat(self, user_id: int, create: bool) -> Chat:
+        """
+        Loads a chat that is not in memory, or creates it.
+
+        Concurrent callers for the same user share one load, so they all
+        get the same chat instead of each building their own.
+
+        Args:
+            user_id (int): The ID of the user whose chat to open.
+            create (bool): Whether to create the chat if nothing is stored.
+
+        Returns:
+            Chat: The chat, or None if nothing is stored and create is False.
+        """
+        while True:
+            future: asyncio.Future = self.__opening.get(user_id)
+            if future is None:
+                if user_id in self.chats:
+                    return self.chats[user_id]
+                future = asyncio.ensure_future(self.__load_chat(user_id, create))
+                self.__opening[user_id] = future
+                future.add_done_callback(lambda done: self.__finish_opening(user_id, done))
+            chat = await asyncio.shield(future)
+            if chat is not None or not create:
+                return chat
+
+    def __finish_opening(self, user_id: int, future: asyncio.Future) -> None:
+        """Frees the user's slot and marks the outcome as retrieved."""
+        if self.__opening.get(user_id) is future:
+            del self.__opening[user_id]
+        if not future.cancelled():
+            future.exception()
+
+    async def __load_chat(self, user_id: int, create: bool) -> Chat:
+        """
+        Loads a chat from the storage, or creates it, and keeps it in memory.
+
+        The load waits for the user's turn lock, so a turn still running on
+        an evicted chat of the user is stored before the chat is reloaded.
+
+        Args:
+            user_id (int): The ID of the user whose chat to load.
+            create (bool): Whether to create the chat if nothing is stored.
+
+        Returns:
+            Chat: The chat, or None if nothing is stored and create is False.
+        """
+        stored = None
+        if self.storage is not None:
+            async with self.get_lock(user_id):
+                stored = await self.storage.load(user_id)
+        if stored is None:
+            return await self.__create_chat(user_id) if create else None
+        model, messages = stored
+        chat = self.__restore_chat(user_id, model, messages)
+        self.chats[user_id] = chat
+        return chat
+
+    def __restore_chat(self, user_id: int, model: Model, messages: Sequence[Message]) -> Chat:
+        """
+        Returns a chat holding a stored history. A start message with the
+        default content is replaced by the manager's shared one.
+        """
+        start_message = self.__start_message
+        if messages and isinstance(messages[0], StartMessage):
+            if messages[0].content == start_message.content:
+                messages[0] = start_message
+            else:
+                start_message = messages[0]
+        chat = self.__new_chat(user_id, model, start_message)
+        chat.storage = self.storage
+        chat.messages = messages or [start_message]
+        return chat
     
     async def add_chat(self, chat: Chat):
+        """
+        Adds a chat to the manager and saves it to the storage, if any.
+
+        Args:
+            chat (Chat): The chat to add.
+        """
+        chat.storage = self.storage
         self.chats[chat.user_id] = chat
+        if self.storage is not None:
+            await self.storage.save(chat.user_id, chat.model, chat.messages)
+        await self.__release_evicted()
+
+    async def __release_evicted(self) -> None:
+        """Closes the chats evicted from memory and passes them to on_evict."""
+        while self.__evicted:
+            chat: Chat = self.__evicted.popleft()
+            await chat.close()
+            if self.on_evict is not None:
+                result = self.on_evict(chat)
+                if inspect.isawaitable(result):
+                    await result
 
     async def remove_chat(self, user_id: int):
-        del self.chats[user_id]
+        """
+        Removes a chat from memory and from the storage, if any.
+
+        Args:
+            user_id (int): The ID of the user whose chat to remove.
+        """
+        self.chats.pop(user_id, None)
+        if self.storage is not None:
+            await self.storage.delete(user_id)
+
+    async def gather_responses(
+        self,
+        items: Iterable[tuple[int, str]],
+        concurrency: int = 10,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Sends messages to many chats and yields the results as they complete.
+
+        At most `concurrency` items are processed at a time, and items are
+        taken from the iterable only as workers become free, so large or
+        lazily generated batches are never materialized up front. Results
+        wait in a bounded queue, so a slow consumer pauses the batch. A
+        failing item is reported in its result and does not stop the
+        others; an error raised by the iterable itself ends the batch.
+        Leaving the loop early cancels the remaining work. An item waits
+        for the previous item of the same user to finish before it
+        connects to the chat, so turns follow the order of the batch.
+
+        Args:
+            items (Iterable[tuple[int, str]]): Pairs of user ID and message.
+                Chats are created as needed; messages for the same user
+                are answered in order.
+            concurrency (int, optional): Maximum number of items in
+                progress. Defaults to 10.
+
+        Yields:
+            BatchResult: The outcome of each item, in completion order.
+        """
+        iterator = iter(items)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(int(concurrency), 1))
+        done: object = object()
+        tails: dict[int, asyncio.Future] = {}
+
+        async def worker() -> None:
+            try:
+                for user_id, content in iterator:
+                    result = BatchResult(user_id, content)
+                    previous: asyncio.Future = tails.get(user_id)
+                    tail: asyncio.Future = asyncio.get_running_loop().create_future()
+                    tails[user_id] = tail
+                    try:
+                        if previous is not None:
+                            await asyncio.wait([previous])
+                        chat: Chat = await self.connect_chat(user_id)
+                        result.response = await chat._get_response(content)
+                    except Exception as error:
+                        result.error = error
+                    finally:
+                        tail.set_result(None)
+                        if tails.get(user_id) is tail:
+                            del tails[user_id]
+                    await queue.put(result)
+            except Exception as error:
+                await queue.put(error)
+                return
+            await queue.put(done)
+
+        workers: list[asyncio.Task] = [
+            asyncio.ensure_future(worker()) for _ in range(max(int(concurrency), 1))
+        ]
+        try:
+            running: int = len(workers)
+            while running:
+                result = await queue.get()
+                if result is done:
+                    running -= 1
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def snapshot(self, path: str) -> int:
+        """
+        Writes every chat in memory to a snapshot file.
+
+        The histories are captured at once, as shallow copies sharing the
+        message objects, and then encoded and written chat by chat on a
+        worker thread, so the event loop keeps serving while the file is
+        written. Paged histories only copy their resident ends; the rest
+        is read from their files by the worker thread. Chats only held by
+        the storage are not included.
+
+        Args:
+            path (str): Path of the snapshot file; an existing file is
+                replaced.
+
+        Returns:
+            int: The number of chats written.
+        """
+        chats: list[tuple[int, str, Sequence[Message]]] = [
+            (chat.user_id, chat.model.value, self.__capture(chat.messages)) for chat in self.chats.values()
+        ]
+        loop = asyncio.get_running_loop()
+        written, _ = await loop.run_in_executor(None, write_snapshot, path, chats)
+        return written
+
+    @staticmethod
+    def __capture(messages: Sequence[Message]) -> Sequence[Message]:
+        """Returns a copy of a history that can be read on another thread."""
+        if isinstance(messages, PagedHistory):
+            return messages.freeze()
+        return tuple(messages)
+
+    async def restore(self, path: str, save: bool = True) -> int:
+        """
+        Loads the chats of a snapshot file into memory.
+
+        Chats replace those of the same users, keeping the least recently
+        used order they were snapshotted in. System prompts are shared
+        between the restored chats, and the manager's start message is
+        reused where the content matches. The file is decoded on a worker
+        thread and fully validated before any chat is replaced.
+
+        Args:
+            path (str): Path of a file written by snapshot().
+            save (bool, optional): Whether to also save the chats to the
+                storage, if any, so they survive eviction. Pass False when
+                the storage already holds them. Defaults to True.
+
+        Returns:
+            int: The number of chats restored.
+
+        Raises:
+            SnapshotError: If the file is not a valid snapshot or names an
+                unknown model.
+        """
+        loop = asyncio.get_running_loop()
+        chats: list[tuple[int, Model, list[Message]]] = await loop.run_in_executor(None, self.__read_snapshot, path)
+        for user_id, model, messages in chats:
+            previous = self.chats.pop(user_id, None)
+            if previous is not None:
+                await previous.close()
+            chat = self.__restore_chat(user_id, model, messages)
+            self.chats[user_id] = chat
+            if save and self.storage is not None:
+                await self.storage.save(user_id, model, chat.messages)
+        await self.__release_evicted()
+        return len(chats)
+
+    @staticmethod
+    def __read_snapshot(path: str) -> list[tuple[int, Model, list[Message]]]:
+        """Decodes a snapshot file and resolves its model values."""
+        chats: list[tuple[int, Model, list[Message]]] = []
+        models: dict[str, Model] = {}
+        for user_id, value, messages in read_snapshot(path):
+            if value not in models:
+                try:
+                    models[value] = Model(value)
+                except ValueError:
+                    raise SnapshotError(f"Unknown model {value!r}") from None
+            chats.append((user_id, models[value], messages))
+        return chats
+
+    async def close(self) -> None:
+        """
+        Stops background work of the chats in memory, flushes the storage,
+        shuts the offloader's pool down and closes the transport if it is
+        owned by the manager.
+        """
+        await self.__release_evicted()
+        for chat in self.chats.values():
+            await chat.close()
+        if self.storage is not None:
+            await self.storage.flush()
+        if self.offloader is not None:
+            await self.offloader.close()
+        if self.__owns_transport:
+            await self.transport.close()
+
+    async def __aenter__(self) -> "ChatManager":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
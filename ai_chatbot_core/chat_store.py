@@ -0,0 +1,145 @@
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Callable, Iterator
+
+from .chat import Chat
+
+
+class ChatStore(MutableMapping):
+    """
+    An in-memory mapping of user IDs to chats with bounded size.
+
+    Chats are kept in least-recently-used order. When the store is over
+    capacity, or a chat has been idle for longer than the TTL, the chat is
+    evicted and passed to the eviction callback, e.g. to persist it.
+    Busy chats, with a turn or a summary running, are skipped, so the
+    store may stay over capacity until they finish and the next chat is
+    added. Lookups and touches are O(1).
+
+    Attributes:
+        hits (int): Number of get() calls that found a chat.
+        misses (int): Number of get() calls that found nothing.
+        evictions (int): Number of chats evicted for capacity or idleness.
+    """
+
+    def __init__(
+        self,
+        max_chats: int = None,
+        idle_ttl: float = None,
+        on_evict: Callable[[Chat], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes an empty store.
+
+        Args:
+            max_chats (int, optional): Maximum number of chats kept in memory.
+                If None, the size is not limited. Defaults to None.
+            idle_ttl (float, optional): Seconds after the last access when a
+                chat is evicted. If None, chats never expire. Defaults to None.
+            on_evict (Callable[[Chat], None], optional): Called with every
+                evicted chat. Defaults to None.
+            clock (Callable[[], float], optional): Returns the current time
+                in seconds. Defaults to time.monotonic.
+        """
+        self.max_chats: int = max_chats
+        self.idle_ttl: float = idle_ttl
+        self.on_evict: Callable[[Chat], None] = on_evict
+        self.clock: Callable[[], float] = clock
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.__chats: OrderedDict[int, Chat] = OrderedDict()
+        self.__accessed: dict[int, float] = {}
+
+    def get(self, user_id: int, default: Chat = None) -> Chat:
+        """
+        Returns the chat for a user and marks it as recently used.
+
+        Args:
+            user_id (int): The ID of the user.
+            default (Chat, optional): Returned if there is no chat.
+                Defaults to None.
+
+        Returns:
+            Chat: The chat if found, otherwise default.
+        """
+        if user_id in self:
+            self.hits += 1
+            return self[user_id]
+        self.misses += 1
+        return default
+
+    def values(self) -> list[Chat]:
+        """
+        Returns the chats, least recently used first, without marking
+        them as used or evicting expired ones.
+
+        Returns:
+            list[Chat]: The chats in memory.
+        """
+        return list(self.__chats.values())
+
+    def evict_expired(self) -> None:
+        """Evicts every chat that has been idle for longer than the TTL."""
+        if self.idle_ttl is None:
+            return
+        deadline: float = self.clock() - self.idle_ttl
+        for user_id in list(self.__chats):
+            if self.__accessed[user_id] > deadline:
+                break
+            if not self.__chats[user_id].busy:
+                self.__evict(user_id)
+
+    def __getitem__(self, user_id: int) -> Chat:
+        if self.__is_expired(user_id):
+            self.__evict(user_id)
+        chat: Chat = self.__chats[user_id]
+        self.__chats.move_to_end(user_id)
+        self.__accessed[user_id] = self.clock()
+        return chat
+
+    def __setitem__(self, user_id: int, chat: Chat) -> None:
+        self.__chats[user_id] = chat
+        self.__chats.move_to_end(user_id)
+        self.__accessed[user_id] = self.clock()
+        self.evict_expired()
+        if self.max_chats is None:
+            return
+        excess: int = len(self.__chats) - self.max_chats
+        for candidate in list(self.__chats):
+            if excess <= 0:
+                break
+            if candidate != user_id and not self.__chats[candidate].busy:
+                self.__evict(candidate)
+                excess -= 1
+
+    def __delitem__(self, user_id: int) -> None:
+        del self.__chats[user_id]
+        del self.__accessed[user_id]
+
+    def __contains__(self, user_id: object) -> bool:
+        if self.__is_expired(user_id):
+            self.__evict(user_id)
+        return user_id in self.__chats
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self.__chats))
+
+    def __len__(self) -> int:
+        return len(self.__chats)
+
+    def __is_expired(self, user_id: object) -> bool:
+        """Whether the user has a chat that has been idle too long and is not busy."""
+        if self.idle_ttl is None or user_id not in self.__accessed:
+            return False
+        return self.clock() - self.__accessed[user_id] >= self.idle_ttl and not self.__chats[user_id].busy
+
+    def __evict(self, user_id: int) -> None:
+        """Removes a chat and passes it to the eviction callback."""
+        chat: Chat = self.__chats.pop(user_id)
+        del self.__accessed[user_id]
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(chat)
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class RequestCoalescer:
+    """
+    Shares one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the call; callers arriving while it
+    runs wait for the same result, or the same exception, instead of
+    starting their own. A caller that is cancelled stops waiting without
+    cancelling the shared call. Once the call finishes, the key is free
+    again, so results are never reused after the fact.
+
+    Attributes:
+        calls (int): Calls actually started.
+        coalesced (int): Callers that joined a call already in flight.
+    """
+
+    def __init__(self):
+        self.calls: int = 0
+        self.coalesced: int = 0
+        self.__in_flight: dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls currently running."""
+        return len(self.__in_flight)
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs a call, or joins the one in flight for the same key.
+
+        Args:
+            key (Hashable): Identifies calls with interchangeable results.
+            function (Callable[[], Awaitable[T]]): Starts the call. It is
+                only invoked if no call for the key is in flight.
+
+        Returns:
+            T: The result of the shared call.
+        """
+        future: asyncio.Future = self.__in_flight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(function())
+            self.__in_flight[key] = future
+            future.add_done_callback(lambda done: self.__finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def __finish(self, key: Hashable, future: asyncio.Future) -> None:
+        """Frees the key and marks the outcome as retrieved."""
+        self.__in_flight.pop(key, None)
+        if not future.cancelled():
+            future.exception()
@@ -1 +1 @@
-api_url='"https://api.intelligence.io.solutions/api/v1/chat/completions"'
\ No newline at end of file
+api_url = "https://api.intelligence.io.solutions/api/v1/chat/completions"
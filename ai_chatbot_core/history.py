@@ -0,0 +1,134 @@
+from typing import Union
+
+from .types import Message, Model, StartMessage
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Union[str, bytes]) -> int:
+    """
+    Estimates the number of tokens in a string without a tokenizer.
+
+    Uses roughly four bytes of UTF-8 per token, which is close for English
+    and errs on the safe side for non-Latin scripts.
+
+    Args:
+        text (str | bytes): The text to measure, or its UTF-8 encoding.
+
+    Returns:
+        int: The estimated token count.
+    """
+    if isinstance(text, bytes):
+        size: int = len(text)
+    else:
+        size = len(text) if text.isascii() else len(text.encode("utf-8"))
+    return (size + 3) // 4
+
+
+def estimate_message_tokens(message: Message) -> int:
+    """
+    Estimates the tokens a message takes in a request, including the
+    per-message formatting overhead.
+
+    Args:
+        message (Message): The message to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class HistoryPolicy:
+    """
+    Decides which part of the chat history is sent with a request.
+
+    The base policy sends the whole history. Subclasses override select()
+    to send a subset; they must not modify the given list.
+    """
+
+    def select(self, messages: list[Message], model: Model) -> list[Message]:
+        """
+        Selects the messages to send.
+
+        Args:
+            messages (list[Message]): The full chat history, oldest first.
+            model (Model): The model the request is sent to.
+
+        Returns:
+            list[Message]: The messages to send, oldest first.
+        """
+        return list(messages)
+
+
+class FullHistory(HistoryPolicy):
+    """Sends the whole chat history with every request."""
+
+
+class SlidingWindow(HistoryPolicy):
+    """
+    Sends the start message plus the most recent messages that fit.
+
+    The window is limited by a token budget and, optionally, by a number
+    of turns, where a turn starts with a user message. The start message
+    and the latest message are always sent.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = None,
+        max_turns: int = None,
+        reserve_tokens: int = 4096,
+    ):
+        """
+        Initializes the policy.
+
+        Args:
+            max_tokens (int, optional): Token budget for the prompt. If None,
+                the model's context limit minus reserve_tokens is used.
+                Defaults to None.
+            max_turns (int, optional): Maximum number of recent turns to
+                send. If None, turns are not limited. Defaults to None.
+            reserve_tokens (int, optional): Tokens left free for the
+                completion when max_tokens is None. Defaults to 4096.
+        """
+        self.max_tokens: int = max_tokens
+        self.max_turns: int = max_turns
+        self.reserve_tokens: int = int(reserve_tokens)
+
+    def get_budget(self, model: Model) -> int:
+        """
+        Returns the prompt token budget for a model.
+
+        Args:
+            model (Model): The model the request is sent to.
+
+        Returns:
+            int: The number of tokens the prompt may use.
+        """
+        if self.max_tokens is not None:
+            return self.max_tokens
+        return max(model.context_limit - self.reserve_tokens, 0)
+
+    def select(self, messages: list[Message], model: Model) -> list[Message]:
+        if not messages:
+            return []
+        start: int = 1 if isinstance(messages[0], StartMessage) else 0
+        budget: int = self.get_budget(model)
+        if start:
+            budget -= estimate_message_tokens(messages[0])
+
+        turns: int = 0
+        first: int = len(messages)
+        for index in range(len(messages) - 1, start - 1, -1):
+            message: Message = messages[index]
+            latest: bool = first == len(messages)
+            if not latest and self.max_turns is not None and turns >= self.max_turns:
+                break
+            budget -= estimate_message_tokens(message)
+            if not latest and budget < 0:
+                break
+            first = index
+            if message.role == "user":
+                turns += 1
+        return messages[:start] + messages[first:]
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from .types import Model
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the number of upstream requests in flight.
+
+    A global limit caps all requests and optional per-model limits cap the
+    requests to each model. Waiting requests are served in arrival order.
+
+    Attributes:
+        waiting (int): Requests currently waiting for a slot.
+        in_flight (int): Requests currently holding a slot.
+        acquired (int): Total number of slots granted.
+        total_wait (float): Total seconds spent waiting for slots.
+        max_wait (float): Longest wait for a slot, in seconds.
+    """
+
+    def __init__(self, max_in_flight: int = None, per_model: dict[Model, int] = None):
+        """
+        Initializes the limiter.
+
+        Args:
+            max_in_flight (int, optional): Maximum number of requests in
+                flight in total. If None, there is no global limit.
+                Defaults to None.
+            per_model (dict[Model, int], optional): Maximum number of
+                requests in flight per model. Models not listed are not
+                limited. Defaults to None.
+        """
+        self.max_in_flight: int = max_in_flight
+        self.per_model: dict[Model, int] = dict(per_model or {})
+        self.waiting: int = 0
+        self.in_flight: int = 0
+        self.acquired: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+        self.__semaphore: asyncio.Semaphore = None
+        self.__model_semaphores: dict[Model, asyncio.Semaphore] = {}
+
+    @property
+    def average_wait(self) -> float:
+        """The average wait for a slot, in seconds."""
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+    @asynccontextmanager
+    async def acquire(self, model: Model = None) -> AsyncIterator[None]:
+        """
+        Waits for a slot for a request to a model and holds it.
+
+        The per-model slot is taken before the global one, so requests
+        waiting on a busy model do not hold global slots.
+
+        Args:
+            model (Model, optional): The model the request is sent to.
+                Defaults to None.
+        """
+        semaphores: list[asyncio.Semaphore] = self.__get_semaphores(model)
+        started: float = time.perf_counter()
+        taken: list[asyncio.Semaphore] = []
+        self.waiting += 1
+        try:
+            for semaphore in semaphores:
+                await semaphore.acquire()
+                taken.append(semaphore)
+        except BaseException:
+            for semaphore in taken:
+                semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited: float = time.perf_counter() - started
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            for semaphore in taken:
+                semaphore.release()
+
+    def __get_semaphores(self, model: Model) -> list[asyncio.Semaphore]:
+        """Returns the semaphores to take for a model, creating them lazily."""
+        semaphores: list[asyncio.Semaphore] = []
+        if model in self.per_model:
+            if model not in self.__model_semaphores:
+                self.__model_semaphores[model] = asyncio.Semaphore(self.per_model[model])
+            semaphores.append(self.__model_semaphores[model])
+        if self.max_in_flight is not None:
+            if self.__semaphore is None:
+                self.__semaphore = asyncio.Semaphore(self.max_in_flight)
+            semaphores.append(self.__semaphore)
+        return semaphores
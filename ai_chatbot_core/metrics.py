@@ -0,0 +1,386 @@
+import bisect
+import logging
+from typing import Callable
+
+from .types import Model
+
+logger = logging.getLogger("agent")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value for the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Formats a label set for the Prometheus text format."""
+    pairs: list[str] = [
+        '%s="%s"' % (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        """
+        Initializes the counter.
+
+        Args:
+            name (str): The metric name.
+            help (str): The metric description.
+            labelnames (tuple[str, ...], optional): The label names.
+                Defaults to ().
+        """
+        self.name: str = name
+        self.help: str = help
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+        self.__values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increases the counter.
+
+        Args:
+            amount (float, optional): The increase. Defaults to 1.0.
+            **labels (str): The value of every label.
+        """
+        key: tuple[str, ...] = tuple(str(labels[name]) for name in self.labelnames)
+        self.__values[key] = self.__values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Returns the value for a label set."""
+        return self.__values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def expose(self) -> list[str]:
+        """Returns the metric in the Prometheus text format, line by line."""
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.__values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Counts observations in cumulative buckets per label set."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        """
+        Initializes the histogram.
+
+        Args:
+            name (str): The metric name.
+            help (str): The metric description.
+            labelnames (tuple[str, ...], optional): The label names.
+                Defaults to ().
+            buckets (tuple[float, ...], optional): Upper bounds of the
+                buckets. Defaults to LATENCY_BUCKETS.
+        """
+        self.name: str = name
+        self.help: str = help
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets)) + (float("inf"),)
+        self.__values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Records an observation.
+
+        Args:
+            value (float): The observed value.
+            **labels (str): The value of every label.
+        """
+        key: tuple[str, ...] = tuple(str(labels[name]) for name in self.labelnames)
+        if key not in self.__values:
+            self.__values[key] = ([0] * len(self.buckets), [0.0])
+        counts, total = self.__values[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def get_count(self, **labels: str) -> int:
+        """Returns the number of observations for a label set."""
+        key: tuple[str, ...] = tuple(str(labels[name]) for name in self.labelnames)
+        return sum(self.__values[key][0]) if key in self.__values else 0
+
+    def get_sum(self, **labels: str) -> float:
+        """Returns the sum of the observations for a label set."""
+        key: tuple[str, ...] = tuple(str(labels[name]) for name in self.labelnames)
+        return self.__values[key][1][0] if key in self.__values else 0.0
+
+    def expose(self) -> list[str]:
+        """Returns the metric in the Prometheus text format, line by line."""
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.__values.items()):
+            cumulative: int = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le: str = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels: str = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    An in-process collection of metrics with Prometheus text exposition.
+
+    Metrics are created on first request and returned again for the same
+    name, so several components can share a registry.
+    """
+
+    def __init__(self):
+        self.__metrics: dict[str, object] = {}
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        """
+        Returns the counter with a name, creating it if needed.
+
+        Args:
+            name (str): The metric name.
+            help (str): The metric description.
+            labelnames (tuple[str, ...], optional): The label names.
+                Defaults to ().
+
+        Returns:
+            Counter: The counter.
+        """
+        if name not in self.__metrics:
+            self.__metrics[name] = Counter(name, help, labelnames)
+        return self.__metrics[name]
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """
+        Returns the histogram with a name, creating it if needed.
+
+        Args:
+            name (str): The metric name.
+            help (str): The metric description.
+            labelnames (tuple[str, ...], optional): The label names.
+                Defaults to ().
+            buckets (tuple[float, ...], optional): Upper bounds of the
+                buckets. Defaults to LATENCY_BUCKETS.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        if name not in self.__metrics:
+            self.__metrics[name] = Histogram(name, help, labelnames, buckets)
+        return self.__metrics[name]
+
+    def expose(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, ready to be served on a /metrics endpoint.
+        """
+        lines: list[str] = []
+        for name in sorted(self.__metrics):
+            lines.extend(self.__metrics[name].expose())
+        return "\n".join(lines) + "\n"
+
+
+class RequestEvent:
+    """
+    Measurements of one upstream request, including its retries.
+
+    The transport fills in the timing, attempts and status; the chat adds
+    the token usage and the size of the removed think content.
+
+    Attributes:
+        model (Model): The model the request was for, or None.
+        attempts (int): Number of attempts sent.
+        status (int): HTTP status of the final response, or None.
+        error (str): Name of the exception that failed the request, or None.
+        ttfb (float): Seconds from sending the final attempt until its
+            response's headers arrived.
+        latency (float): Seconds until the response was fully processed.
+        request_bytes (int): Size of the request body.
+        response_bytes (int): Size of the response body, if known.
+        prompt_tokens (int): Prompt tokens reported by the API.
+        completion_tokens (int): Completion tokens reported by the API.
+        think_chars (int): Characters of <think> content removed.
+        queue_wait (float): Seconds spent waiting for the rate limiter and
+            concurrency limiter slots, over all attempts.
+        backoff_wait (float): Seconds spent sleeping between attempts.
+    """
+
+    __slots__ = (
+        "model", "attempts", "status", "error", "ttfb", "latency", "request_bytes",
+        "response_bytes", "prompt_tokens", "completion_tokens", "think_chars",
+        "queue_wait", "backoff_wait",
+    )
+
+    def __init__(self, model: Model = None):
+        self.model: Model = model
+        self.attempts: int = 0
+        self.status: int = None
+        self.error: str = None
+        self.ttfb: float = None
+        self.latency: float = None
+        self.request_bytes: int = 0
+        self.response_bytes: int = None
+        self.prompt_tokens: int = None
+        self.completion_tokens: int = None
+        self.think_chars: int = 0
+        self.queue_wait: float = 0.0
+        self.backoff_wait: float = 0.0
+
+    @property
+    def retries(self) -> int:
+        """The number of attempts after the first one."""
+        return max(self.attempts - 1, 0)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the request got a successful response."""
+        return self.error is None and self.status == 200
+
+    def set_usage(self, usage: dict) -> None:
+        """
+        Takes the token counts from a response's usage field.
+
+        Args:
+            usage (dict): The usage object, or None.
+        """
+        if usage:
+            self.prompt_tokens = usage.get("prompt_tokens")
+            self.completion_tokens = usage.get("completion_tokens")
+
+
+class Instrumentation:
+    """
+    Receives a RequestEvent for every upstream request.
+
+    Events are recorded into an optional MetricsRegistry, labelled by
+    model, and passed to every hook. A failing hook is logged and never
+    affects the request.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = None,
+        hooks: list[Callable[[RequestEvent], None]] = None,
+        prefix: str = "ai_chatbot",
+    ):
+        """
+        Initializes the instrumentation.
+
+        Args:
+            registry (MetricsRegistry, optional): Where request metrics
+                are recorded. If None, only hooks are called.
+                Defaults to None.
+            hooks (list[Callable[[RequestEvent], None]], optional):
+                Called with every event. Defaults to None.
+            prefix (str, optional): Prefix of the metric names.
+                Defaults to "ai_chatbot".
+        """
+        self.registry: MetricsRegistry = registry
+        self.hooks: list[Callable[[RequestEvent], None]] = list(hooks or [])
+        if registry is not None:
+            self.__requests = registry.counter(
+                f"{prefix}_requests_total", "Upstream requests by final status.", ("model", "status")
+            )
+            self.__errors = registry.counter(
+                f"{prefix}_request_errors_total", "Upstream requests that failed.", ("model",)
+            )
+            self.__retries = registry.counter(
+                f"{prefix}_retries_total", "Retried upstream attempts.", ("model",)
+            )
+            self.__ttfb = registry.histogram(
+                f"{prefix}_ttfb_seconds", "Time to the first byte of the response.", ("model",)
+            )
+            self.__latency = registry.histogram(
+                f"{prefix}_latency_seconds", "Total time of upstream requests.", ("model",)
+            )
+            self.__queue_wait = registry.histogram(
+                f"{prefix}_queue_wait_seconds", "Time upstream requests waited for the limiters.", ("model",)
+            )
+            self.__backoff_wait = registry.histogram(
+                f"{prefix}_backoff_wait_seconds", "Time upstream requests slept between attempts.", ("model",)
+            )
+            self.__request_bytes = registry.counter(
+                f"{prefix}_request_bytes_total", "Bytes of request bodies sent.", ("model",)
+            )
+            self.__response_bytes = registry.counter(
+                f"{prefix}_response_bytes_total", "Bytes of response bodies with a known size.", ("model",)
+            )
+            self.__prompt_tokens = registry.counter(
+                f"{prefix}_prompt_tokens_total", "Prompt tokens reported by the API.", ("model",)
+            )
+            self.__completion_tokens = registry.counter(
+                f"{prefix}_completion_tokens_total", "Completion tokens reported by the API.", ("model",)
+            )
+            self.__think_chars = registry.counter(
+                f"{prefix}_think_chars_total", "Characters of <think> content removed.", ("model",)
+            )
+
+    def add_hook(self, hook: Callable[[RequestEvent], None]) -> None:
+        """
+        Adds a hook that is called with every event.
+
+        Args:
+            hook (Callable[[RequestEvent], None]): The hook.
+        """
+        self.hooks.append(hook)
+
+    def emit(self, event: RequestEvent) -> None:
+        """
+        Records an event and passes it to the hooks.
+
+        Args:
+            event (RequestEvent): The finished request.
+        """
+        if self.registry is not None:
+            self.__record(event)
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as error:
+                logger.error(f"Instrumentation hook failed: {error}")
+
+    def __record(self, event: RequestEvent) -> None:
+        """Updates the registry's metrics from an event."""
+        model: str = event.model.value if event.model is not None else "unknown"
+        status: str = event.error or str(event.status)
+        self.__requests.inc(model=model, status=status)
+        if not event.ok:
+            self.__errors.inc(model=model)
+        if event.retries:
+            self.__retries.inc(event.retries, model=model)
+        if event.ttfb is not None:
+            self.__ttfb.observe(event.ttfb, model=model)
+        if event.latency is not None:
+            self.__latency.observe(event.latency, model=model)
+        self.__queue_wait.observe(event.queue_wait, model=model)
+        self.__backoff_wait.observe(event.backoff_wait, model=model)
+        self.__request_bytes.inc(event.request_bytes, model=model)
+        if event.response_bytes is not None:
+            self.__response_bytes.inc(event.response_bytes, model=model)
+        if event.prompt_tokens is not None:
+            self.__prompt_tokens.inc(event.prompt_tokens, model=model)
+        if event.completion_tokens is not None:
+            self.__completion_tokens.inc(event.completion_tokens, model=model)
+        if event.think_chars:
+            self.__think_chars.inc(event.think_chars, model=model)
@@ -0,0 +1,95 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+THREADS = "threads"
+PROCESSES = "processes"
+
+
+class Offloader:
+    """
+    Runs CPU-heavy work on large payloads away from the event loop.
+
+    Payloads below the threshold are cheaper to handle inline than to
+    hand over, so callers check should_offload() first. A thread pool
+    keeps the event loop responsive because the GIL is handed back to it
+    regularly; a process pool also runs the work on other cores, at the
+    cost of copying the payload and the result between processes. The
+    pool is created on first use.
+
+    Attributes:
+        offloaded (int): Number of calls run in the pool.
+    """
+
+    def __init__(self, threshold: int = 256 * 1024, max_workers: int = None, pool: str = THREADS):
+        """
+        Initializes the offloader.
+
+        Args:
+            threshold (int, optional): Payload size in bytes from which
+                work is offloaded. Defaults to 256 KiB.
+            max_workers (int, optional): Size of the pool. If None, the
+                executor's default is used. Defaults to None.
+            pool (str, optional): THREADS or PROCESSES. Process workers
+                are spawned, so functions and arguments must be
+                picklable. Defaults to THREADS.
+        """
+        if pool not in (THREADS, PROCESSES):
+            raise ValueError(f"Unknown pool {pool!r}")
+        self.threshold: int = max(int(threshold), 0)
+        self.max_workers: int = max_workers
+        self.pool: str = pool
+        self.offloaded: int = 0
+        self.__executor: Executor = None
+
+    def should_offload(self, size: int) -> bool:
+        """
+        Returns whether work on a payload should be offloaded.
+
+        Args:
+            size (int): The payload size in bytes.
+
+        Returns:
+            bool: True if the payload is at least the threshold.
+        """
+        return size >= self.threshold
+
+    async def run(self, function: Callable, *args):
+        """
+        Runs a function in the pool and returns its result.
+
+        Args:
+            function (Callable): The function to run.
+            *args: Its arguments.
+
+        Returns:
+            The function's result.
+        """
+        if self.__executor is None:
+            self.__executor = self.__create_executor()
+        self.offloaded += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, function, *args)
+
+    def __create_executor(self) -> Executor:
+        """Creates the configured pool."""
+        if self.pool == PROCESSES:
+            return ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(self.max_workers, thread_name_prefix="offload")
+
+    @property
+    def closed(self) -> bool:
+        """Whether the pool is not running."""
+        return self.__executor is None
+
+    async def close(self) -> None:
+        """
+        Shuts the pool down, waiting on a worker thread for running calls
+        to finish. The pool is created again if used later.
+        """
+        if self.__executor is not None:
+            executor: Executor = self.__executor
+            self.__executor = None
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, executor.shutdown)
@@ -0,0 +1,393 @@
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from collections.abc import MutableSequence, Sequence
+from typing import Iterable, Iterator, Union
+
+from .serialization import dumps, loads
+from .types import Message, StartMessage
+
+OFFSET = struct.Struct("<Q")
+
+
+class HistoryFile:
+    """
+    One chat's history as an append-only JSONL file with an offset index.
+
+    The .jsonl file starts with a header line holding the model, followed
+    by one encoded message per line. The .idx file holds the byte offset
+    of every message line as a little-endian uint64, so any range of
+    messages is found without scanning. Reads go through mmap and only
+    touch the requested range.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the file pair.
+
+        Args:
+            path (str): Path of the files without extension.
+        """
+        self.path: str = str(path)
+        self.data_path: str = self.path + ".jsonl"
+        self.index_path: str = self.path + ".idx"
+
+    def exists(self) -> bool:
+        """Whether the history has been written."""
+        return os.path.exists(self.data_path) and os.path.exists(self.index_path)
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.index_path) // OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def read_model(self) -> str:
+        """Returns the model value stored in the header line."""
+        with open(self.data_path, "rb") as file:
+            return loads(file.readline())["model"]
+
+    def read(self, start: int, stop: int) -> list[Message]:
+        """
+        Reads a range of messages.
+
+        Args:
+            start (int): Index of the first message.
+            stop (int): Index after the last message.
+
+        Returns:
+            list[Message]: The messages; the first message of the history
+                is a StartMessage if it is a system message.
+        """
+        count: int = len(self)
+        stop = min(stop, count)
+        if start >= stop:
+            return []
+        with open(self.index_path, "rb") as index_file, open(self.data_path, "rb") as data_file:
+            with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                begin: int = OFFSET.unpack_from(index, start * OFFSET.size)[0]
+                end: int = OFFSET.unpack_from(index, stop * OFFSET.size)[0] if stop < count else None
+            with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                lines: list[bytes] = data[begin:end].split(b"\n", stop - start)[:stop - start]
+        messages: list[Message] = []
+        for line in lines:
+            fields: dict = loads(line)
+            messages.append(Message(fields["content"], fields["role"]))
+        if start == 0 and messages[0].role == "system":
+            messages[0] = StartMessage(messages[0].content)
+        return messages
+
+    def write(self, model: str, messages: Iterable[Message]) -> None:
+        """
+        Replaces the history.
+
+        Args:
+            model (str): The model value for the header line.
+            messages (Iterable[Message]): The full history.
+        """
+        data: list[bytes] = [dumps({"model": model}) + b"\n"]
+        offsets: list[bytes] = []
+        position: int = len(data[0])
+        for message in messages:
+            line: bytes = message.to_json() + b"\n"
+            offsets.append(OFFSET.pack(position))
+            data.append(line)
+            position += len(line)
+        for path, content in ((self.data_path, data), (self.index_path, offsets)):
+            with open(path + ".tmp", "wb") as file:
+                file.writelines(content)
+            os.replace(path + ".tmp", path)
+
+    def append(self, messages: Iterable[Message]) -> None:
+        """
+        Appends messages to an existing history.
+
+        Args:
+            messages (Iterable[Message]): The new messages, oldest first.
+        """
+        if not self.exists():
+            return
+        with open(self.data_path, "ab") as data, open(self.index_path, "ab") as index:
+            position: int = data.seek(0, os.SEEK_END)
+            offsets: list[bytes] = []
+            lines: list[bytes] = []
+            for message in messages:
+                line: bytes = message.to_json() + b"\n"
+                offsets.append(OFFSET.pack(position))
+                lines.append(line)
+                position += len(line)
+            data.writelines(lines)
+            index.writelines(offsets)
+
+    def remove_last(self, count: int = 1) -> None:
+        """
+        Removes the newest messages.
+
+        Args:
+            count (int, optional): Number of messages to remove.
+                Defaults to 1.
+        """
+        total: int = len(self)
+        keep: int = max(total - count, 0)
+        if keep == total:
+            return
+        with open(self.index_path, "r+b") as index, open(self.data_path, "r+b") as data:
+            index.seek(keep * OFFSET.size)
+            data.truncate(OFFSET.unpack(index.read(OFFSET.size))[0])
+            index.truncate(keep * OFFSET.size)
+
+    def delete(self) -> None:
+        """Deletes the history files if they exist."""
+        for path in (self.data_path, self.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class FrozenHistory(Sequence):
+    """
+    A point-in-time copy of a PagedHistory that leaves its paged range
+    in the file.
+
+    The resident ends are held as shallow copies; the paged messages are
+    read from the HistoryFile a page at a time while iterating, so the
+    copy is cheap to take and iterating it, e.g. on a worker thread,
+    never holds the whole history in memory.
+    """
+
+    def __init__(self, source: HistoryFile, head: list[Message], cold: int, tail: list[Message], page_size: int):
+        """
+        Initializes the copy.
+
+        Args:
+            source (HistoryFile): The file holding the paged messages.
+            head (list[Message]): The first message, if resident.
+            cold (int): Index after the last paged message.
+            tail (list[Message]): The messages from cold on.
+            page_size (int): Number of messages read at a time.
+        """
+        self.source: HistoryFile = source
+        self.__head: list[Message] = head
+        self.__cold: int = cold
+        self.__tail: list[Message] = tail
+        self.__page_size: int = page_size
+
+    def __len__(self) -> int:
+        return self.__cold + len(self.__tail)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, list[Message]]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index < len(self.__head):
+            return self.__head[index]
+        if index >= self.__cold:
+            return self.__tail[index - self.__cold]
+        return self.source.read(index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[Message]:
+        yield from self.__head
+        for start in range(len(self.__head), self.__cold, self.__page_size):
+            yield from self.source.read(start, min(start + self.__page_size, self.__cold))
+        yield from self.__tail
+
+
+class PagedHistory(MutableSequence):
+    """
+    A list-like chat history that keeps only its ends in memory.
+
+    The first message (normally the start message) and a hot tail of
+    recent messages are resident. Older messages stay in the HistoryFile
+    and are read in pages on first access, keeping a few pages in an LRU.
+    New messages are appended to the tail, so chat turns and rollbacks
+    work as with a list while touching only the recent end. A slice
+    running to the end, which is how history policies select the recent
+    window, moves its range into the tail, so the window is read once
+    and not paged in again on every turn. Once the file holds every
+    message, spill() hands the messages older than both the tail size
+    and the last window back to the paged range. Changes that reach into
+    the paged range load the whole history into memory first.
+
+    Attributes:
+        page_loads (int): Number of pages read from the file.
+    """
+
+    def __init__(self, source: HistoryFile, tail_size: int = 64, page_size: int = 256, max_pages: int = 4):
+        """
+        Initializes the history and reads its first message and tail.
+
+        Args:
+            source (HistoryFile): The file holding the stored history.
+            tail_size (int, optional): Number of recent messages read
+                into memory up front. Defaults to 64.
+            page_size (int, optional): Number of messages read per page.
+                Defaults to 256.
+            max_pages (int, optional): Number of pages kept in memory.
+                Defaults to 4.
+        """
+        self.source: HistoryFile = source
+        self.tail_size: int = max(int(tail_size), 0)
+        self.page_size: int = max(int(page_size), 1)
+        self.max_pages: int = max(int(max_pages), 1)
+        self.page_loads: int = 0
+        count: int = len(source)
+        self.__head: list[Message] = source.read(0, 1)
+        self.__cold: int = max(len(self.__head), count - self.tail_size)
+        self.__tail: list[Message] = source.read(self.__cold, count)
+        self.__pages: OrderedDict[int, list[Message]] = OrderedDict()
+        self.__window: int = None
+
+    @property
+    def resident(self) -> int:
+        """The number of messages currently held in memory."""
+        return len(self.__head) + len(self.__tail) + sum(len(page) for page in self.__pages.values())
+
+    def __len__(self) -> int:
+        return self.__cold + len(self.__tail)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, list[Message]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and stop == len(self):
+                self.__window = start
+            if step == 1 and stop == len(self) and start < self.__cold:
+                self.__extend_tail(start)
+                return self.__head[start:] + self.__tail
+            if step == 1 and start >= self.__cold:
+                return self.__tail[start - self.__cold:stop - self.__cold]
+            return [self[position] for position in range(start, stop, step)]
+        index = self.__normalize(index)
+        if index == 0 and self.__head:
+            return self.__head[0]
+        if index >= self.__cold:
+            return self.__tail[index - self.__cold]
+        number: int = index // self.page_size
+        return self.__get_page(number)[index - max(number * self.page_size, 1)]
+
+    def __setitem__(self, index: Union[int, slice], value) -> None:
+        if not isinstance(index, slice):
+            index = self.__normalize(index)
+            if index == 0 and self.__head:
+                self.__head[0] = value
+                return
+            if index >= self.__cold:
+                self.__tail[index - self.__cold] = value
+                return
+        self.__materialize()
+        self.__tail[index] = value
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        if not isinstance(index, slice):
+            index = self.__normalize(index)
+            if index >= self.__cold:
+                del self.__tail[index - self.__cold]
+                return
+            if index == len(self) - 1:
+                self.__cold -= 1
+                if index == 0:
+                    self.__head.clear()
+                return
+        self.__materialize()
+        del self.__tail[index]
+
+    def insert(self, index: int, value: Message) -> None:
+        if index < 0:
+            index = max(index + len(self), 0)
+        if index >= self.__cold:
+            self.__tail.insert(max(index - self.__cold, 0), value)
+            return
+        self.__materialize()
+        self.__tail.insert(index, value)
+
+    def append(self, value: Message) -> None:
+        self.__tail.append(value)
+
+    def clear(self) -> None:
+        self.__head.clear()
+        self.__tail.clear()
+        self.__pages.clear()
+        self.__cold = 0
+
+    def freeze(self) -> FrozenHistory:
+        """
+        Returns a copy of the history as it is now. Only the resident
+        ends are copied; the paged messages are read from the file when
+        the copy is iterated, which may happen on another thread.
+
+        Returns:
+            FrozenHistory: The copy.
+        """
+        return FrozenHistory(self.source, list(self.__head), self.__cold, list(self.__tail), self.page_size)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, PagedHistory)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PagedHistory({len(self)} messages, {self.resident} resident)"
+
+    def __normalize(self, index: int) -> int:
+        """Turns a negative index into a positive one and checks bounds."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return index
+
+    def __get_page(self, number: int) -> list[Message]:
+        """Returns a page of paged messages, reading it if needed."""
+        page: list[Message] = self.__pages.get(number)
+        if page is None:
+            page = self.source.read(max(number * self.page_size, 1), min((number + 1) * self.page_size, self.__cold))
+            self.page_loads += 1
+            self.__pages[number] = page
+            while len(self.__pages) > self.max_pages:
+                self.__pages.popitem(last=False)
+        else:
+            self.__pages.move_to_end(number)
+        return page
+
+    def spill(self) -> None:
+        """
+        Drops the resident messages older than both the last tail_size
+        messages and the last window sliced off the end, keeping the
+        message just before the window, which window policies look at to
+        decide where to stop. Dropped messages and cached pages are read
+        from the file again when needed. Only call this while the file holds every
+        message, e.g. right after the storage's writes were flushed.
+        """
+        self.__pages.clear()
+        keep: int = min(len(self) - self.tail_size, len(self.source))
+        if self.__window is not None:
+            keep = min(keep, self.__window - 1)
+        if keep <= self.__cold:
+            return
+        if not self.__cold:
+            self.__head = [self.__tail.pop(0)]
+            self.__cold = 1
+        del self.__tail[:keep - self.__cold]
+        self.__cold = keep
+
+    def __extend_tail(self, start: int) -> None:
+        """Reads the paged messages from start on into the tail."""
+        start = max(start, len(self.__head))
+        if start >= self.__cold:
+            return
+        self.__tail = self.source.read(start, self.__cold) + self.__tail
+        self.page_loads += 1
+        self.__cold = start
+
+    def __materialize(self) -> None:
+        """Moves every message into the in-memory tail."""
+        if self.__cold:
+            messages: list[Message] = list(self)
+            self.__head.clear()
+            self.__pages.clear()
+            self.__tail = messages
+            self.__cold = 0
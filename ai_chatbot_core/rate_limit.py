@@ -0,0 +1,164 @@
+import asyncio
+import time
+from typing import Callable
+
+from .types import Model
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously up to its capacity.
+
+    Reservations are taken immediately and may drive the level below zero;
+    the caller then waits until the debt is repaid. This serves waiters in
+    order and needs no background task.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens, i.e. the burst size.
+            clock (Callable[[], float], optional): Returns the current time
+                in seconds. Defaults to time.monotonic.
+        """
+        self.rate: float = float(rate)
+        self.capacity: float = float(capacity)
+        self.clock: Callable[[], float] = clock
+        self.level: float = self.capacity
+        self.__updated: float = clock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes tokens from the bucket.
+
+        Args:
+            amount (float): Number of tokens to take.
+
+        Returns:
+            float: Seconds to wait before the tokens may be used.
+        """
+        now: float = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.__updated) * self.rate)
+        self.__updated = now
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RateLimit:
+    """
+    Request and token quotas per minute.
+
+    Attributes:
+        requests_per_minute (float): Allowed requests per minute, or None.
+        tokens_per_minute (float): Allowed estimated tokens per minute,
+            or None.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        """
+        Initializes the quotas. A quota of None is not limited.
+
+        Args:
+            requests_per_minute (float, optional): Allowed requests per
+                minute. Defaults to None.
+            tokens_per_minute (float, optional): Allowed estimated tokens
+                per minute. Defaults to None.
+        """
+        self.requests_per_minute: float = requests_per_minute
+        self.tokens_per_minute: float = tokens_per_minute
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter keyed by API key and model.
+
+    Each (API key, model) pair gets its own request and token buckets,
+    refilled at the configured per-minute rates with a burst of one
+    minute's quota. acquire() waits until both budgets allow the request,
+    smoothing bursts locally instead of running into 429 responses.
+
+    Attributes:
+        waits (int): Number of requests that had to wait.
+        total_wait (float): Total seconds requests were delayed.
+    """
+
+    def __init__(
+        self,
+        default: RateLimit = None,
+        per_model: dict[Model, RateLimit] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the limiter.
+
+        Args:
+            default (RateLimit, optional): Quotas for models that have no
+                entry in per_model. If None, they are not limited.
+                Defaults to None.
+            per_model (dict[Model, RateLimit], optional): Quotas per model.
+                Defaults to None.
+            clock (Callable[[], float], optional): Returns the current time
+                in seconds. Defaults to time.monotonic.
+        """
+        self.default: RateLimit = default
+        self.per_model: dict[Model, RateLimit] = dict(per_model or {})
+        self.clock: Callable[[], float] = clock
+        self.waits: int = 0
+        self.total_wait: float = 0.0
+        self.__buckets: dict[tuple[str, Model], tuple[TokenBucket, TokenBucket]] = {}
+
+    def reserve(self, api_key: str, model: Model = None, tokens: int = 0) -> float:
+        """
+        Reserves one request and an estimated number of tokens.
+
+        Args:
+            api_key (str): The API key the request is sent with.
+            model (Model, optional): The model the request is for.
+                Defaults to None.
+            tokens (int, optional): Estimated tokens of the request.
+                Defaults to 0.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        requests, token_bucket = self.__get_buckets(api_key, model)
+        delay: float = 0.0
+        if requests is not None:
+            delay = requests.reserve(1)
+        if token_bucket is not None and tokens:
+            delay = max(delay, token_bucket.reserve(tokens))
+        return delay
+
+    async def acquire(self, api_key: str, model: Model = None, tokens: int = 0) -> None:
+        """
+        Waits until a request fits into the quotas.
+
+        Args:
+            api_key (str): The API key the request is sent with.
+            model (Model, optional): The model the request is for.
+                Defaults to None.
+            tokens (int, optional): Estimated tokens of the request.
+                Defaults to 0.
+        """
+        delay: float = self.reserve(api_key, model, tokens)
+        if delay > 0:
+            self.waits += 1
+            self.total_wait += delay
+            await asyncio.sleep(delay)
+
+    def __get_buckets(self, api_key: str, model: Model) -> tuple[TokenBucket, TokenBucket]:
+        """Returns the request and token buckets for a key and model."""
+        key: tuple[str, Model] = (api_key, model)
+        if key not in self.__buckets:
+            limit: RateLimit = self.per_model.get(model, self.default)
+            requests: TokenBucket = None
+            tokens: TokenBucket = None
+            if limit is not None and limit.requests_per_minute:
+                requests = TokenBucket(limit.requests_per_minute / 60, limit.requests_per_minute, self.clock)
+            if limit is not None and limit.tokens_per_minute:
+                tokens = TokenBucket(limit.tokens_per_minute / 60, limit.tokens_per_minute, self.clock)
+            self.__buckets[key] = (requests, tokens)
+        return self.__buckets[key]
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+
+RETRY_STATUSES = frozenset({408, 429, 502, 503, 504})
+
+
+def get_retry_errors() -> tuple[type, ...]:
+    """
+    Returns the exception types that are retried.
+
+    aiohttp is imported here rather than at module level, so importing
+    the package does not pay for it before the first request.
+
+    Returns:
+        tuple[type, ...]: Connection errors and timeouts.
+    """
+    import aiohttp
+
+    return (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+
+def __getattr__(name: str):
+    if name == "RETRY_ERRORS":
+        return get_retry_errors()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    Parses a Retry-After header.
+
+    Args:
+        value (str): The header value, either seconds or an HTTP date.
+
+    Returns:
+        float: The number of seconds to wait, or None if the value
+            is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed upstream request is retried.
+
+    Only failures that are safe to repeat are retried: connection errors,
+    timeouts and the statuses in retry_statuses (rate limiting and
+    gateway errors). Delays grow exponentially with full jitter, and a
+    Retry-After header from the server takes precedence.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: bool = True,
+        retry_statuses: frozenset[int] = RETRY_STATUSES,
+    ):
+        """
+        Initializes the policy.
+
+        Args:
+            max_attempts (int, optional): Total number of attempts,
+                including the first one. Defaults to 3.
+            base_delay (float, optional): Delay before the first retry, in
+                seconds; doubled for every further retry. Defaults to 0.5.
+            max_delay (float, optional): Longest delay, in seconds. A
+                Retry-After longer than this ends retrying. Defaults to 30.0.
+            jitter (bool, optional): Whether to pick a random delay between
+                zero and the exponential delay. Defaults to True.
+            retry_statuses (frozenset[int], optional): HTTP statuses that
+                are retried. Defaults to RETRY_STATUSES.
+        """
+        self.max_attempts: int = max(int(max_attempts), 1)
+        self.base_delay: float = float(base_delay)
+        self.max_delay: float = float(max_delay)
+        self.jitter: bool = bool(jitter)
+        self.retry_statuses: frozenset[int] = frozenset(retry_statuses)
+
+    def is_retryable(self, status: int = None, error: BaseException = None) -> bool:
+        """
+        Checks whether a failure may be retried.
+
+        Args:
+            status (int, optional): The HTTP status of the response.
+                Defaults to None.
+            error (BaseException, optional): The exception raised by the
+                request. Defaults to None.
+
+        Returns:
+            bool: True if the failure is safe to retry.
+        """
+        if error is not None:
+            return isinstance(error, get_retry_errors())
+        return status in self.retry_statuses
+
+    def get_delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Returns the delay before the next attempt.
+
+        Args:
+            attempt (int): The number of the attempt that failed, from 1.
+            retry_after (float, optional): The delay requested by the
+                server, in seconds. Defaults to None.
+
+        Returns:
+            float: The delay in seconds, or None if no attempts are
+                left or the server asks to wait longer than max_delay.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        delay: float = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return random.uniform(0, delay) if self.jitter else delay
@@ -0,0 +1,216 @@
+import time
+from typing import Callable, Iterable, Union
+
+from .metrics import RequestEvent
+from .types import Model
+
+# Errors of attempts that were abandoned rather than failed, e.g. the
+# slower side of a hedged request. They say nothing about the model.
+ABANDONED = frozenset({"CancelledError", "GeneratorExit"})
+
+
+class Route:
+    """
+    A model the router may use, in preference order.
+
+    Attributes:
+        model (Model): The model.
+        max_tokens (int): Largest estimated request, in tokens, the model
+            is preferred for, or None for no limit besides its context.
+    """
+
+    __slots__ = ("model", "max_tokens")
+
+    def __init__(self, model: Model, max_tokens: int = None):
+        self.model: Model = model
+        self.max_tokens: int = max_tokens
+
+    def accepts(self, tokens: int) -> bool:
+        """Whether a request of the given size fits the route."""
+        if self.max_tokens is not None and tokens > self.max_tokens:
+            return False
+        return tokens <= self.model.context_limit
+
+
+class ModelStats:
+    """
+    Rolling latency and error rate of one model.
+
+    Both are exponentially weighted moving averages, so recent requests
+    count most. The latency is the time to the first response byte,
+    which is what a waiting user notices first.
+
+    Attributes:
+        requests (int): Number of finished requests observed.
+        errors (int): Number of those that failed.
+        latency (float): Average seconds to the first byte, or None.
+        error_rate (float): Average share of failed requests.
+        updated (float): Clock time of the last observation, or None.
+    """
+
+    __slots__ = ("requests", "errors", "latency", "error_rate", "updated")
+
+    def __init__(self):
+        self.requests: int = 0
+        self.errors: int = 0
+        self.latency: float = None
+        self.error_rate: float = 0.0
+        self.updated: float = None
+
+    def record(self, ok: bool, latency: float, alpha: float, now: float) -> None:
+        """
+        Adds a finished request to the averages.
+
+        Args:
+            ok (bool): Whether the request succeeded.
+            latency (float): Seconds to the first byte, or None if unknown.
+            alpha (float): Weight of the new observation.
+            now (float): The current clock time.
+        """
+        self.requests += 1
+        self.errors += not ok
+        self.error_rate += alpha * ((not ok) - self.error_rate)
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + alpha * (latency - self.latency)
+        self.updated = now
+
+
+class ModelRouter:
+    """
+    Picks the model for each request from a preference list.
+
+    Routes are considered in order; a route is skipped if the request is
+    larger than its max_tokens or its model's context. Of the remaining
+    models, healthy ones keep their preference order and come first,
+    followed by unhealthy ones from the lowest error rate and latency. A
+    model is unhealthy while its rolling error rate or latency is above
+    the limits; statistics older than stale_after are ignored, so an
+    avoided model is tried again later.
+
+    Chats use the first model and fall back to the next one when a
+    request fails. With a hedge_delay, a request that has not produced
+    a response (or, when streaming, its first piece of text) within the
+    delay is raced against the next model, and whichever answers first
+    is used. The router observes the outcome of every request it routes.
+
+    Attributes:
+        hedges (int): Number of backup requests started after the delay.
+        fallbacks (int): Number of requests retried on another model
+            after a failure.
+        backup_wins (int): Number of requests answered by a model other
+            than the first choice.
+    """
+
+    def __init__(
+        self,
+        routes: Iterable[Union[Route, Model]],
+        hedge_delay: float = None,
+        max_error_rate: float = 0.5,
+        max_latency: float = None,
+        alpha: float = 0.2,
+        stale_after: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the router.
+
+        Args:
+            routes (Iterable[Route | Model]): The models in preference
+                order; a bare Model is a Route without a size limit.
+            hedge_delay (float, optional): Seconds to wait for the first
+                model before also asking the next one. If None, requests
+                are not hedged. Defaults to None.
+            max_error_rate (float, optional): Rolling error rate above
+                which a model is unhealthy. Defaults to 0.5.
+            max_latency (float, optional): Rolling seconds to first byte
+                above which a model is unhealthy. If None, latency does
+                not affect health. Defaults to None.
+            alpha (float, optional): Weight of each new observation in the
+                rolling averages. Defaults to 0.2.
+            stale_after (float, optional): Seconds after which a model's
+                statistics are ignored. Defaults to 60.0.
+            clock (Callable[[], float], optional): Returns the current time
+                in seconds. Defaults to time.monotonic.
+        """
+        self.routes: list[Route] = [route if isinstance(route, Route) else Route(route) for route in routes]
+        if not self.routes:
+            raise ValueError("A router needs at least one route")
+        self.hedge_delay: float = hedge_delay
+        self.max_error_rate: float = float(max_error_rate)
+        self.max_latency: float = max_latency
+        self.alpha: float = float(alpha)
+        self.stale_after: float = float(stale_after)
+        self.clock: Callable[[], float] = clock
+        self.hedges: int = 0
+        self.fallbacks: int = 0
+        self.backup_wins: int = 0
+        self.__stats: dict[Model, ModelStats] = {}
+
+    def get_stats(self, model: Model) -> ModelStats:
+        """
+        Returns the statistics of a model.
+
+        Args:
+            model (Model): The model.
+
+        Returns:
+            ModelStats: Its statistics, empty if it was never used.
+        """
+        stats: ModelStats = self.__stats.get(model)
+        if stats is None:
+            stats = self.__stats[model] = ModelStats()
+        return stats
+
+    def is_healthy(self, model: Model) -> bool:
+        """
+        Whether a model's recent requests are within the limits.
+
+        Args:
+            model (Model): The model.
+
+        Returns:
+            bool: True if the model may be preferred.
+        """
+        stats: ModelStats = self.__stats.get(model)
+        if stats is None or stats.updated is None or self.clock() - stats.updated > self.stale_after:
+            return True
+        if stats.error_rate > self.max_error_rate:
+            return False
+        return self.max_latency is None or stats.latency is None or stats.latency <= self.max_latency
+
+    def select(self, tokens: int) -> list[Model]:
+        """
+        Returns the models to try for a request, best first.
+
+        Args:
+            tokens (int): The estimated size of the request in tokens.
+
+        Returns:
+            list[Model]: The candidate models without duplicates. If no
+                route accepts the request, all routes are candidates.
+        """
+        models: list[Model] = []
+        for route in self.routes:
+            if route.accepts(tokens) and route.model not in models:
+                models.append(route.model)
+        if not models:
+            models = list(dict.fromkeys(route.model for route in self.routes))
+        healthy: list[Model] = [model for model in models if self.is_healthy(model)]
+        unhealthy: list[Model] = [model for model in models if model not in healthy]
+        unhealthy.sort(key=lambda model: (self.__stats[model].error_rate, self.__stats[model].latency or 0.0))
+        return healthy + unhealthy
+
+    def observe(self, event: RequestEvent) -> None:
+        """
+        Records the outcome of a request. Abandoned requests, such as the
+        losing side of a hedge, are ignored.
+
+        Args:
+            event (RequestEvent): The finished request.
+        """
+        if event.model is None or event.error in ABANDONED:
+            return
+        latency: float = event.ttfb
+        if latency is None and event.latency is not None:
+            latency = max(event.latency - event.queue_wait - event.backoff_wait, 0.0)
+        self.get_stats(event.model).record(event.ok, latency, self.alpha, self.clock())
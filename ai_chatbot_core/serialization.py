@@ -0,0 +1,42 @@
+import json
+from typing import Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND: str = "json" if orjson is None else "orjson"
+
+
+def dumps(obj) -> bytes:
+    """
+    Serializes an object to compact UTF-8 JSON.
+
+    Uses orjson when it is installed and the standard library otherwise.
+
+    Args:
+        obj: The object to serialize.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]):
+    """
+    Deserializes a JSON document.
+
+    Args:
+        data (bytes | str): The JSON document.
+
+    Returns:
+        The deserialized object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
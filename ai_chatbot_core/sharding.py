@@ -0,0 +1,442 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import socket
+import struct
+from typing import AsyncIterator, Callable
+
+from .chat_maneger import ChatManager
+from .serialization import dumps, loads
+
+logger = logging.getLogger("agent")
+
+FRAME = struct.Struct(">I")
+
+
+class ShardError(Exception):
+    """Raised when a shard fails a call or is not running."""
+
+
+def shard_for(user_id: int, shards: int) -> int:
+    """
+    Returns the shard that owns a user, by jump consistent hashing.
+
+    The result only depends on the user ID and the number of shards, so
+    every process agrees on it, and growing from N to N + 1 shards moves
+    only about 1 / (N + 1) of the users.
+
+    Args:
+        user_id (int): The ID of the user.
+        shards (int): The number of shards.
+
+    Returns:
+        int: The shard index, from 0 to shards - 1.
+    """
+    key: int = int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), "little")
+    bucket: int = -1
+    candidate: int = 0
+    while candidate < shards:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    """Reads one length-prefixed JSON frame."""
+    header: bytes = await reader.readexactly(FRAME.size)
+    return loads(await reader.readexactly(FRAME.unpack(header)[0]))
+
+
+def encode_frame(message: dict) -> bytes:
+    """Encodes a message as a length-prefixed JSON frame."""
+    body: bytes = dumps(message)
+    return FRAME.pack(len(body)) + body
+
+
+class ShardServer:
+    """
+    Serves RPC calls for one shard inside its worker process.
+
+    Calls for different users run concurrently on the shard's
+    ChatManager. Calls for the same user run one after another in the
+    order they arrived, so every user sees their messages answered in
+    order even while their chat is still being loaded.
+    """
+
+    def __init__(self, manager: ChatManager, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Initializes the server.
+
+        Args:
+            manager (ChatManager): The shard's chat manager.
+            reader (asyncio.StreamReader): Receives calls from the front-end.
+            writer (asyncio.StreamWriter): Sends results to the front-end.
+        """
+        self.manager: ChatManager = manager
+        self.reader: asyncio.StreamReader = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.__tails: dict[int, asyncio.Task] = {}
+        self.__write_lock: asyncio.Lock = asyncio.Lock()
+
+    async def serve(self) -> None:
+        """Serves calls until the front-end closes the connection."""
+        while True:
+            try:
+                call: dict = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            user_id: int = call["user_id"]
+            task: asyncio.Task = asyncio.ensure_future(self.__handle(call, self.__tails.get(user_id)))
+            self.__tails[user_id] = task
+            task.add_done_callback(lambda task, user_id=user_id: self.__forget(user_id, task))
+        if self.__tails:
+            await asyncio.gather(*self.__tails.values(), return_exceptions=True)
+
+    def __forget(self, user_id: int, task: asyncio.Task) -> None:
+        """Drops the finished tail task of a user."""
+        if self.__tails.get(user_id) is task:
+            del self.__tails[user_id]
+
+    async def __handle(self, call: dict, previous: asyncio.Task) -> None:
+        """Runs one call after the previous call of the same user."""
+        if previous is not None:
+            await asyncio.wait([previous])
+        call_id: int = call["id"]
+        try:
+            result = await self.__run(call_id, call["method"], call["user_id"], call.get("content"))
+        except Exception as error:
+            await self.__send({"id": call_id, "error": str(error), "type": type(error).__name__})
+        else:
+            await self.__send({"id": call_id, "result": result})
+
+    async def __run(self, call_id: int, method: str, user_id: int, content: str):
+        """Runs a call against the manager and returns its result."""
+        if method == "get_response":
+            chat = await self.manager.connect_chat(user_id)
+            return await chat.get_response(content)
+        if method == "stream_response":
+            chat = await self.manager.connect_chat(user_id)
+            async for chunk in chat.stream_response(content):
+                await self.__send({"id": call_id, "chunk": chunk})
+            return None
+        if method == "get_messages":
+            chat = await self.manager.get_chat(user_id)
+            return [] if chat is None else [message.get_content() for message in chat.messages]
+        if method == "clear_chat":
+            chat = await self.manager.get_chat(user_id)
+            if chat is not None:
+                await chat.clear_chat()
+            return None
+        if method == "remove_chat":
+            await self.manager.remove_chat(user_id)
+            return None
+        raise ValueError(f"Unknown method {method!r}")
+
+    async def __send(self, message: dict) -> None:
+        """Sends a frame to the front-end."""
+        async with self.__write_lock:
+            self.writer.write(encode_frame(message))
+            await self.writer.drain()
+
+
+async def serve_shard(factory: Callable[[], ChatManager], sock: socket.socket) -> None:
+    """
+    Runs a shard's ChatManager and serves calls over a socket.
+
+    Args:
+        factory (Callable[[], ChatManager]): Creates the shard's manager.
+        sock (socket.socket): The worker's end of the connection.
+    """
+    reader, writer = await asyncio.open_connection(sock=sock)
+    try:
+        async with factory() as manager:
+            await ShardServer(manager, reader, writer).serve()
+    finally:
+        writer.close()
+
+
+def run_shard(factory: Callable[[], ChatManager], sock: socket.socket) -> None:
+    """The entry point of a worker process."""
+    asyncio.run(serve_shard(factory, sock))
+
+
+class Shard:
+    """
+    The front-end's connection to one worker process.
+
+    Calls are multiplexed over a single socket; a background task routes
+    every result frame to the call waiting for it.
+    """
+
+    def __init__(self, index: int, process: multiprocessing.process.BaseProcess, sock: socket.socket):
+        """
+        Initializes the connection. It is opened by start().
+
+        Args:
+            index (int): The index of the shard.
+            process (BaseProcess): The started worker process.
+            sock (socket.socket): The front-end's end of the connection.
+        """
+        self.index: int = index
+        self.process: multiprocessing.process.BaseProcess = process
+        self.__sock: socket.socket = sock
+        self.__writer: asyncio.StreamWriter = None
+        self.__reader_task: asyncio.Task = None
+        self.__calls: dict[int, asyncio.Queue] = {}
+        self.__next_id: int = 0
+        self.__write_lock: asyncio.Lock = None
+        self.__error: ShardError = None
+
+    async def start(self) -> None:
+        """Opens the connection and starts routing results."""
+        reader, self.__writer = await asyncio.open_connection(sock=self.__sock)
+        self.__write_lock = asyncio.Lock()
+        self.__reader_task = asyncio.ensure_future(self.__route(reader))
+
+    async def call(self, method: str, user_id: int, content: str = None):
+        """
+        Runs a call on the shard and returns its result.
+
+        Raises:
+            ShardError: If the call failed or the shard is gone.
+        """
+        result = None
+        async for frame in self.__call(method, user_id, content):
+            result = frame.get("result")
+        return result
+
+    async def stream(self, method: str, user_id: int, content: str = None) -> AsyncIterator[str]:
+        """
+        Runs a streaming call on the shard and yields its chunks.
+
+        Raises:
+            ShardError: If the call failed or the shard is gone.
+        """
+        async for frame in self.__call(method, user_id, content):
+            if "chunk" in frame:
+                yield frame["chunk"]
+
+    async def __call(self, method: str, user_id: int, content: str) -> AsyncIterator[dict]:
+        """Sends a call and yields its frames up to the final result."""
+        if self.__error is not None:
+            raise self.__error
+        self.__next_id += 1
+        call_id: int = self.__next_id
+        queue: asyncio.Queue = asyncio.Queue()
+        self.__calls[call_id] = queue
+        try:
+            async with self.__write_lock:
+                self.__writer.write(encode_frame({
+                    "id": call_id,
+                    "method": method,
+                    "user_id": user_id,
+                    "content": content,
+                }))
+                await self.__writer.drain()
+            while True:
+                frame = await queue.get()
+                if isinstance(frame, ShardError):
+                    raise frame
+                if "error" in frame:
+                    raise ShardError(f"{frame['type']}: {frame['error']}")
+                yield frame
+                if "chunk" not in frame:
+                    return
+        finally:
+            self.__calls.pop(call_id, None)
+
+    async def __route(self, reader: asyncio.StreamReader) -> None:
+        """Passes result frames to their calls until the worker exits."""
+        try:
+            while True:
+                frame: dict = await read_frame(reader)
+                queue: asyncio.Queue = self.__calls.get(frame["id"])
+                if queue is not None:
+                    queue.put_nowait(frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.__error = ShardError(f"Shard {self.index} has stopped")
+        for queue in self.__calls.values():
+            queue.put_nowait(self.__error)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Closes the connection and waits for the worker to finish its
+        calls and exit, terminating it after the timeout.
+        """
+        if self.__writer is not None:
+            self.__writer.close()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.process.join, timeout)
+        if self.process.is_alive():
+            logger.error(f"Shard {self.index} did not stop, terminating it")
+            self.process.terminate()
+            await loop.run_in_executor(None, self.process.join)
+        if self.__reader_task is not None:
+            await self.__reader_task
+
+
+class ShardedChatManager:
+    """
+    Spreads chats over several worker processes, each running its own
+    ChatManager and transport, so encoding, decoding and think stripping
+    use more than one core.
+
+    Every user is owned by one shard, picked by consistent hashing of the
+    user ID, and the shard answers that user's messages in arrival
+    order. The front-end talks to the workers over local socket pairs
+    with length-prefixed JSON frames. Use it as an async context manager
+    to start and stop the workers.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], ChatManager],
+        shards: int = None,
+        start_method: str = "spawn",
+    ):
+        """
+        Initializes the manager. The workers are started by start().
+
+        Args:
+            factory (Callable[[], ChatManager]): Creates the ChatManager of
+                a shard inside its worker, e.g.
+                functools.partial(ChatManager, api_key, model=...). It
+                must be picklable, so it is usually a class or a
+                module-level function.
+            shards (int, optional): The number of worker processes. If
+                None, one per CPU. Defaults to None.
+            start_method (str, optional): The multiprocessing start
+                method. "spawn" keeps workers from inheriting the
+                front-end's event loop. Defaults to "spawn".
+        """
+        self.factory: Callable[[], ChatManager] = factory
+        self.shards: int = max(int(shards or os.cpu_count() or 1), 1)
+        self.start_method: str = start_method
+        self.__shards: list[Shard] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether the workers are running."""
+        return bool(self.__shards)
+
+    def shard_for(self, user_id: int) -> int:
+        """
+        Returns the index of the shard that owns a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The shard index.
+        """
+        return shard_for(user_id, self.shards)
+
+    async def start(self) -> None:
+        """Starts the worker processes and connects to them."""
+        if self.running:
+            return
+        context = multiprocessing.get_context(self.start_method)
+        for index in range(self.shards):
+            parent, child = socket.socketpair()
+            process = context.Process(
+                target=run_shard,
+                args=(self.factory, child),
+                name=f"ai_chatbot_shard_{index}",
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            shard = Shard(index, process, parent)
+            await shard.start()
+            self.__shards.append(shard)
+
+    async def get_response(self, user_id: int, content: str) -> str:
+        """
+        Gets a response for a user's message from the user's shard.
+
+        Args:
+            user_id (int): The ID of the user; the chat is created if needed.
+            content (str): The content of the user's message.
+
+        Returns:
+            str: The AI's response or an error message, as returned by
+                Chat.get_response.
+
+        Raises:
+            ShardError: If the shard failed or is not running.
+        """
+        return await self.__get_shard(user_id).call("get_response", user_id, content)
+
+    async def stream_response(self, user_id: int, content: str) -> AsyncIterator[str]:
+        """
+        Streams a response for a user's message from the user's shard.
+
+        Args:
+            user_id (int): The ID of the user; the chat is created if needed.
+            content (str): The content of the user's message.
+
+        Yields:
+            str: Pieces of the AI's response, as yielded by
+                Chat.stream_response.
+
+        Raises:
+            ShardError: If the shard failed or is not running.
+        """
+        async for chunk in self.__get_shard(user_id).stream("stream_response", user_id, content):
+            yield chunk
+
+    async def get_messages(self, user_id: int) -> list[dict]:
+        """
+        Returns a user's full chat history.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list[dict]: The role and content of every message, or an
+                empty list if the user has no chat.
+        """
+        return await self.__get_shard(user_id).call("get_messages", user_id)
+
+    async def clear_chat(self, user_id: int) -> None:
+        """
+        Clears a user's chat history, if the user has a chat.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        await self.__get_shard(user_id).call("clear_chat", user_id)
+
+    async def remove_chat(self, user_id: int) -> None:
+        """
+        Removes a user's chat from its shard and the shard's storage.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        await self.__get_shard(user_id).call("remove_chat", user_id)
+
+    def __get_shard(self, user_id: int) -> Shard:
+        """Returns the running shard that owns a user."""
+        if not self.running:
+            raise ShardError("The shards are not running")
+        return self.__shards[self.shard_for(user_id)]
+
+    async def close(self) -> None:
+        """
+        Stops the workers. Each worker finishes the calls it has received
+        and closes its ChatManager before exiting.
+        """
+        shards, self.__shards = self.__shards, []
+        await asyncio.gather(*(shard.close() for shard in shards))
+
+    async def __aenter__(self) -> "ShardedChatManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
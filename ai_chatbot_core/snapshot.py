@@ -0,0 +1,230 @@
+import mmap
+from typing import BinaryIO, Iterable, Iterator, Sequence
+
+from .types import Message, StartMessage
+
+MAGIC = b"AICS"
+VERSION = 1
+
+END = 0
+CHAT = 1
+
+# A string reference is a varint: LITERAL is followed by a string that is
+# used once, DEFINE by a string that is added to the table, and any larger
+# value v refers to table entry v - TABLE.
+LITERAL = 0
+DEFINE = 1
+TABLE = 2
+
+_SMALL_VARINTS: list[bytes] = [bytes((value,)) for value in range(128)]
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is not valid."""
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    Encodes a non-negative integer as a LEB128 varint.
+
+    Args:
+        value (int): The integer.
+
+    Returns:
+        bytes: The encoded integer.
+    """
+    if value < 128:
+        return _SMALL_VARINTS[value]
+    out = bytearray()
+    while value >= 128:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class SnapshotWriter:
+    """
+    Writes chats to a snapshot stream one at a time.
+
+    Roles, model names and system messages are interned: each distinct
+    value is written once and referred to by number afterwards, so a
+    start message shared by many chats costs a byte or two per chat.
+    """
+
+    def __init__(self, file: BinaryIO):
+        """
+        Initializes the writer and writes the header.
+
+        Args:
+            file (BinaryIO): The binary stream to write to.
+        """
+        self.file: BinaryIO = file
+        self.chats: int = 0
+        self.messages: int = 0
+        self.__table: dict[str, bytes] = {}
+        file.write(MAGIC + bytes((VERSION,)))
+
+    def write_chat(self, user_id: int, model: str, messages: Sequence[Message]) -> None:
+        """
+        Writes one chat.
+
+        Args:
+            user_id (int): The ID of the user.
+            model (str): The chat's model value.
+            messages (Sequence[Message]): The chat history.
+        """
+        out = bytearray((CHAT,))
+        out += encode_varint(user_id * 2 if user_id >= 0 else -user_id * 2 - 1)
+        self.__write_interned(out, model)
+        out += encode_varint(len(messages))
+        for message in messages:
+            role: str = message.role
+            self.__write_interned(out, role)
+            if role == "system":
+                self.__write_interned(out, message.content)
+            else:
+                content: bytes = message.content.encode("utf-8")
+                out += _SMALL_VARINTS[LITERAL]
+                out += encode_varint(len(content))
+                out += content
+        self.file.write(out)
+        self.chats += 1
+        self.messages += len(messages)
+
+    def close(self) -> None:
+        """Writes the end marker. The stream itself is not closed."""
+        self.file.write(bytes((END,)))
+
+    def __write_interned(self, out: bytearray, value: str) -> None:
+        """Appends a reference to an interned string, defining it if new."""
+        reference: bytes = self.__table.get(value)
+        if reference is not None:
+            out += reference
+            return
+        encoded: bytes = value.encode("utf-8")
+        out += _SMALL_VARINTS[DEFINE]
+        out += encode_varint(len(encoded))
+        out += encoded
+        self.__table[value] = encode_varint(len(self.__table) + TABLE)
+
+
+def write_snapshot(path: str, chats: Iterable[tuple[int, str, Sequence[Message]]]) -> tuple[int, int]:
+    """
+    Writes chats to a snapshot file.
+
+    Chats are encoded and written one by one through a buffered file,
+    so the whole snapshot is never held in memory.
+
+    Args:
+        path (str): Path of the snapshot file.
+        chats (Iterable[tuple[int, str, Sequence[Message]]]): The user ID,
+            model value and messages of every chat.
+
+    Returns:
+        tuple[int, int]: The number of chats and messages written.
+    """
+    with open(path, "wb", buffering=1 << 20) as file:
+        writer = SnapshotWriter(file)
+        for user_id, model, messages in chats:
+            writer.write_chat(user_id, model, messages)
+        writer.close()
+    return writer.chats, writer.messages
+
+
+def read_snapshot(path: str) -> Iterator[tuple[int, str, list[Message]]]:
+    """
+    Reads the chats of a snapshot file one at a time.
+
+    The file is memory-mapped and decoded in place. System messages
+    come back as shared objects, one per distinct content, and the first
+    one of each chat as a StartMessage.
+
+    Args:
+        path (str): Path of the snapshot file.
+
+    Yields:
+        tuple[int, str, list[Message]]: The user ID, model value and
+            messages of every chat.
+
+    Raises:
+        SnapshotError: If the file is not a snapshot of a known version
+            or is truncated.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        try:
+            yield from _read_chats(view)
+        except IndexError:
+            raise SnapshotError("Truncated snapshot") from None
+        finally:
+            view.release()
+
+
+def _read_chats(view: memoryview) -> Iterator[tuple[int, str, list[Message]]]:
+    """Decodes the chats of a snapshot held in a memoryview."""
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise SnapshotError("Not a chat snapshot")
+    if view[len(MAGIC)] != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {view[len(MAGIC)]}")
+    position: int = len(MAGIC) + 1
+    strings: list[str] = []
+    start_messages: dict[str, StartMessage] = {}
+    system_messages: dict[str, Message] = {}
+
+    def read_varint() -> int:
+        nonlocal position
+        byte: int = view[position]
+        position += 1
+        if byte < 128:
+            return byte
+        value: int = byte & 0x7F
+        shift: int = 7
+        while True:
+            byte = view[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 128:
+                return value
+            shift += 7
+
+    def read_string() -> str:
+        nonlocal position
+        reference: int = read_varint()
+        if reference >= TABLE:
+            return strings[reference - TABLE]
+        size: int = read_varint()
+        end: int = position + size
+        if end > len(view):
+            raise IndexError
+        value: str = str(view[position:end], "utf-8")
+        position = end
+        if reference == DEFINE:
+            strings.append(value)
+        return value
+
+    while True:
+        tag: int = view[position]
+        position += 1
+        if tag == END:
+            return
+        if tag != CHAT:
+            raise SnapshotError(f"Unknown record type {tag}")
+        encoded_id: int = read_varint()
+        user_id: int = encoded_id // 2 if encoded_id % 2 == 0 else -(encoded_id + 1) // 2
+        model: str = read_string()
+        messages: list[Message] = []
+        for index in range(read_varint()):
+            role: str = read_string()
+            content: str = read_string()
+            if role != "system":
+                messages.append(Message(content, role))
+            elif index == 0:
+                if content not in start_messages:
+                    start_messages[content] = StartMessage(content)
+                messages.append(start_messages[content])
+            else:
+                if content not in system_messages:
+                    system_messages[content] = Message(content, role)
+                messages.append(system_messages[content])
+        yield user_id, model, messages
@@ -0,0 +1,400 @@
+import asyncio
+import os
+import sqlite3
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from .paged_history import HistoryFile, PagedHistory
+from .types import Message, Model, StartMessage
+
+
+class ChatStorage:
+    """
+    Base class for storing chat histories outside of the process memory.
+
+    ChatManager loads chats through load() when they are not in memory,
+    saves new chats with save(), and each chat appends its new messages
+    with append(). Subclasses implement the storage methods.
+    """
+
+    async def load(self, user_id: int) -> tuple[Model, list[Message]]:
+        """
+        Loads a stored chat.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            tuple[Model, list[Message]]: The chat's model and
+                messages, or None if nothing is stored for the user.
+        """
+        raise NotImplementedError
+
+    async def save(self, user_id: int, model: Model, messages: list[Message]) -> None:
+        """
+        Stores a whole chat, replacing anything stored for the user.
+
+        Args:
+            user_id (int): The ID of the user.
+            model (Model): The chat's model.
+            messages (list[Message]): The full chat history.
+        """
+        raise NotImplementedError
+
+    async def append(self, user_id: int, messages: list[Message]) -> None:
+        """
+        Appends messages to a stored chat.
+
+        Args:
+            user_id (int): The ID of the user.
+            messages (list[Message]): The new messages, oldest first.
+        """
+        raise NotImplementedError
+
+    async def remove_last(self, user_id: int, count: int = 1) -> None:
+        """
+        Removes the newest messages of a stored chat.
+
+        Args:
+            user_id (int): The ID of the user.
+            count (int, optional): Number of messages to remove.
+                Defaults to 1.
+        """
+        raise NotImplementedError
+
+    async def delete(self, user_id: int) -> None:
+        """
+        Deletes a stored chat if it exists.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        """Writes out any buffered changes."""
+
+    async def close(self) -> None:
+        """Flushes buffered changes and releases resources."""
+        await self.flush()
+
+
+class MemoryStorage(ChatStorage):
+    """
+    Keeps chat histories in a dict in the current process.
+
+    Chats evicted from ChatManager's memory can be reloaded from here,
+    but nothing survives a restart. Since every chat stays in the dict,
+    the manager's max_chats and idle_ttl no longer bound memory use, so
+    this storage is opt-in. Messages are shared, not copied.
+    """
+
+    def __init__(self):
+        self.__chats: dict[int, tuple[Model, list[Message]]] = {}
+
+    async def load(self, user_id: int) -> tuple[Model, list[Message]]:
+        if user_id not in self.__chats:
+            return None
+        model, messages = self.__chats[user_id]
+        return model, list(messages)
+
+    async def save(self, user_id: int, model: Model, messages: list[Message]) -> None:
+        self.__chats[user_id] = (model, list(messages))
+
+    async def append(self, user_id: int, messages: list[Message]) -> None:
+        if user_id in self.__chats:
+            self.__chats[user_id][1].extend(messages)
+
+    async def remove_last(self, user_id: int, count: int = 1) -> None:
+        if user_id in self.__chats:
+            del self.__chats[user_id][1][-count:]
+
+    async def delete(self, user_id: int) -> None:
+        self.__chats.pop(user_id, None)
+
+
+class BufferedStorage(ChatStorage):
+    """
+    Base class for storages that buffer writes and run them in order on a
+    dedicated thread, so the event loop never waits on disk I/O.
+
+    Writes are flushed in one batch when batch_size of them are buffered,
+    or flush_interval seconds after the first one. Subclasses buffer
+    writes with _buffer(), run them in _write() and run reads on the same
+    thread with _run(), after a flush, so reads always see earlier writes.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.05, thread_name: str = "storage"):
+        """
+        Initializes the write buffer.
+
+        Args:
+            batch_size (int, optional): Number of buffered writes that
+                triggers an immediate flush. Defaults to 100.
+            flush_interval (float, optional): Seconds after the first
+                buffered write when the buffer is flushed. Defaults to 0.05.
+            thread_name (str, optional): Name prefix of the storage
+                thread. Defaults to "storage".
+        """
+        self.batch_size: int = int(batch_size)
+        self.flush_interval: float = float(flush_interval)
+        self._pending: list = []
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name)
+        self.__flush_task: asyncio.Task = None
+
+    async def flush(self) -> None:
+        if self.__flush_task is not None and self.__flush_task is not asyncio.current_task():
+            self.__flush_task.cancel()
+        self.__flush_task = None
+        if self._pending:
+            pending, self._pending = self._pending, []
+            await self._run(self._write, pending)
+            self._flushed()
+
+    async def close(self) -> None:
+        await self.flush()
+        await self._run(self._release)
+        self.__executor.shutdown(wait=False)
+
+    async def _buffer(self, *writes) -> None:
+        """Buffers writes and flushes now if the buffer is full, otherwise after the interval."""
+        self._pending.extend(writes)
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self.__flush_task is None:
+            self.__flush_task = asyncio.ensure_future(self.__delayed_flush())
+
+    async def __delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def _run(self, function, *args):
+        """Runs a function on the storage thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, function, *args)
+
+    def _write(self, pending: list) -> None:
+        """Runs a batch of buffered writes on the storage thread."""
+        raise NotImplementedError
+
+    def _flushed(self) -> None:
+        """Called on the event loop after a batch of writes was run."""
+
+    def _release(self) -> None:
+        """Releases resources on the storage thread when the storage is closed."""
+
+
+class SQLiteStorage(BufferedStorage):
+    """
+    Stores chat histories in an SQLite database.
+
+    The database runs in WAL mode so several worker processes on one host
+    can share it. Messages are append-only rows. Writes are buffered and
+    flushed in one transaction per batch on a dedicated thread, so the
+    event loop never waits on disk I/O.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 0.05):
+        """
+        Initializes the storage. The database is opened on first use.
+
+        Args:
+            path (str): Path of the database file.
+            batch_size (int, optional): Number of buffered writes that
+                triggers an immediate flush. Defaults to 100.
+            flush_interval (float, optional): Seconds after the first
+                buffered write when the buffer is flushed. Defaults to 0.05.
+        """
+        super().__init__(batch_size, flush_interval, "sqlite-storage")
+        self.path: str = str(path)
+        self.__connection: sqlite3.Connection = None
+
+    async def load(self, user_id: int) -> tuple[Model, list[Message]]:
+        await self.flush()
+        return await self._run(self.__load, user_id)
+
+    async def save(self, user_id: int, model: Model, messages: list[Message]) -> None:
+        await self._buffer(
+            ("DELETE FROM messages WHERE user_id = ?", (user_id,)),
+            ("INSERT OR REPLACE INTO chats (user_id, model) VALUES (?, ?)", (user_id, model.value)),
+            *self.__get_inserts(user_id, messages),
+        )
+
+    async def append(self, user_id: int, messages: list[Message]) -> None:
+        await self._buffer(*self.__get_inserts(user_id, messages))
+
+    async def remove_last(self, user_id: int, count: int = 1) -> None:
+        await self._buffer((
+            "DELETE FROM messages WHERE id IN "
+            "(SELECT id FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+            (user_id, count),
+        ))
+
+    async def delete(self, user_id: int) -> None:
+        await self._buffer(
+            ("DELETE FROM messages WHERE user_id = ?", (user_id,)),
+            ("DELETE FROM chats WHERE user_id = ?", (user_id,)),
+        )
+
+    @staticmethod
+    def __get_inserts(user_id: int, messages: list[Message]) -> list[tuple[str, tuple]]:
+        """Returns the writes inserting message rows."""
+        return [
+            ("INSERT INTO messages (user_id, role, content) VALUES (?, ?, ?)", (user_id, message.role, message.content))
+            for message in messages
+        ]
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens the database and creates the schema if needed."""
+        if self.__connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chats (
+                    user_id INTEGER PRIMARY KEY,
+                    model TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS messages_user_id ON messages (user_id, id);
+                """
+            )
+            self.__connection = connection
+        return self.__connection
+
+    def _write(self, pending: list[tuple[str, tuple]]) -> None:
+        """Executes buffered writes in one transaction."""
+        connection: sqlite3.Connection = self.__connect()
+        with connection:
+            index: int = 0
+            while index < len(pending):
+                sql: str = pending[index][0]
+                end: int = index
+                while end < len(pending) and pending[end][0] == sql:
+                    end += 1
+                connection.executemany(sql, [params for _, params in pending[index:end]])
+                index = end
+
+    def __load(self, user_id: int) -> tuple[Model, list[Message]]:
+        """Reads a chat and its messages."""
+        connection: sqlite3.Connection = self.__connect()
+        row = connection.execute("SELECT model FROM chats WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        rows = connection.execute(
+            "SELECT role, content FROM messages WHERE user_id = ? ORDER BY id", (user_id,)
+        ).fetchall()
+        messages: list[Message] = [Message(content, role) for role, content in rows]
+        if messages and messages[0].role == "system":
+            messages[0] = StartMessage(messages[0].content)
+        return Model(row[0]), messages
+
+    def _release(self) -> None:
+        """Closes the database connection."""
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+
+class JSONLStorage(BufferedStorage):
+    """
+    Stores each chat history as an append-only JSONL file with an offset
+    index, and loads chats lazily.
+
+    load() returns a PagedHistory that reads only the start message and
+    the most recent messages; older messages are paged in through mmap
+    when something asks for them. Writes are buffered and run in order
+    on a dedicated thread, like SQLiteStorage's.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        tail_size: int = 64,
+        page_size: int = 256,
+        max_pages: int = 4,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+    ):
+        """
+        Initializes the storage.
+
+        Args:
+            directory (str): Directory of the history files. It is created
+                if needed.
+            tail_size (int, optional): Number of recent messages a loaded
+                chat keeps in memory. Defaults to 64.
+            page_size (int, optional): Number of older messages read per
+                page. Defaults to 256.
+            max_pages (int, optional): Number of pages a loaded chat keeps
+                in memory. Defaults to 4.
+            batch_size (int, optional): Number of buffered writes that
+                triggers an immediate flush. Defaults to 100.
+            flush_interval (float, optional): Seconds after the first
+                buffered write when the buffer is flushed. Defaults to 0.05.
+        """
+        super().__init__(batch_size, flush_interval, "jsonl-storage")
+        self.directory: str = str(directory)
+        self.tail_size: int = int(tail_size)
+        self.page_size: int = int(page_size)
+        self.max_pages: int = int(max_pages)
+        os.makedirs(self.directory, exist_ok=True)
+        self.__histories: weakref.WeakValueDictionary[str, PagedHistory] = weakref.WeakValueDictionary()
+
+    def get_file(self, user_id: int) -> HistoryFile:
+        """
+        Returns the history file of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            HistoryFile: The user's history file.
+        """
+        return HistoryFile(os.path.join(self.directory, str(int(user_id))))
+
+    async def load(self, user_id: int) -> tuple[Model, list[Message]]:
+        await self.flush()
+        stored = await self._run(self.__load, user_id)
+        if stored is not None:
+            self.__histories[stored[1].source.path] = stored[1]
+        return stored
+
+    async def save(self, user_id: int, model: Model, messages: list[Message]) -> None:
+        await self._buffer((self.get_file(user_id).write, (model.value, list(messages))))
+
+    async def append(self, user_id: int, messages: list[Message]) -> None:
+        await self._buffer((self.get_file(user_id).append, (list(messages),)))
+
+    async def remove_last(self, user_id: int, count: int = 1) -> None:
+        await self._buffer((self.get_file(user_id).remove_last, (count,)))
+
+    async def delete(self, user_id: int) -> None:
+        await self._buffer((self.get_file(user_id).delete, ()))
+
+    def _write(self, pending: list[tuple[Callable, tuple]]) -> None:
+        """Runs buffered writes in order."""
+        for function, args in pending:
+            function(*args)
+
+    def _flushed(self) -> None:
+        """Lets loaded histories without pending writes spill their old messages."""
+        pending: set[str] = {function.__self__.path for function, _ in self._pending}
+        for path, history in list(self.__histories.items()):
+            if path not in pending:
+                history.spill()
+
+    def __load(self, user_id: int) -> tuple[Model, list[Message]]:
+        """Opens a stored chat as a paged history."""
+        history_file: HistoryFile = self.get_file(user_id)
+        if not history_file.exists():
+            return None
+        messages = PagedHistory(history_file, self.tail_size, self.page_size, self.max_pages)
+        return Model(history_file.read_model()), messages
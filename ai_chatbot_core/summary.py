@@ -0,0 +1,104 @@
+from .history import estimate_message_tokens
+from .serialization import dumps
+from .types import Message, Model, StartMessage
+
+SUMMARY_PROMPT = (
+    "Summarize the following conversation between a user and an assistant. "
+    "Keep every fact, name, decision and open question needed to continue "
+    "it. Reply with the summary only."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+class Summarizer:
+    """
+    Decides when and how a chat's oldest turns are compressed into a summary.
+
+    Once the history exceeds threshold_tokens, everything between the
+    start message and the most recent keep_turns turns, including an
+    earlier summary, is replaced by one system message summarizing it.
+    The chat sends the summary request and swaps the result in; see
+    Chat.summarize.
+    """
+
+    def __init__(
+        self,
+        threshold_tokens: int = 4096,
+        keep_turns: int = 4,
+        model: Model = None,
+        prompt: str = SUMMARY_PROMPT,
+    ):
+        """
+        Initializes the summarizer.
+
+        Args:
+            threshold_tokens (int, optional): Estimated history size in
+                tokens above which the history is summarized.
+                Defaults to 4096.
+            keep_turns (int, optional): Number of recent turns kept
+                verbatim. Defaults to 4.
+            model (Model, optional): The model that writes the summary,
+                e.g. a cheaper one. If None, the chat's model is used.
+                Defaults to None.
+            prompt (str, optional): Instructions for the summary.
+                Defaults to SUMMARY_PROMPT.
+        """
+        self.threshold_tokens: int = int(threshold_tokens)
+        self.keep_turns: int = max(int(keep_turns), 1)
+        self.model: Model = model
+        self.prompt: str = str(prompt)
+
+    def get_cut(self, messages: list[Message]) -> int:
+        """
+        Finds the end of the part of the history to summarize.
+
+        Args:
+            messages (list[Message]): The full chat history, oldest first.
+
+        Returns:
+            int: The index of the first message kept verbatim, or 0 if the
+                history is below the threshold or too short to summarize.
+        """
+        if sum(estimate_message_tokens(message) for message in messages) <= self.threshold_tokens:
+            return 0
+        start: int = 1 if messages and isinstance(messages[0], StartMessage) else 0
+        turns: int = 0
+        for index in range(len(messages) - 1, start, -1):
+            if messages[index].role == "user":
+                turns += 1
+                if turns == self.keep_turns:
+                    return index if index - start >= 2 else 0
+        return 0
+
+    def get_payload(self, messages: list[Message], model: Model) -> bytes:
+        """
+        Builds the request body asking for a summary of messages.
+
+        Args:
+            messages (list[Message]): The messages to summarize.
+            model (Model): The chat's model, used if no model is set.
+
+        Returns:
+            bytes: The request body.
+        """
+        transcript: str = "\n\n".join(f"{message.role}: {message.content}" for message in messages)
+        return dumps({
+            "model": (self.model or model).value,
+            "messages": [
+                {"role": "system", "content": self.prompt},
+                {"role": "user", "content": transcript},
+            ],
+        })
+
+    @staticmethod
+    def get_message(summary: str) -> Message:
+        """
+        Wraps a summary into the system message that replaces the old turns.
+
+        Args:
+            summary (str): The summary written by the model.
+
+        Returns:
+            Message: The summary message.
+        """
+        return Message(SUMMARY_PREFIX + summary, "system")
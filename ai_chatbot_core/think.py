@@ -0,0 +1,101 @@
+from typing import Callable
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+
+def _partial_tag_length(text: str, tag: str, start: int) -> int:
+    """
+    Returns the length of the longest suffix of text[start:] that is a
+    proper prefix of tag, i.e. a tag that may be completed by the next chunk.
+    """
+    for length in range(min(len(tag) - 1, len(text) - start), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class ThinkFilter:
+    """
+    Removes <think> blocks from text that arrives in chunks.
+
+    Feed chunks in order with feed() and call flush() at the end. Only a
+    possibly incomplete tag (a few characters) is held back between chunks,
+    so tags split across chunk boundaries are handled without buffering
+    the whole completion. Think content is never kept: it is counted and,
+    if a sink is given, passed to it piece by piece. A <think> block that
+    is never closed hides everything after its opening tag.
+    """
+
+    def __init__(self, sink: Callable[[str], None] = None):
+        """
+        Initializes the filter outside of any <think> block.
+
+        Args:
+            sink (Callable[[str], None], optional): Called with each piece
+                of think content as it is discarded. Defaults to None.
+        """
+        self.sink: Callable[[str], None] = sink
+        self.think_chars: int = 0
+        self.__inside: bool = False
+        self.__pending: str = ""
+
+    @property
+    def inside(self) -> bool:
+        """Whether the filter is currently inside a <think> block."""
+        return self.__inside
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consumes the next chunk of text.
+
+        Args:
+            chunk (str): The next piece of the completion.
+
+        Returns:
+            str: The visible text that can be emitted so far.
+        """
+        text: str = self.__pending + chunk
+        self.__pending = ""
+        visible: list[str] = []
+        position: int = 0
+        while True:
+            tag: str = CLOSE_TAG if self.__inside else OPEN_TAG
+            index: int = text.find(tag, position)
+            if index == -1:
+                end: int = len(text) - _partial_tag_length(text, tag, position)
+                if self.__inside:
+                    self.__discard(text[position:end])
+                else:
+                    visible.append(text[position:end])
+                self.__pending = text[end:]
+                break
+            if self.__inside:
+                self.__discard(text[position:index])
+            else:
+                visible.append(text[position:index])
+            position = index + len(tag)
+            self.__inside = not self.__inside
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """
+        Ends the stream and returns any text still held back.
+
+        Returns:
+            str: The remaining visible text.
+        """
+        pending: str = self.__pending
+        self.__pending = ""
+        if self.__inside:
+            self.__inside = False
+            self.__discard(pending)
+            return ""
+        return pending
+
+    def __discard(self, text: str) -> None:
+        """Counts think content and passes it to the sink."""
+        if text:
+            self.think_chars += len(text)
+            if self.sink is not None:
+                self.sink(text)
@@ -0,0 +1,301 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator
+
+from .backends import Backend, BackendPool
+from .history import estimate_tokens
+from .limiter import ConcurrencyLimiter
+from .metrics import Instrumentation, RequestEvent
+from .rate_limit import RateLimiter
+from .retry import RetryPolicy, parse_retry_after
+from .types import Model
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class Transport:
+    """
+    Shared HTTP transport for talking to the AI API.
+
+    Keeps one long-lived aiohttp session with a keep-alive connection
+    pool, so consecutive requests reuse open TCP/TLS connections and
+    cached DNS lookups instead of paying for a new handshake per message.
+    A single transport is meant to be shared by many chats.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+        limiter: ConcurrencyLimiter = None,
+        retry: RetryPolicy = None,
+        timeout: "aiohttp.ClientTimeout" = None,
+        rate_limiter: RateLimiter = None,
+        backends: BackendPool = None,
+        instrumentation: Instrumentation = None,
+    ):
+        """
+        Initializes the transport. The session itself is created lazily
+        on first use, inside the running event loop.
+
+        Args:
+            limit (int, optional): Total number of simultaneous connections
+                in the pool. 0 means no limit. Defaults to 100.
+            limit_per_host (int, optional): Number of simultaneous
+                connections to a single host. 0 means no limit.
+                Defaults to 0.
+            keepalive_timeout (float, optional): How long, in seconds, an
+                idle connection is kept open for reuse. Defaults to 30.0.
+            ttl_dns_cache (int, optional): How long, in seconds, resolved
+                DNS entries are cached. Defaults to 300.
+            limiter (ConcurrencyLimiter, optional): Limits the number of
+                requests in flight. If None, requests are not limited.
+                Defaults to None.
+            retry (RetryPolicy, optional): Decides which failed requests
+                are retried. If None, a default RetryPolicy is used.
+                Defaults to None.
+            timeout (aiohttp.ClientTimeout, optional): Timeout applied to
+                each attempt. If None, aiohttp's default is used.
+                Defaults to None.
+            rate_limiter (RateLimiter, optional): Request and token quotas
+                checked before each attempt. If None, requests are not
+                rate limited. Defaults to None.
+            backends (BackendPool, optional): Endpoints and API keys to
+                spread requests over. If None, every request goes to the
+                URL and key it was made with. Defaults to None.
+            instrumentation (Instrumentation, optional): Receives the
+                measurements of every request. Defaults to None.
+        """
+        self.limit: int = int(limit)
+        self.limit_per_host: int = int(limit_per_host)
+        self.keepalive_timeout: float = float(keepalive_timeout)
+        self.ttl_dns_cache: int = int(ttl_dns_cache)
+        self.limiter: ConcurrencyLimiter = limiter
+        self.retry: RetryPolicy = RetryPolicy() if retry is None else retry
+        self.timeout: "aiohttp.ClientTimeout" = timeout
+        self.rate_limiter: RateLimiter = rate_limiter
+        self.backends: BackendPool = backends
+        self.instrumentation: Instrumentation = instrumentation
+        self.__session: "aiohttp.ClientSession" = None
+
+    @property
+    def closed(self) -> bool:
+        """Whether the transport has no open session."""
+        return self.__session is None or self.__session.closed
+
+    async def get_session(self) -> "aiohttp.ClientSession":
+        """
+        Returns the shared session, creating it on first use.
+
+        aiohttp itself is imported here, on the first request, so that
+        importing the package stays cheap.
+
+        Returns:
+            aiohttp.ClientSession: The long-lived client session.
+        """
+        if self.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.ttl_dns_cache,
+            )
+            self.__session = aiohttp.ClientSession(connector=connector)
+        return self.__session
+
+    @asynccontextmanager
+    async def request(
+        self,
+        url: str,
+        api_key: str,
+        data: bytes,
+        model: Model = None,
+        event: RequestEvent = None,
+    ) -> AsyncIterator["aiohttp.ClientResponse"]:
+        """
+        Sends a POST request with a JSON body and yields the response.
+
+        With a backend pool, each attempt goes to a backend picked by the
+        pool instead of the given URL and key, and a failed attempt is
+        retried right away on another available backend. This includes
+        statuses the pool counts as backend failures (401, 403, 429 and
+        5xx) even if the retry policy would not retry them. Every attempt
+        first waits for the rate limiter, using the body size as the token
+        estimate, and then for a concurrency limiter slot. Connection
+        errors, timeouts and retryable statuses are retried according to
+        the retry policy, waiting between attempts without holding a
+        limiter slot. The last response is yielded whatever its status;
+        the last error is raised if no attempt got a response.
+
+        The request is measured until the caller leaves the context, so
+        the latency includes reading the body, and the measurements are
+        passed to the instrumentation, if any. The time to the first byte
+        is measured from sending the final attempt; time spent waiting for
+        the limiters and between attempts is reported separately.
+
+        Args:
+            url (str): The URL to post to.
+            api_key (str): The API key to authorize with.
+            data (bytes): The encoded JSON request body.
+            model (Model, optional): The model the request is for, used by
+                the limiters. Defaults to None.
+            event (RequestEvent, optional): Collects the measurements; the
+                caller may add to it while processing the response. If
+                None, a new event is used. Defaults to None.
+
+        Yields:
+            aiohttp.ClientResponse: The response.
+        """
+        if event is None:
+            event = RequestEvent(model)
+        event.request_bytes = len(data)
+        started: float = time.perf_counter()
+        try:
+            async with self.__send(url, api_key, data, model, event) as response:
+                yield response
+        except BaseException as error:
+            if event.error is None:
+                event.error = type(error).__name__
+            raise
+        finally:
+            event.latency = time.perf_counter() - started
+            if self.instrumentation is not None:
+                self.instrumentation.emit(event)
+
+    @asynccontextmanager
+    async def __send(
+        self,
+        url: str,
+        api_key: str,
+        data: bytes,
+        model: Model,
+        event: RequestEvent,
+    ) -> AsyncIterator["aiohttp.ClientResponse"]:
+        """Runs the attempts of a request and yields the final response."""
+        tried: list[Backend] = []
+        attempt: int = 0
+        while True:
+            attempt += 1
+            event.attempts = attempt
+            backend: Backend = None
+            if self.backends is not None:
+                backend = self.backends.select(tried)
+                tried.append(backend)
+                url, api_key = backend.url, backend.api_key
+            queued: float = time.perf_counter()
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(api_key, model, estimate_tokens(data))
+            async with AsyncExitStack() as stack:
+                if self.limiter is not None:
+                    await stack.enter_async_context(self.limiter.acquire(model))
+                sent: float = time.perf_counter()
+                event.queue_wait += sent - queued
+                if backend is not None:
+                    backend.in_flight += 1
+                    backend.requests += 1
+                    stack.callback(self.__release, backend)
+                session: "aiohttp.ClientSession" = await self.get_session()
+                try:
+                    response: "aiohttp.ClientResponse" = await stack.enter_async_context(
+                        session.post(
+                            url,
+                            headers=self.get_headers(api_key),
+                            data=data,
+                            **self.__get_options(),
+                        )
+                    )
+                except Exception as error:
+                    if backend is not None:
+                        self.backends.report(backend)
+                    delay: float = None
+                    if self.retry.is_retryable(error=error):
+                        delay = self.__get_delay(attempt, tried)
+                    if delay is None:
+                        raise
+                else:
+                    delay = None
+                    retryable: bool = self.retry.is_retryable(status=response.status)
+                    if backend is not None or retryable:
+                        retry_after: float = None
+                        if retryable or response.status == 429:
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if backend is not None:
+                            self.backends.report(backend, response.status, retry_after)
+                        if retryable:
+                            delay = self.__get_delay(attempt, tried, retry_after)
+                        elif backend is not None and self.backends.is_failure(response.status):
+                            delay = self.__get_failover_delay(attempt, tried)
+                    if delay is None:
+                        event.status = response.status
+                        event.ttfb = time.perf_counter() - sent
+                        event.response_bytes = response.content_length
+                        yield response
+                        return
+            if delay:
+                event.backoff_wait += delay
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def get_headers(api_key: str) -> dict[str, str]:
+        """
+        Returns the HTTP headers for a request to the AI API.
+
+        Args:
+            api_key (str): The API key to authorize with.
+
+        Returns:
+            dict[str, str]: The request headers.
+        """
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+
+    def __get_delay(self, attempt: int, tried: list[Backend], retry_after: float = None) -> float:
+        """
+        Returns the delay before the next attempt, or None to give up.
+        Failing over to another available backend needs no delay.
+        """
+        if attempt >= self.retry.max_attempts:
+            return None
+        if self.backends is not None and self.backends.has_alternative(tried):
+            return 0.0
+        return self.retry.get_delay(attempt, retry_after)
+
+    def __get_failover_delay(self, attempt: int, tried: list[Backend]) -> float:
+        """
+        Returns the delay before trying another backend after a status
+        that is not worth retrying on the same backend, such as a revoked
+        key, or None if no other backend is available.
+        """
+        if attempt >= self.retry.max_attempts or not self.backends.has_alternative(tried):
+            return None
+        return 0.0
+
+    @staticmethod
+    def __release(backend: Backend) -> None:
+        """Marks a request to a backend as finished."""
+        backend.in_flight -= 1
+
+    def __get_options(self) -> dict:
+        """Returns the keyword arguments for a single request attempt."""
+        return {} if self.timeout is None else {"timeout": self.timeout}
+
+    async def close(self) -> None:
+        """Closes the session and all pooled connections."""
+        if not self.closed:
+            await self.__session.close()
+        self.__session = None
+
+    async def __aenter__(self) -> "Transport":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
@@ -1,5 +1,8 @@
+import sys
 from enum import Enum
 
+from .serialization import dumps
+
 
 class Model(Enum):
     """
@@ -61,16 +64,67 @@ class Model(Enum):
         "ibm-granite/granite-3.1-8b-instruct"
     )
 
+    @property
+    def context_limit(self) -> int:
+        """
+        The size of the model's context window in tokens.
+
+        Returns:
+            int: The context limit, or DEFAULT_CONTEXT_LIMIT if unknown.
+        """
+        return CONTEXT_LIMITS.get(self, DEFAULT_CONTEXT_LIMIT)
+
+
+DEFAULT_CONTEXT_LIMIT = 8192
+
+CONTEXT_LIMITS: dict[Model, int] = {
+    Model.QWEN_QWQ_32B: 32768,
+    Model.LLAMA_3_2_90B_VISION_INSTRUCT: 131072,
+    Model.DEEPSEEK_R1: 128000,
+    Model.DEEPSEEK_R1_DISTILL_LLAMA_70B: 131072,
+    Model.DEEPSEEK_R1_DISTILL_QWEN_32B: 131072,
+    Model.LLAMA_3_3_70B_INSTRUCT: 131072,
+    Model.QWEN2_VL_7B_INSTRUCT: 32768,
+    Model.DBRX_INSTRUCT: 32768,
+    Model.MINISTRAL_8B_INSTRUCT_2410: 131072,
+    Model.CONFUCIUS_O1_14B: 32768,
+    Model.ACE_MATH_7B_INSTRUCT: 4096,
+    Model.LLAMA_3_1_NEMOTRON_70B_INSTRUCT: 131072,
+    Model.MISTRAL_LARGE_INSTRUCT_2411: 131072,
+    Model.MICROSOFT_PHI_4: 16384,
+    Model.DOBBY_MINI_UNHINGED_LLAMA_3_1_8B: 131072,
+    Model.WATT_TOOL_70B: 131072,
+    Model.BESPOKE_STRATOS_32B: 32768,
+    Model.SKY_T1_32B_PREVIEW: 32768,
+    Model.FALCON3_10B_INSTRUCT: 32768,
+    Model.C4AI_COMMAND_R_PLUS_08_2024: 131072,
+    Model.GLM_4_9B_CHAT: 131072,
+    Model.QWEN2_5_CODER_32B_INSTRUCT: 32768,
+    Model.AYA_EXPANSE_32B: 131072,
+    Model.READER_LM_V2: 524288,
+    Model.MINI_CPM3_4B: 32768,
+    Model.QWEN2_5_1_5B_INSTRUCT: 32768,
+    Model.OZONE_AI_0X_LITE: 32768,
+    Model.PHI_3_5_MINI_INSTRUCT: 131072,
+    Model.GRANITE_3_1_8B_INSTRUCT: 131072,
+}
+
 
 class Message:
     """
     Represents a message in a chat conversation.
 
+    The JSON form of the message is encoded once and cached, so sending
+    the same history again does not re-serialize it. Messages use
+    __slots__ and interned role strings to keep long histories small.
+
     Attributes:
         role (str): The role of the message sender (e.g., "user", "system").
         content (str): The content of the message.
     """
 
+    __slots__ = ("_role", "_content", "_json")
+
     def __init__(self, content: str, role: str = "user"):
         """
         Initializes a Message object.
@@ -80,8 +134,27 @@ class Message:
             role (str, optional): The role of the message sender.
                 Defaults to "user".
         """
-        self.role = str(role)
-        self.content = content
+        self._role: str = sys.intern(str(role))
+        self._content: str = content
+        self._json: bytes = None
+
+    @property
+    def role(self) -> str:
+        return self._role
+
+    @role.setter
+    def role(self, value: str) -> None:
+        self._role = sys.intern(str(value))
+        self._json = None
+
+    @property
+    def content(self) -> str:
+        return self._content
+
+    @content.setter
+    def content(self, value: str) -> None:
+        self._content = value
+        self._json = None
 
     def get_content(self) -> dict:
         """
@@ -92,14 +165,29 @@ class Message:
         """
         return {"role": self.role, "content": self.content}
 
+    def to_json(self) -> bytes:
+        """
+        Returns the message encoded as a JSON object, caching the result.
+
+        Returns:
+            bytes: The encoded message.
+        """
+        if self._json is None:
+            self._json = dumps(self.get_content())
+        return self._json
+
 
 class StartMessage(Message):
     """
     Represents a start message in a chat conversation.
 
     This is a special type of message used to initialize the chat.
+    A single instance can be shared by every chat that uses the same
+    system prompt.
     """
 
+    __slots__ = ()
+
     def __init__(self, content=None):
         """
         Initializes a StartMessage object.
@@ -0,0 +1,175 @@
+"""
+Drives many concurrent chats through ChatManager against a mock server.
+
+Starts benchmarks.mock_server in a child process, runs every chat for a
+number of turns with bounded concurrency, and reports turn latency
+percentiles, throughput, client CPU time per request and memory per
+chat. Results can be saved as JSON and compared with an earlier run.
+
+Usage:
+    python -m benchmarks.load [--chats N] [--turns N] [--stream] ...
+    python -m benchmarks.load --json after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+from ai_chatbot_core.backends import Backend, BackendPool
+from ai_chatbot_core.chat import Chat
+from ai_chatbot_core.chat_maneger import ChatManager
+from ai_chatbot_core.metrics import Instrumentation, RequestEvent
+from ai_chatbot_core.transport import Transport
+from ai_chatbot_core.types import Message
+
+from .mock_server import MockServer, add_arguments, get_config
+
+# Result keys and labels, in report order.
+REPORT = (
+    ("p50_ms", "turn latency p50 (ms)"),
+    ("p95_ms", "turn latency p95 (ms)"),
+    ("p99_ms", "turn latency p99 (ms)"),
+    ("ttfb_p50_ms", "upstream TTFB p50 (ms)"),
+    ("cpu_ms_per_request", "client CPU per request (ms)"),
+    ("bytes_per_chat", "memory per chat (bytes)"),
+    ("requests_per_second", "requests/sec"),
+    ("failed_requests", "failed requests"),
+    ("retries", "retries"),
+)
+
+
+def percentile(values: list[float], share: int) -> float:
+    """Returns the given percentile of values, or 0.0 without values."""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[share - 1]
+
+
+async def run_load(args: argparse.Namespace, url: str) -> tuple[dict, list[list[Message]]]:
+    """
+    Runs the chats and measures the request path.
+
+    Returns:
+        tuple[dict, list[list[Message]]]: The results and the resulting
+            chat histories.
+    """
+    events: list[RequestEvent] = []
+    transport = Transport(limit=args.connections)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    manager = ChatManager(
+        "benchmark",
+        transport=transport,
+        backends=BackendPool([Backend("benchmark", url=url)]),
+        instrumentation=Instrumentation(hooks=[events.append]),
+    )
+
+    async def drive(user_id: int) -> None:
+        async with semaphore:
+            chat: Chat = await manager.connect_chat(user_id)
+            for turn in range(args.turns):
+                content: str = f"Question {turn} from user {user_id}: " + "lorem ipsum " * args.prompt_words
+                started: float = time.perf_counter()
+                if args.stream:
+                    async for _ in chat.stream_response(content):
+                        pass
+                else:
+                    await chat.get_response(content)
+                latencies.append(time.perf_counter() - started)
+
+    async with transport, manager:
+        cpu: float = time.process_time()
+        wall: float = time.perf_counter()
+        await asyncio.gather(*(drive(user_id) for user_id in range(args.chats)))
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        histories: list[list[Message]] = [manager.chats[user_id].messages for user_id in list(manager.chats)]
+
+    ttfbs: list[float] = [event.ttfb for event in events if event.ttfb is not None]
+    results: dict = {
+        "chats": args.chats,
+        "turns": args.turns,
+        "stream": args.stream,
+        "requests": len(latencies),
+        "failed_requests": sum(not event.ok for event in events),
+        "retries": sum(event.retries for event in events),
+        "seconds": wall,
+        "requests_per_second": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ttfb_p50_ms": percentile(ttfbs, 50) * 1000,
+        "cpu_ms_per_request": cpu / len(latencies) * 1000 if latencies else 0.0,
+    }
+    return results, histories
+
+
+async def measure_chat_memory(histories: list[list[Message]]) -> float:
+    """
+    Rebuilds the chats in a fresh ChatManager under tracemalloc.
+
+    Tracing slows everything down, so it is kept out of the timed run;
+    the rebuilt chats hold copies of the same histories.
+
+    Returns:
+        float: The traced bytes per chat.
+    """
+    if not histories:
+        return 0.0
+    async with Transport() as transport, ChatManager("benchmark", transport=transport) as manager:
+        tracemalloc.start()
+        for user_id, messages in enumerate(histories):
+            chat: Chat = await manager.connect_chat(user_id)
+            for message in messages[1:]:
+                await chat.add_message(message.role, message.content.encode("utf-8").decode("utf-8"))
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return size / len(histories)
+
+
+def print_report(results: dict, baseline: dict = None) -> None:
+    """Prints the results, with the change against a baseline if given."""
+    print(
+        f"{results['chats']} chats x {results['turns']} turns, "
+        f"{'streaming' if results['stream'] else 'non-streaming'}, {results['seconds']:.2f}s"
+    )
+    for key, label in REPORT:
+        line: str = f"{label:<32}{results[key]:>14.2f}"
+        if baseline is not None and baseline.get(key):
+            change: float = (results[key] - baseline[key]) / baseline[key] * 100
+            line += f"{baseline[key]:>14.2f}{change:>+9.1f}%"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chats", type=int, default=2000, help="number of chats")
+    parser.add_argument("--turns", type=int, default=3, help="turns per chat")
+    parser.add_argument("--concurrency", type=int, default=500, help="chats running at the same time")
+    parser.add_argument("--connections", type=int, default=100, help="connection pool size")
+    parser.add_argument("--prompt-words", type=int, default=20, help="filler words per user message")
+    parser.add_argument("--stream", action="store_true", help="use stream_response instead of get_response")
+    parser.add_argument("--json", metavar="PATH", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with results saved by --json")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with MockServer(get_config(args)) as server:
+        results, histories = asyncio.run(run_load(args, server.url))
+    results["bytes_per_chat"] = asyncio.run(measure_chat_memory(histories))
+
+    baseline: dict = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
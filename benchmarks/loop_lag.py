@@ -0,0 +1,94 @@
+"""
+Measures event-loop lag while chats receive large reasoning replies.
+
+Runs the same batch of non-streaming turns against the mock server with
+replies decoded inline, in a thread pool and in a process pool, while a
+ticker task records how late the event loop wakes it up. Lag is what
+every other chat on the loop waits on top of its own work.
+
+Usage:
+    python -m benchmarks.loop_lag [--chats N] [--think-tokens N] ...
+"""
+
+import argparse
+import asyncio
+import time
+
+from ai_chatbot_core.backends import Backend, BackendPool
+from ai_chatbot_core.chat_maneger import ChatManager
+from ai_chatbot_core.offload import PROCESSES, THREADS, Offloader
+
+from .load import percentile
+from .mock_server import MockServer, add_arguments, get_config
+
+TICK = 0.001
+
+
+async def measure(url: str, args: argparse.Namespace, offloader: Offloader) -> dict:
+    """
+    Runs the turns and samples the event-loop lag meanwhile.
+
+    Returns:
+        dict: Lag percentiles and maximum in milliseconds and the wall time.
+    """
+    lags: list[float] = []
+    running: bool = True
+
+    async def tick() -> None:
+        while running:
+            expected: float = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(max(time.perf_counter() - expected, 0.0))
+
+    manager = ChatManager(
+        "benchmark",
+        backends=BackendPool([Backend("benchmark", url=url)]),
+        offloader=offloader,
+    )
+    async with manager:
+        for user_id in range(args.chats):
+            await manager.connect_chat(user_id)
+        ticker: asyncio.Task = asyncio.ensure_future(tick())
+        wall: float = time.perf_counter()
+        for _ in range(args.turns):
+            await asyncio.gather(*(
+                manager.chats[user_id].get_response("Think hard") for user_id in range(args.chats)
+            ))
+        wall = time.perf_counter() - wall
+        running = False
+        await ticker
+    return {
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags, default=0.0) * 1000,
+        "seconds": wall,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chats", type=int, default=20, help="chats answered at the same time")
+    parser.add_argument("--turns", type=int, default=3, help="turns per chat")
+    parser.add_argument("--threshold", type=int, default=256 * 1024, help="offload threshold in bytes")
+    parser.add_argument("--workers", type=int, default=None, help="offload pool size")
+    add_arguments(parser)
+    parser.set_defaults(think_tokens=250000, completion_tokens=2000)
+    args = parser.parse_args()
+
+    modes: list[tuple[str, Offloader]] = [
+        ("inline", None),
+        ("threads", Offloader(args.threshold, args.workers, THREADS)),
+        ("processes", Offloader(args.threshold, args.workers, PROCESSES)),
+    ]
+    print(f"{'mode':<12}{'lag p50 (ms)':>14}{'lag p99 (ms)':>14}{'lag max (ms)':>14}{'wall (s)':>10}")
+    with MockServer(get_config(args)) as server:
+        for name, offloader in modes:
+            results: dict = asyncio.run(measure(server.url, args, offloader))
+            print(
+                f"{name:<12}{results['lag_p50_ms']:>14.2f}{results['lag_p99_ms']:>14.2f}"
+                f"{results['lag_max_ms']:>14.2f}{results['seconds']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures the memory used per chat message.
+
+Compares the slotted Message with the previous __dict__-based layout and
+the cost of a per-chat start message against a shared one.
+
+Usage:
+    python -m benchmarks.message_memory [--count N]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from ai_chatbot_core.types import Message, StartMessage
+
+
+class DictMessage:
+    """The previous Message layout: a plain class with a per-instance __dict__."""
+
+    def __init__(self, content: str, role: str = "user"):
+        self.role = str(role)
+        self.content = content
+
+
+def measure(factory, count: int) -> float:
+    """Returns the traced bytes allocated per object created by factory."""
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(index) for index in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    contents = [f"message {index}" for index in range(args.count)]
+    roles = ("user", "assistant")
+    prompt = "You are a helpful assistant that answers briefly."
+    shared = StartMessage(prompt)
+
+    results = {
+        "dict Message": measure(lambda i: DictMessage(contents[i], "".join(roles[i % 2])), args.count),
+        "slotted Message": measure(lambda i: Message(contents[i], "".join(roles[i % 2])), args.count),
+        "per-chat StartMessage": measure(lambda i: StartMessage("".join(prompt)), args.count),
+        "shared StartMessage": measure(lambda i: shared, args.count),
+    }
+    print(f"{'layout':<24}{'bytes/message':>14}")
+    for name, size in results.items():
+        print(f"{name:<24}{size:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+A local server emulating an OpenAI-compatible /chat/completions endpoint.
+
+Latency, streaming speed, error rate and reply sizes are configurable,
+so the client can be load tested without touching a real API.
+
+Usage:
+    python -m benchmarks.mock_server [--port N] [--latency S] ...
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import time
+from multiprocessing import Process
+
+from aiohttp import web
+
+PATH = "/api/v1/chat/completions"
+
+
+class MockConfig:
+    """
+    Behaviour of the mock endpoint.
+
+    Attributes:
+        latency (float): Seconds before the response starts.
+        jitter (float): Random extra latency, up to this many seconds.
+        token_interval (float): Seconds between streamed tokens.
+        completion_tokens (int): Tokens in every reply.
+        think_tokens (int): Tokens in a <think> block before the reply.
+        error_rate (float): Share of requests answered with an error.
+        error_status (int): Status of the error responses.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        token_interval: float = 0.0,
+        completion_tokens: int = 50,
+        think_tokens: int = 0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+    ):
+        self.latency: float = float(latency)
+        self.jitter: float = float(jitter)
+        self.token_interval: float = float(token_interval)
+        self.completion_tokens: int = int(completion_tokens)
+        self.think_tokens: int = int(think_tokens)
+        self.error_rate: float = float(error_rate)
+        self.error_status: int = int(error_status)
+
+
+def get_tokens(config: MockConfig) -> list[str]:
+    """Returns the reply, split into the tokens it is streamed in."""
+    tokens: list[str] = []
+    if config.think_tokens:
+        tokens.append("<think>")
+        tokens.extend(["hmm "] * config.think_tokens)
+        tokens.append("</think>")
+    tokens.extend(["word "] * config.completion_tokens)
+    return tokens
+
+
+def create_app(config: MockConfig) -> web.Application:
+    """
+    Creates the mock application.
+
+    Args:
+        config (MockConfig): The endpoint behaviour.
+
+    Returns:
+        web.Application: The application serving PATH.
+    """
+    tokens: list[str] = get_tokens(config)
+    content: str = "".join(tokens)
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        body: bytes = await request.read()
+        payload: dict = json.loads(body)
+        await asyncio.sleep(config.latency + random.uniform(0, config.jitter))
+        if random.random() < config.error_rate:
+            return web.Response(status=config.error_status, text="Mock error")
+        model: str = payload.get("model", "")
+        usage: dict = {
+            "prompt_tokens": len(body) // 4,
+            "completion_tokens": len(tokens),
+            "total_tokens": len(body) // 4 + len(tokens),
+        }
+        if not payload.get("stream"):
+            return web.json_response({
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index, token in enumerate(tokens):
+            delta: dict = {"content": token}
+            if index == 0:
+                delta["role"] = "assistant"
+            chunk: dict = {"id": "mock", "model": model, "choices": [{"index": 0, "delta": delta}]}
+            await response.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            if config.token_interval:
+                await asyncio.sleep(config.token_interval)
+        final: dict = {"id": "mock", "model": model, "choices": [], "usage": usage}
+        await response.write(b"data: " + json.dumps(final).encode("utf-8") + b"\n\n")
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post(PATH, completions)
+    return app
+
+
+def serve(port: int, config: MockConfig) -> None:
+    """Runs the mock server until the process is terminated."""
+    web.run_app(create_app(config), host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def get_free_port() -> int:
+    """Returns a local TCP port that is currently free."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockServer:
+    """
+    Runs the mock server in a child process, so its CPU time is not
+    counted against the client being measured.
+
+    Use it as a context manager; url is the endpoint to send requests to.
+    """
+
+    def __init__(self, config: MockConfig = None, port: int = None):
+        """
+        Initializes the server. It is started on entering the context.
+
+        Args:
+            config (MockConfig, optional): The endpoint behaviour.
+                Defaults to MockConfig().
+            port (int, optional): The port to listen on. If None, a free
+                port is picked. Defaults to None.
+        """
+        self.config: MockConfig = MockConfig() if config is None else config
+        self.port: int = get_free_port() if port is None else int(port)
+        self.url: str = f"http://127.0.0.1:{self.port}{PATH}"
+        self.__process: Process = None
+
+    def start(self, timeout: float = 10.0) -> None:
+        """Starts the server and waits until it accepts connections."""
+        self.__process = Process(target=serve, args=(self.port, self.config), daemon=True)
+        self.__process.start()
+        deadline: float = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.1).close()
+                return
+            except OSError:
+                if time.monotonic() > deadline or not self.__process.is_alive():
+                    self.stop()
+                    raise RuntimeError("The mock server did not start")
+                time.sleep(0.05)
+
+    def stop(self) -> None:
+        """Terminates the server."""
+        if self.__process is not None:
+            self.__process.terminate()
+            self.__process.join()
+            self.__process = None
+
+    def __enter__(self) -> "MockServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the MockConfig options to an argument parser."""
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before a response starts")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency in seconds")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--completion-tokens", type=int, default=50, help="tokens per reply")
+    parser.add_argument("--think-tokens", type=int, default=0, help="tokens in a <think> block per reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status of failed requests")
+
+
+def get_config(args: argparse.Namespace) -> MockConfig:
+    """Builds a MockConfig from parsed arguments."""
+    return MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_interval=args.token_interval,
+        completion_tokens=args.completion_tokens,
+        think_tokens=args.think_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"Serving on http://127.0.0.1:{args.port}{PATH}")
+    serve(args.port, get_config(args))
+
+
+if __name__ == "__main__":
+    main()
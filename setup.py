@@ -1,5 +1,4 @@
 from setuptools import setup
-import ai_chatbot_core
 
 with open("README.md", "r",encoding='utf-8') as f:
     long_description = f.read()
@@ -11,6 +10,9 @@ setup(
     install_requires=[
         "aiohttp"
     ],
+    extras_require={
+        "fast": ["orjson"],
+    },
     description="A lightweight AI  library for building chatbot applications.",
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -0,0 +1,82 @@
+import unittest
+
+from ai_chatbot_core.backends import WEIGHTED_ROUND_ROBIN, Backend, BackendPool
+from ai_chatbot_core.config import api_url
+
+from helpers import FakeClock
+
+
+class TestBackendPool(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.a = Backend("key-a", "http://a")
+        self.b = Backend("key-b", "http://b")
+
+    def test_backend_defaults(self):
+        backend = Backend("key")
+        self.assertEqual(backend.url, api_url)
+        self.assertEqual(backend.weight, 1)
+
+    def test_requires_backends(self):
+        with self.assertRaises(ValueError):
+            BackendPool([])
+        with self.assertRaises(ValueError):
+            BackendPool([self.a], strategy="random")
+
+    def test_least_in_flight(self):
+        pool = BackendPool([self.a, self.b], clock=self.clock)
+        self.a.in_flight = 2
+        self.assertIs(pool.select(), self.b)
+        self.b.in_flight = 3
+        self.assertIs(pool.select(), self.a)
+
+    def test_least_in_flight_respects_weight(self):
+        self.a.weight = 4
+        pool = BackendPool([self.a, self.b], clock=self.clock)
+        self.a.in_flight = 3
+        self.b.in_flight = 1
+        self.assertIs(pool.select(), self.a)
+
+    def test_weighted_round_robin(self):
+        self.a.weight = 3
+        pool = BackendPool([self.a, self.b], strategy=WEIGHTED_ROUND_ROBIN, clock=self.clock)
+        chosen = [pool.select().api_key for _ in range(8)]
+        self.assertEqual(chosen.count("key-a"), 6)
+        self.assertEqual(chosen.count("key-b"), 2)
+        self.assertNotEqual(chosen[:3], ["key-a"] * 3)
+
+    def test_quota_exhaustion_cools_down(self):
+        pool = BackendPool([self.a, self.b], cooldown=30, clock=self.clock)
+        pool.report(self.a, 429, retry_after=10)
+        for _ in range(3):
+            self.assertIs(pool.select(), self.b)
+        self.clock.now = 11
+        self.assertTrue(pool.is_available(self.a))
+
+    def test_consecutive_failures_cool_down(self):
+        pool = BackendPool([self.a, self.b], max_failures=2, cooldown=30, clock=self.clock)
+        pool.report(self.a)
+        self.assertTrue(pool.is_available(self.a))
+        pool.report(self.a, 200)
+        pool.report(self.a, 502)
+        self.assertTrue(pool.is_available(self.a))
+        pool.report(self.a, 503)
+        self.assertFalse(pool.is_available(self.a))
+        self.assertEqual(self.a.errors, 3)
+
+    def test_client_errors_are_not_backend_failures(self):
+        pool = BackendPool([self.a], max_failures=1, clock=self.clock)
+        pool.report(self.a, 400)
+        self.assertTrue(pool.is_available(self.a))
+
+    def test_exclude_and_fallback(self):
+        pool = BackendPool([self.a, self.b], clock=self.clock)
+        self.assertIs(pool.select([self.a]), self.b)
+        self.assertFalse(pool.has_alternative([self.a, self.b]))
+        pool.report(self.a, 401)
+        pool.report(self.b, 429, retry_after=5)
+        self.assertIs(pool.select(), self.b)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+from ai_chatbot_core.cache import (
+    MemoryResponseCache,
+    MinHash,
+    SQLiteResponseCache,
+    hash_messages,
+    normalize,
+)
+from ai_chatbot_core.types import Message, Model, StartMessage
+
+from helpers import FakeClock
+
+
+def conversation(question, prompt="Prompt"):
+    return [StartMessage(prompt), Message(question)]
+
+
+class TestHashing(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("  Hello \n\t world  "), "Hello world")
+
+    def test_hash_ignores_whitespace(self):
+        self.assertEqual(
+            hash_messages(Model.DEEPSEEK_R1, conversation("Hello  world")),
+            hash_messages(Model.DEEPSEEK_R1, conversation(" Hello world\n")),
+        )
+
+    def test_hash_depends_on_model_role_and_content(self):
+        base = hash_messages(Model.DEEPSEEK_R1, conversation("Hi"))
+        self.assertNotEqual(base, hash_messages(Model.QWEN_QWQ_32B, conversation("Hi")))
+        self.assertNotEqual(base, hash_messages(Model.DEEPSEEK_R1, conversation("Hi", "Other")))
+        self.assertNotEqual(base, hash_messages(Model.DEEPSEEK_R1, [StartMessage("Prompt"), Message("Hi", "assistant")]))
+
+    def test_minhash_similarity(self):
+        minhash = MinHash()
+        first = minhash.signature("What is the capital city of France and why")
+        second = minhash.signature("what is the capital city of France and why?")
+        third = minhash.signature("Write me a poem about autumn leaves falling")
+        self.assertGreater(MinHash.similarity(first, second), 0.5)
+        self.assertLess(MinHash.similarity(first, third), 0.2)
+        self.assertEqual(MinHash.similarity(first, first), 1.0)
+
+    def test_minhash_is_stable(self):
+        self.assertEqual(MinHash().signature("same text here"), MinHash().signature("same text here"))
+
+
+class CacheTests:
+    def make_cache(self, **kwargs):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.clock = FakeClock(1000.0)
+
+    async def test_exact_hit_and_miss(self):
+        cache = self.make_cache()
+        self.assertIsNone(await cache.get(Model.DEEPSEEK_R1, conversation("Hi")))
+        await cache.set(Model.DEEPSEEK_R1, conversation("Hi"), "Hello!")
+        self.assertEqual(await cache.get(Model.DEEPSEEK_R1, conversation(" Hi ")), "Hello!")
+        self.assertIsNone(await cache.get(Model.QWEN_QWQ_32B, conversation("Hi")))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertAlmostEqual(cache.hit_rate, 1 / 3)
+
+    async def test_ttl(self):
+        cache = self.make_cache(ttl=10)
+        await cache.set(Model.DEEPSEEK_R1, conversation("Hi"), "Hello!")
+        self.clock.now += 11
+        self.assertIsNone(await cache.get(Model.DEEPSEEK_R1, conversation("Hi")))
+
+    async def test_lru_eviction(self):
+        cache = self.make_cache(max_entries=2)
+        await cache.set(Model.DEEPSEEK_R1, conversation("one"), "1")
+        self.clock.now += 1
+        await cache.set(Model.DEEPSEEK_R1, conversation("two"), "2")
+        self.clock.now += 1
+        await cache.get(Model.DEEPSEEK_R1, conversation("one"))
+        self.clock.now += 1
+        await cache.set(Model.DEEPSEEK_R1, conversation("three"), "3")
+        self.assertEqual(await cache.get(Model.DEEPSEEK_R1, conversation("one")), "1")
+        self.assertIsNone(await cache.get(Model.DEEPSEEK_R1, conversation("two")))
+        self.assertEqual(await cache.get(Model.DEEPSEEK_R1, conversation("three")), "3")
+
+    async def test_near_duplicate(self):
+        cache = self.make_cache(similarity=0.5)
+        question = "What is the capital city of France and why is it famous"
+        await cache.set(Model.DEEPSEEK_R1, conversation(question), "Paris")
+        self.assertEqual(await cache.get(Model.DEEPSEEK_R1, conversation(question.lower() + "?")), "Paris")
+        self.assertEqual(cache.near_hits, 1)
+        self.assertIsNone(await cache.get(Model.DEEPSEEK_R1, conversation(question, "Other prompt")))
+        self.assertIsNone(await cache.get(Model.DEEPSEEK_R1, conversation("Tell me a joke about cats please")))
+
+    async def test_near_duplicate_disabled_by_default(self):
+        cache = self.make_cache()
+        await cache.set(Model.DEEPSEEK_R1, conversation("What is the capital of France"), "Paris")
+        self.assertIsNone(await cache.get(Model.DEEPSEEK_R1, conversation("what is the capital of france?")))
+
+
+class TestMemoryResponseCache(CacheTests, unittest.IsolatedAsyncioTestCase):
+    def make_cache(self, **kwargs):
+        return MemoryResponseCache(clock=self.clock, **kwargs)
+
+
+class TestSQLiteResponseCache(CacheTests, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.db")
+        self.caches = []
+
+    async def asyncTearDown(self):
+        for cache in self.caches:
+            await cache.close()
+        self.directory.cleanup()
+
+    def make_cache(self, **kwargs):
+        cache = SQLiteResponseCache(self.path, clock=self.clock, **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    async def test_shared_between_instances(self):
+        await self.make_cache(similarity=0.5).set(Model.DEEPSEEK_R1, conversation("Hello there friend"), "Hi!")
+        other = self.make_cache(similarity=0.5)
+        self.assertEqual(await other.get(Model.DEEPSEEK_R1, conversation("hello there friend!")), "Hi!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,50 @@
+import asyncio
+import json
 import unittest
+
+import aiohttp
 from unittest.mock import patch, AsyncMock
 from ai_chatbot_core.chat import Chat, remove_think_content
-from ai_chatbot_core.types import  Model, Message
+from ai_chatbot_core.cache import MemoryResponseCache
+from ai_chatbot_core.coalesce import RequestCoalescer
+from ai_chatbot_core.history import SlidingWindow
+from ai_chatbot_core.limiter import ConcurrencyLimiter
+from ai_chatbot_core.metrics import Instrumentation
+from ai_chatbot_core.offload import Offloader
+from ai_chatbot_core.retry import RetryPolicy
+from ai_chatbot_core.routing import ModelRouter, Route
+from ai_chatbot_core.storage import MemoryStorage
+from ai_chatbot_core.summary import SUMMARY_PREFIX, Summarizer
+from ai_chatbot_core.transport import Transport
+from ai_chatbot_core.types import  Model, Message, StartMessage
+
+
+def routed_post(replies):
+    """Returns a fake session.post answering per model with (delay, status, content)."""
+    def post(url, headers=None, data=None, **kwargs):
+        payload = json.loads(data)
+        delay, status, content = replies[payload["model"]]
+
+        async def iter_any():
+            delta = {"role": "assistant", "content": content}
+            yield b"data: " + json.dumps({"choices": [{"delta": delta}]}).encode() + b"\n\n"
+            yield b"data: [DONE]\n\n"
+
+        async def enter(*args):
+            await asyncio.sleep(delay)
+            return response
+
+        response = AsyncMock()
+        response.status = status
+        response.content_length = None
+        response.text.return_value = "Error"
+        response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": content}}]}
+        response.content.iter_any = iter_any
+        context = AsyncMock()
+        context.__aenter__.side_effect = enter
+        return context
+
+    return post
 
 
 class TestChatSync(unittest.TestCase):
@@ -22,6 +65,15 @@ class TestChatSync(unittest.TestCase):
         text_without_think_tag_result = remove_think_content(text_without_think_tag)
         self.assertEqual(text_without_think_tag_result, "This is some text and more text.")
 
+    def test_remove_think_content_unterminated(self):
+        self.assertEqual(remove_think_content("Answer <think>cut off reasoning"), "Answer")
+
+    def test_remove_think_content_sink(self):
+        pieces = []
+        text = remove_think_content("<think>reasoning</think>\n\nAnswer", pieces.append)
+        self.assertEqual(text, "Answer")
+        self.assertEqual("".join(pieces), "reasoning")
+
     def test_chat_initialization(self):
         chat = Chat(self.api_key, user_id=123, start_message="Custom start message", model=Model.QWEN_QWQ_32B)
         self.assertEqual(chat.api_key, self.api_key)
@@ -52,6 +104,9 @@ class TestChatAsync(unittest.IsolatedAsyncioTestCase):
         self.api_key = "test_api_key"
         self.chat = Chat(self.api_key)
 
+    async def asyncTearDown(self):
+        await self.chat.close()
+
     async def test_add_message(self):
         chat = Chat("test_api_key")
         await chat.add_message("user", "Test message")
@@ -69,6 +124,40 @@ class TestChatAsync(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(messages[1]["role"], "user")
         self.assertEqual(messages[1]["content"], "Test message")
     
+    async def test_get_messages_applies_history_policy(self):
+        chat = Chat("test_api_key", history_policy=SlidingWindow(max_turns=1))
+        for turn in range(3):
+            await chat.add_message("user", f"Question {turn}")
+            await chat.add_message("assistant", f"Answer {turn}")
+        messages = await chat.get_messages()
+        self.assertEqual([message["content"] for message in messages[1:]], ["Question 2", "Answer 2"])
+        self.assertEqual(messages[0]["role"], "system")
+        self.assertEqual(len(chat.messages), 7)
+
+    async def test_clear_chat_keeps_start_message(self):
+        start_message = StartMessage("Custom start message")
+        chat = Chat("test_api_key", start_message=start_message)
+        await chat.add_message("user", "Test message")
+        await chat.clear_chat()
+        self.assertEqual(chat.messages, [start_message])
+
+    async def test_get_payload(self):
+        chat = Chat("test_api_key", model=Model.QWEN_QWQ_32B)
+        await chat.add_message("user", "Привіт \"quoted\"\n")
+        payload = json.loads(await chat.get_payload())
+        self.assertEqual(payload, {"model": Model.QWEN_QWQ_32B.value, "messages": await chat.get_messages()})
+        payload = json.loads(await chat.get_payload(stream=True))
+        self.assertTrue(payload["stream"])
+
+    async def test_get_payload_reuses_encoded_messages(self):
+        chat = Chat("test_api_key")
+        await chat.add_message("user", "First")
+        await chat.get_payload()
+        encoded = chat.messages[1].to_json()
+        await chat.add_message("user", "Second")
+        await chat.get_payload()
+        self.assertIs(chat.messages[1].to_json(), encoded)
+
     @patch('aiohttp.ClientSession.post')
     async def test_get_response_success(self, mock_post):
         mock_response = AsyncMock()
@@ -89,3 +178,457 @@ class TestChatAsync(unittest.IsolatedAsyncioTestCase):
 
         response = await self.chat.get_response("Test question")
         self.assertEqual(response, "An error occurred while processing your request.")
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_error_rolls_back_user_message(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 500
+        mock_response.text.return_value = "Internal Server Error"
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        await self.chat.get_response("Test question")
+        self.assertEqual(len(self.chat.messages), 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_client_error_rolls_back(self, mock_post):
+        mock_post.return_value.__aenter__.side_effect = aiohttp.ClientConnectionError()
+        self.chat.transport.retry = RetryPolicy(max_attempts=2, base_delay=0)
+
+        response = await self.chat.get_response("Test question")
+        self.assertEqual(response, "An error occurred while processing your request.")
+        self.assertEqual(len(self.chat.messages), 1)
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_retries_transient_status(self, mock_post):
+        busy = AsyncMock()
+        busy.status = 503
+        busy.headers = {"Retry-After": "0"}
+        ok = AsyncMock()
+        ok.status = 200
+        ok.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "Done."}}]}
+        mock_post.return_value.__aenter__.side_effect = [busy, ok]
+
+        response = await self.chat.get_response("Test question")
+        self.assertEqual(response, "Done.")
+        self.assertEqual(len(self.chat.messages), 3)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_reuses_session(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "Ok."}}]}
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        await self.chat.get_response("First")
+        session = await self.chat.transport.get_session()
+        await self.chat.get_response("Second")
+        self.assertIs(await self.chat.transport.get_session(), session)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_stream_response(self, mock_post):
+        events = [
+            b'data: {"choices": [{"delta": {"role": "assistant", "content": "<thi"}}]}\n\n',
+            b'data: {"choices": [{"delta": {"content": "nk>reasoning</think>\\n\\nHel"}}]}\n',
+            b'\ndata: {"choices": [{"delta": {"content": "lo!"}}]}\n\n',
+            b'data: [DONE]\n\n',
+        ]
+
+        async def iter_any():
+            for event in events:
+                yield event
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.content.iter_any = iter_any
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        chunks = [chunk async for chunk in self.chat.stream_response("Test question")]
+        self.assertEqual("".join(chunks), "Hello!")
+        self.assertEqual(chunks[0], "Hel")
+        self.assertTrue(json.loads(mock_post.call_args.kwargs["data"])["stream"])
+        self.assertEqual(len(self.chat.messages), 3)
+        self.assertEqual(self.chat.messages[2].content, "Hello!")
+        self.assertEqual(self.chat.messages[2].role, "assistant")
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_stream_response_not_committed_when_abandoned(self, mock_post):
+        async def iter_any():
+            yield b'data: {"choices": [{"delta": {"content": "Partial"}}]}\n\n'
+            yield b'data: {"choices": [{"delta": {"content": " reply"}}]}\n\n'
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.content.iter_any = iter_any
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        self.chat.storage = MemoryStorage()
+        await self.chat.storage.save(self.chat.user_id, self.chat.model, self.chat.messages)
+        stream = self.chat.stream_response("Test question")
+        self.assertEqual(await stream.__anext__(), "Partial")
+        await stream.aclose()
+        self.assertEqual(len(self.chat.messages), 1)
+        _, stored = await self.chat.storage.load(self.chat.user_id)
+        self.assertEqual(len(stored), 1)
+
+        stream = self.chat.stream_response("Again")
+        await stream.__anext__()
+        await stream.aclose()
+        sent = json.loads(mock_post.call_args.kwargs["data"])["messages"]
+        self.assertEqual([m["content"] for m in sent[1:]], ["Again"])
+        self.assertEqual(len(self.chat.messages), 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_rolls_back_malformed_reply(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.return_value = {"choices": []}
+        mock_post.return_value.__aenter__.return_value = mock_response
+        self.chat.storage = MemoryStorage()
+        await self.chat.storage.save(self.chat.user_id, self.chat.model, self.chat.messages)
+
+        with self.assertRaises(IndexError):
+            await self.chat.get_response("Test question")
+        self.assertEqual(len(self.chat.messages), 1)
+        _, stored = await self.chat.storage.load(self.chat.user_id)
+        self.assertEqual(len(stored), 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_rolls_back_on_cancel(self, mock_post):
+        async def json(loads=None):
+            await asyncio.sleep(1)
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(self.chat.get_response("Test question"), 0.01)
+        self.assertEqual(len(self.chat.messages), 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_stream_response_error(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 500
+        mock_response.text.return_value = "Internal Server Error"
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        chunks = [chunk async for chunk in self.chat.stream_response("Test question")]
+        self.assertEqual(chunks, ["An error occurred while processing your request."])
+        self.assertEqual(len(self.chat.messages), 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_falls_back_on_failure(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (0, 500, "Broken"),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 200, "Fallback answer"),
+        })
+        router = ModelRouter([Model.DEEPSEEK_R1, Model.QWEN2_5_1_5B_INSTRUCT])
+        async with Chat(self.api_key, router=router) as chat:
+            self.assertEqual(await chat.get_response("Question"), "Fallback answer")
+            self.assertEqual((router.fallbacks, router.backup_wins, router.hedges), (1, 1, 0))
+            self.assertEqual(router.get_stats(Model.DEEPSEEK_R1).errors, 1)
+            self.assertEqual(chat.messages[2].content, "Fallback answer")
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_all_models_fail(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (0, 500, ""),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 500, ""),
+        })
+        async with Chat(self.api_key, router=ModelRouter([Model.DEEPSEEK_R1, Model.QWEN2_5_1_5B_INSTRUCT])) as chat:
+            self.assertEqual(await chat.get_response("Question"), "An error occurred while processing your request.")
+            self.assertEqual(len(chat.messages), 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_hedges_slow_model(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (5, 200, "Slow answer"),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 200, "Fast answer"),
+        })
+        router = ModelRouter([Model.DEEPSEEK_R1, Model.QWEN2_5_1_5B_INSTRUCT], hedge_delay=0.02)
+        async with Chat(self.api_key, router=router) as chat:
+            started = asyncio.get_running_loop().time()
+            self.assertEqual(await chat.get_response("Question"), "Fast answer")
+            self.assertLess(asyncio.get_running_loop().time() - started, 1)
+            self.assertEqual((router.hedges, router.backup_wins), (1, 1))
+            self.assertEqual(router.get_stats(Model.DEEPSEEK_R1).requests, 0)
+            self.assertEqual(router.get_stats(Model.QWEN2_5_1_5B_INSTRUCT).requests, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_does_not_hedge_fast_model(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (0, 200, "Answer"),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 200, "Backup"),
+        })
+        router = ModelRouter([Model.DEEPSEEK_R1, Model.QWEN2_5_1_5B_INSTRUCT], hedge_delay=1)
+        async with Chat(self.api_key, router=router) as chat:
+            self.assertEqual(await chat.get_response("Question"), "Answer")
+            self.assertEqual(mock_post.call_count, 1)
+            self.assertEqual(router.hedges, 0)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_picks_model_by_size(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (0, 200, "Long answer"),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 200, "Short answer"),
+        })
+        router = ModelRouter([Route(Model.QWEN2_5_1_5B_INSTRUCT, max_tokens=100), Model.DEEPSEEK_R1])
+        async with Chat(self.api_key, router=router) as chat:
+            self.assertEqual(await chat.get_response("Hi"), "Short answer")
+            self.assertEqual(await chat.get_response("word " * 200), "Long answer")
+            self.assertEqual(chat.model, Model.DEEPSEEK_R1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_hedges_streams(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (5, 200, "Slow answer"),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 200, "Fast answer"),
+        })
+        router = ModelRouter([Model.DEEPSEEK_R1, Model.QWEN2_5_1_5B_INSTRUCT], hedge_delay=0.02)
+        async with Chat(self.api_key, router=router) as chat:
+            chunks = [chunk async for chunk in chat.stream_response("Question")]
+            self.assertEqual(chunks, ["Fast answer"])
+            self.assertEqual(chat.messages[2].content, "Fast answer")
+            self.assertEqual((router.hedges, router.backup_wins), (1, 1))
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_router_stream_falls_back(self, mock_post):
+        mock_post.side_effect = routed_post({
+            Model.DEEPSEEK_R1.value: (0, 500, ""),
+            Model.QWEN2_5_1_5B_INSTRUCT.value: (0, 200, "Fallback answer"),
+        })
+        router = ModelRouter([Model.DEEPSEEK_R1, Model.QWEN2_5_1_5B_INSTRUCT])
+        async with Chat(self.api_key, router=router) as chat:
+            chunks = [chunk async for chunk in chat.stream_response("Question")]
+            self.assertEqual(chunks, ["Fallback answer"])
+            self.assertEqual(router.fallbacks, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_concurrent_turns_are_serialized(self, mock_post):
+        replies = iter(["Answer 1", "Answer 2"])
+
+        async def json(loads=None):
+            await asyncio.sleep(0.01)
+            return {"choices": [{"message": {"role": "assistant", "content": next(replies)}}]}
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        await asyncio.gather(self.chat.get_response("Question 1"), self.chat.get_response("Question 2"))
+        contents = [message.content for message in self.chat.messages[1:]]
+        self.assertEqual(contents, ["Question 1", "Answer 1", "Question 2", "Answer 2"])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_uses_limiter(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "Ok."}}]}
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        limiter = ConcurrencyLimiter(max_in_flight=1)
+        async with Transport(limiter=limiter) as transport:
+            chat = Chat(self.api_key, transport=transport)
+            await chat.get_response("Question")
+        self.assertEqual(limiter.acquired, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_large_response_offloaded(self, mock_post):
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": "<think>" + "x" * 1000 + "</think>Answer."}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 9},
+        }).encode()
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.read.return_value = body
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        thoughts = []
+        events = []
+        offloader = Offloader(threshold=len(body))
+        async with Transport(instrumentation=Instrumentation(hooks=[events.append])) as transport:
+            chat = Chat(self.api_key, transport=transport, offloader=offloader, on_think=thoughts.append)
+            self.assertEqual(await chat.get_response("Question"), "Answer.")
+            offloader.threshold = len(body) + 1
+            self.assertEqual(await chat.get_response("Question"), "Answer.")
+        await offloader.close()
+        self.assertEqual(offloader.offloaded, 1)
+        self.assertEqual("".join(thoughts), "x" * 2000)
+        self.assertEqual([event.think_chars for event in events], [1000, 1000])
+        self.assertEqual(events[0].completion_tokens, 9)
+        mock_response.json.assert_not_called()
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_reports_usage_and_think(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.content_length = 120
+        mock_response.json.return_value = {
+            "choices": [{"message": {"role": "assistant", "content": "<think>12345</think>Answer."}}],
+            "usage": {"prompt_tokens": 11, "completion_tokens": 7},
+        }
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        events = []
+        async with Transport(instrumentation=Instrumentation(hooks=[events.append])) as transport:
+            chat = Chat(self.api_key, transport=transport)
+            self.assertEqual(await chat.get_response("Question"), "Answer.")
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual(event.model, chat.model)
+        self.assertEqual((event.prompt_tokens, event.completion_tokens, event.think_chars), (11, 7, 5))
+        self.assertEqual(event.response_bytes, 120)
+        self.assertEqual(event.request_bytes, len(await chat.get_payload(messages=chat.messages[:2])))
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_uses_cache(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "Cached answer."}}]}
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        cache = MemoryResponseCache()
+        chat1 = Chat(self.api_key, user_id=1, cache=cache, transport=self.chat.transport)
+        chat2 = Chat(self.api_key, user_id=2, cache=cache, transport=self.chat.transport)
+        self.assertEqual(await chat1.get_response("Same question"), "Cached answer.")
+        self.assertEqual(await chat2.get_response("Same question"), "Cached answer.")
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual([m.content for m in chat2.messages[1:]], ["Same question", "Cached answer."])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_coalesces_identical_requests(self, mock_post):
+        async def json(loads=None):
+            await asyncio.sleep(0.01)
+            return {"choices": [{"message": {"role": "assistant", "content": "Shared answer."}}]}
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        coalescer = RequestCoalescer()
+        chats = [Chat(self.api_key, user_id=i, coalescer=coalescer, transport=self.chat.transport) for i in range(3)]
+        chats.append(Chat(self.api_key, user_id=3, history=False, coalescer=coalescer, transport=self.chat.transport))
+        replies = await asyncio.gather(*(chat.get_response("Popular question") for chat in chats))
+        self.assertEqual(replies, ["Shared answer."] * 4)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(coalescer.coalesced, 3)
+        for chat in chats[:3]:
+            self.assertEqual([m.content for m in chat.messages[1:]], ["Popular question", "Shared answer."])
+        self.assertEqual([m.content for m in chats[3].messages[1:]], ["Popular question"])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_coalesced_failure_rolls_back_every_chat(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 400
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        coalescer = RequestCoalescer()
+        chats = [Chat(self.api_key, user_id=i, coalescer=coalescer, transport=self.chat.transport) for i in range(2)]
+        replies = await asyncio.gather(*(chat.get_response("Question") for chat in chats))
+        self.assertEqual(replies, ["An error occurred while processing your request."] * 2)
+        self.assertEqual([len(chat.messages) for chat in chats], [1, 1])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_summarize_replaces_old_turns(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "<think>hm</think>Short summary."}}]}
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        thoughts = []
+        chat = Chat(
+            self.api_key,
+            transport=self.chat.transport,
+            on_think=thoughts.append,
+            summarizer=Summarizer(threshold_tokens=10, keep_turns=1, model=Model.MICROSOFT_PHI_4),
+        )
+        for index in range(3):
+            await chat.add_message("user", f"Question {index}")
+            await chat.add_message("assistant", f"Answer {index}")
+        self.assertTrue(await chat.summarize())
+        self.assertEqual(json.loads(mock_post.call_args.kwargs["data"])["model"], Model.MICROSOFT_PHI_4.value)
+        self.assertIs(chat.messages[0], chat.start_message)
+        self.assertEqual(chat.messages[1].role, "system")
+        self.assertEqual(chat.messages[1].content, SUMMARY_PREFIX + "Short summary.")
+        self.assertEqual([m.content for m in chat.messages[2:]], ["Question 2", "Answer 2"])
+        self.assertEqual(thoughts, [])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_summarize_keeps_messages_added_meanwhile(self, mock_post):
+        chat = Chat(self.api_key, transport=self.chat.transport, summarizer=Summarizer(threshold_tokens=10, keep_turns=1))
+
+        async def json_reply(loads=None):
+            await chat.add_message("user", "Question 3")
+            return {"choices": [{"message": {"role": "assistant", "content": "Summary."}}]}
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json_reply
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        for index in range(3):
+            await chat.add_message("user", f"Question {index}")
+            await chat.add_message("assistant", f"Answer {index}")
+        self.assertTrue(await chat.summarize())
+        self.assertEqual([m.content for m in chat.messages[2:]], ["Question 2", "Answer 2", "Question 3"])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_summarize_discarded_after_clear(self, mock_post):
+        chat = Chat(self.api_key, transport=self.chat.transport, summarizer=Summarizer(threshold_tokens=10, keep_turns=1))
+
+        async def json_reply(loads=None):
+            await chat.clear_chat()
+            return {"choices": [{"message": {"role": "assistant", "content": "Summary."}}]}
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json_reply
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        for index in range(3):
+            await chat.add_message("user", f"Question {index}")
+            await chat.add_message("assistant", f"Answer {index}")
+        self.assertFalse(await chat.summarize())
+        self.assertEqual(chat.messages, [chat.start_message])
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_get_response_summarizes_in_background(self, mock_post):
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "Reply."}}]}
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        chat = Chat(self.api_key, transport=self.chat.transport, summarizer=Summarizer(threshold_tokens=30, keep_turns=1))
+        for index in range(4):
+            await chat.get_response(f"Question number {index}")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual(chat.messages[1].role, "system")
+        self.assertLess(len(chat.messages), 9)
+        self.assertEqual(chat.messages[-1].content, "Reply.")
+
+    async def test_stream_response_uses_cache(self):
+        cache = MemoryResponseCache()
+        chat = Chat(self.api_key, cache=cache, transport=self.chat.transport)
+        await cache.set(chat.model, [chat.start_message, Message("Question")], "From cache.")
+        chunks = [chunk async for chunk in chat.stream_response("Question")]
+        self.assertEqual(chunks, ["From cache."])
+        self.assertEqual(chat.messages[-1].content, "From cache.")
+
+    async def test_close_owned_transport(self):
+        async with Chat(self.api_key) as chat:
+            await chat.transport.get_session()
+        self.assertTrue(chat.transport.closed)
+
+    async def test_close_shared_transport(self):
+        transport = Transport()
+        async with Chat(self.api_key, transport=transport) as chat:
+            await chat.transport.get_session()
+        self.assertFalse(transport.closed)
+        await transport.close()
@@ -1,9 +1,19 @@
 import asyncio
+import os
+import tempfile
 import unittest
 from unittest.mock import AsyncMock, patch
 
-from ai_chatbot_core.chat import Chat, StartMessage
+from ai_chatbot_core.chat import Chat, ResponseError, StartMessage
 from ai_chatbot_core.chat_maneger import ChatManager 
+from ai_chatbot_core.coalesce import RequestCoalescer
+from ai_chatbot_core.history import SlidingWindow
+from ai_chatbot_core.limiter import ConcurrencyLimiter
+from ai_chatbot_core.offload import Offloader
+from ai_chatbot_core.routing import ModelRouter
+from ai_chatbot_core.snapshot import SnapshotError, write_snapshot
+from ai_chatbot_core.storage import MemoryStorage
+from ai_chatbot_core.transport import Transport
 from ai_chatbot_core.types import Model
 
 
@@ -75,6 +85,265 @@ class TestChatManager(unittest.IsolatedAsyncioTestCase):
         chat = await manager._ChatManager__create_chat(user_id)
         self.assertEqual(chat.model, Model.DEEPSEEK_R1)
 
+    async def test_max_chats_evicts_idle_chat(self):
+        evicted = []
+        manager = ChatManager(self.api_key, max_chats=2, on_evict=evicted.append)
+        await manager.connect_chat(1)
+        await manager.connect_chat(2)
+        await manager.connect_chat(1)
+        await manager.connect_chat(3)
+        self.assertEqual(sorted(manager.chats), [1, 3])
+        self.assertEqual(evicted, [2])
+        self.assertEqual(manager.chats.hits, 1)
+        self.assertEqual(manager.chats.misses, 3)
+
+    async def test_evicted_chats_closed_and_awaited(self):
+        evicted = []
+
+        async def on_evict(chat):
+            await asyncio.sleep(0)
+            evicted.append(chat.user_id)
+
+        manager = ChatManager(self.api_key, max_chats=1, on_evict=on_evict)
+        with patch.object(Chat, "close", autospec=True) as close:
+            first = await manager.connect_chat(1)
+            await manager.connect_chat(2)
+        close.assert_called_once_with(first)
+        self.assertEqual(evicted, [1])
+
+    async def test_chat_with_turn_running_not_evicted(self):
+        manager = ChatManager(self.api_key, max_chats=1)
+        chat = await manager.connect_chat(1)
+        async with chat.get_lock():
+            self.assertTrue(chat.busy)
+            await manager.connect_chat(2)
+            self.assertIs(await manager.connect_chat(1), chat)
+        self.assertFalse(chat.busy)
+        await manager.connect_chat(3)
+        self.assertNotIn(1, manager.chats)
+
+    async def test_start_message_shared_between_chats(self):
+        chat1 = await self.manager.connect_chat(13)
+        chat2 = await self.manager.connect_chat(14)
+        self.assertIs(chat1.messages[0], chat2.messages[0])
+
+    async def test_history_policy_passed_to_chats(self):
+        policy = SlidingWindow(max_turns=3)
+        manager = ChatManager(self.api_key, history_policy=policy)
+        chat = await manager.connect_chat(12)
+        self.assertIs(chat.history_policy, policy)
+
+    async def test_coalescer_passed_to_chats(self):
+        coalescer = RequestCoalescer()
+        manager = ChatManager(self.api_key, coalescer=coalescer)
+        chat = await manager.connect_chat(12)
+        self.assertIs(chat.coalescer, coalescer)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_gather_responses(self, mock_post):
+        async def json(loads=None):
+            await asyncio.sleep(0.01)
+            return {"choices": [{"message": {"role": "assistant", "content": "Answer"}}]}
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        limiter = ConcurrencyLimiter()
+        async with ChatManager(self.api_key, limiter=limiter) as manager:
+            items = ((user_id, f"Question {user_id}") for user_id in range(20))
+            results = [result async for result in manager.gather_responses(items, concurrency=4)]
+            chat = await manager.get_chat(7)
+        self.assertEqual(sorted(result.user_id for result in results), list(range(20)))
+        self.assertTrue(all(result.ok and result.response == "Answer" for result in results))
+        self.assertEqual([m.content for m in chat.messages[1:]], ["Question 7", "Answer"])
+        self.assertEqual(mock_post.call_count, 20)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_gather_responses_bounds_concurrency(self, mock_post):
+        active = 0
+        peak = 0
+
+        async def json(loads=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"choices": [{"message": {"role": "assistant", "content": "Answer"}}]}
+
+        mock_response = AsyncMock()
+        mock_response.status = 200
+        mock_response.json.side_effect = json
+        mock_post.return_value.__aenter__.return_value = mock_response
+
+        async with ChatManager(self.api_key) as manager:
+            items = [(user_id, "Question") for user_id in range(12)]
+            results = [result async for result in manager.gather_responses(items, concurrency=3)]
+        self.assertEqual(len(results), 12)
+        self.assertEqual(peak, 3)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_gather_responses_reports_item_errors(self, mock_post):
+        def post(url, data=None, **kwargs):
+            response = AsyncMock()
+            response.status = 400 if b"bad" in data else 200
+            response.json.return_value = {"choices": [{"message": {"role": "assistant", "content": "Answer"}}]}
+            context = AsyncMock()
+            context.__aenter__.return_value = response
+            return context
+
+        mock_post.side_effect = post
+        async with ChatManager(self.api_key) as manager:
+            items = [(1, "good"), (2, "bad"), (3, "good")]
+            results = {result.user_id: result async for result in manager.gather_responses(items)}
+            chat = await manager.get_chat(2)
+        self.assertTrue(results[1].ok)
+        self.assertTrue(results[3].ok)
+        self.assertFalse(results[2].ok)
+        self.assertIsInstance(results[2].error, ResponseError)
+        self.assertIsNone(results[2].response)
+        self.assertEqual(len(chat.messages), 1)
+
+    async def test_gather_responses_keeps_order_per_user(self):
+        class SlowStorage(MemoryStorage):
+            delays = iter([0.05, 0.04, 0.03, 0.02, 0.01] * 10)
+
+            async def load(self, user_id):
+                await asyncio.sleep(next(self.delays, 0))
+                return await super().load(user_id)
+
+        async def get_response(chat, content):
+            await chat.add_message("user", content)
+            await asyncio.sleep(0.001)
+            await chat.add_message("assistant", f"r:{content}")
+            return f"r:{content}"
+
+        items = [(user_id, f"m{index}") for index in range(5) for user_id in (1, 2, 3)]
+        async with ChatManager(self.api_key, max_chats=1, storage=SlowStorage()) as manager:
+            with patch.object(Chat, "_get_response", autospec=True, side_effect=get_response):
+                results = [result async for result in manager.gather_responses(items, concurrency=6)]
+            for user_id in (1, 2, 3):
+                chat = await manager.get_chat(user_id)
+                self.assertEqual(
+                    [m.content for m in chat.messages[1:]],
+                    [content for index in range(5) for content in (f"m{index}", f"r:m{index}")],
+                )
+                self.assertEqual(
+                    [result.content for result in results if result.user_id == user_id],
+                    [f"m{index}" for index in range(5)],
+                )
+
+    async def test_gather_responses_stops_early(self):
+        started = []
+
+        async def get_response(content):
+            started.append(content)
+            await asyncio.sleep(0.01)
+            return "Answer"
+
+        async with ChatManager(self.api_key) as manager:
+            with patch.object(Chat, "_get_response", side_effect=get_response):
+                async for result in manager.gather_responses(((i, str(i)) for i in range(100)), concurrency=2):
+                    break
+        self.assertLess(len(started), 10)
+
+    async def test_offloader_passed_to_chats(self):
+        offloader = Offloader(threshold=1024)
+        manager = ChatManager(self.api_key, offloader=offloader)
+        chat = await manager.connect_chat(12)
+        self.assertIs(chat.offloader, offloader)
+
+    async def test_close_shuts_offloader_down(self):
+        offloader = Offloader(max_workers=1)
+        manager = ChatManager(self.api_key, offloader=offloader)
+        self.assertEqual(await offloader.run(sum, [1, 2]), 3)
+        self.assertFalse(offloader.closed)
+        await manager.close()
+        self.assertTrue(offloader.closed)
+
+    async def test_router_passed_to_chats(self):
+        router = ModelRouter([Model.QWEN2_5_1_5B_INSTRUCT, Model.DEEPSEEK_R1])
+        manager = ChatManager(self.api_key, router=router)
+        chat = await manager.connect_chat(12)
+        self.assertIs(chat.router, router)
+
+    async def test_snapshot_and_restore(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chats.snapshot")
+            for user_id in (1, 2):
+                chat = await self.manager.connect_chat(user_id)
+                await chat.add_message("user", f"Hi from {user_id}")
+                await chat.add_message("assistant", "Hello")
+            chat = await self.manager.connect_chat(3)
+            chat.model = Model.MICROSOFT_PHI_4
+            self.assertEqual(await self.manager.snapshot(path), 3)
+
+            manager = ChatManager(self.api_key, self.model, self.start_message, storage=MemoryStorage())
+            self.assertEqual(await manager.restore(path), 3)
+            self.assertEqual(list(manager.chats), [1, 2, 3])
+            for user_id in (1, 2, 3):
+                original = self.manager.chats[user_id]
+                restored = manager.chats[user_id]
+                self.assertEqual(
+                    [(m.role, m.content) for m in restored.messages],
+                    [(m.role, m.content) for m in original.messages],
+                )
+                self.assertEqual(restored.model, original.model)
+                self.assertIs(restored.transport, manager.transport)
+            shared = (await manager.connect_chat(4)).messages[0]
+            self.assertIs(manager.chats[1].messages[0], shared)
+            self.assertIs(manager.chats[1].start_message, shared)
+
+            manager.chats.clear()
+            chat = await manager.get_chat(2)
+            self.assertEqual(chat.messages[1].content, "Hi from 2")
+
+    async def test_restore_keeps_custom_prompts_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chats.snapshot")
+            prompt = StartMessage("Custom prompt")
+            write_snapshot(path, [(user_id, self.model.value, [prompt]) for user_id in (1, 2)])
+            self.manager.storage = MemoryStorage()
+            await self.manager.restore(path, save=False)
+            self.assertIs(self.manager.chats[1].messages[0], self.manager.chats[2].messages[0])
+            self.assertEqual(self.manager.chats[1].messages[0].content, "Custom prompt")
+            self.assertIsNone(await self.manager.storage.load(1))
+
+    async def test_restore_unknown_model(self):
+        await self.manager.connect_chat(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chats.snapshot")
+            write_snapshot(path, [(1, "no/such-model", [])])
+            with self.assertRaises(SnapshotError):
+                await self.manager.restore(path)
+        self.assertEqual(self.manager.chats[1].model, self.model)
+
+    async def test_limiter_installed_on_transport(self):
+        limiter = ConcurrencyLimiter(max_in_flight=5)
+        manager = ChatManager(self.api_key, limiter=limiter)
+        self.assertIs(manager.transport.limiter, limiter)
+
+    async def test_chats_share_transport(self):
+        chat1 = await self.manager.connect_chat(10)
+        chat2 = await self.manager.connect_chat(11)
+        self.assertIs(chat1.transport, self.manager.transport)
+        self.assertIs(chat2.transport, self.manager.transport)
+
+    async def test_context_manager_closes_transport(self):
+        async with ChatManager(self.api_key) as manager:
+            await manager.transport.get_session()
+            self.assertFalse(manager.transport.closed)
+        self.assertTrue(manager.transport.closed)
+
+    async def test_external_transport_not_closed(self):
+        transport = Transport()
+        async with ChatManager(self.api_key, transport=transport) as manager:
+            await manager.transport.get_session()
+        self.assertFalse(transport.closed)
+        await transport.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from ai_chatbot_core.chat import Chat
+from ai_chatbot_core.chat_store import ChatStore
+
+from helpers import FakeClock
+
+
+class TestChatStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.evicted = []
+
+    def make_store(self, max_chats=None, idle_ttl=None):
+        return ChatStore(max_chats, idle_ttl, self.evicted.append, clock=self.clock)
+
+    def test_mapping_interface(self):
+        store = self.make_store()
+        chat = Chat("key", user_id=1)
+        store[1] = chat
+        self.assertIn(1, store)
+        self.assertIs(store[1], chat)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(list(store), [1])
+        del store[1]
+        self.assertNotIn(1, store)
+        self.assertEqual(self.evicted, [])
+
+    def test_busy_chats_not_evicted(self):
+        class BusyChat(Chat):
+            busy = True
+
+        store = self.make_store(max_chats=1, idle_ttl=10)
+        busy = BusyChat("key", user_id=1)
+        store[1] = busy
+        store[2] = Chat("key", user_id=2)
+        self.assertEqual(sorted(store), [1, 2])
+        self.assertEqual(self.evicted, [])
+        self.clock.now = 20
+        self.assertIs(store.get(1), busy)
+        self.assertNotIn(2, store)
+        busy.busy = False
+        store[3] = Chat("key", user_id=3)
+        self.assertEqual(list(store), [3])
+        self.assertEqual(self.evicted, [2, busy])
+
+    def test_hits_and_misses(self):
+        store = self.make_store()
+        store[1] = Chat("key", user_id=1)
+        store.get(1)
+        store.get(2)
+        store.get(1)
+        self.assertEqual((store.hits, store.misses), (2, 1))
+
+    def test_capacity_evicts_least_recently_used(self):
+        store = self.make_store(max_chats=2)
+        store[1] = Chat("key", user_id=1)
+        store[2] = Chat("key", user_id=2)
+        store.get(1)
+        store[3] = Chat("key", user_id=3)
+        self.assertEqual(sorted(store), [1, 3])
+        self.assertEqual(self.evicted, [2])
+        self.assertEqual(store.evictions, 1)
+
+    def test_idle_ttl(self):
+        store = self.make_store(idle_ttl=10)
+        store[1] = Chat("key", user_id=1)
+        self.clock.now = 5
+        self.assertIsNotNone(store.get(1))
+        self.clock.now = 14
+        self.assertIsNotNone(store.get(1))
+        self.clock.now = 24
+        self.assertIsNone(store.get(1))
+        self.assertEqual(self.evicted, [1])
+        self.assertEqual(store.evictions, 1)
+
+    def test_evict_expired(self):
+        store = self.make_store(idle_ttl=10)
+        store[1] = Chat("key", user_id=1)
+        self.clock.now = 6
+        store[2] = Chat("key", user_id=2)
+        self.clock.now = 12
+        store.evict_expired()
+        self.assertEqual(list(store), [2])
+        self.clock.now = 20
+        store[3] = Chat("key", user_id=3)
+        self.assertEqual(list(store), [3])
+        self.assertEqual(self.evicted, [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+
+from ai_chatbot_core.coalesce import RequestCoalescer
+
+
+class TestRequestCoalescer(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_result(self):
+        coalescer = RequestCoalescer()
+        started = []
+
+        async def call():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(coalescer.run(b"key", call) for _ in range(5)))
+        self.assertEqual(results, ["result"] * 5)
+        self.assertEqual(len(started), 1)
+        self.assertEqual((coalescer.calls, coalescer.coalesced), (1, 4))
+        self.assertEqual(coalescer.in_flight, 0)
+
+    async def test_different_keys_run_separately(self):
+        coalescer = RequestCoalescer()
+
+        async def call(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(coalescer.run("a", lambda: call(1)), coalescer.run("b", lambda: call(2)))
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(coalescer.calls, 2)
+
+    async def test_sequential_calls_are_not_reused(self):
+        coalescer = RequestCoalescer()
+        values = iter([1, 2])
+
+        async def call():
+            return next(values)
+
+        self.assertEqual(await coalescer.run("key", call), 1)
+        self.assertEqual(await coalescer.run("key", call), 2)
+
+    async def test_exception_is_shared(self):
+        coalescer = RequestCoalescer()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(coalescer.run("key", call), coalescer.run("key", call), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(coalescer.in_flight, 0)
+
+    async def test_cancelled_caller_does_not_cancel_call(self):
+        coalescer = RequestCoalescer()
+
+        async def call():
+            await asyncio.sleep(0.02)
+            return "result"
+
+        first = asyncio.ensure_future(coalescer.run("key", call))
+        second = asyncio.ensure_future(coalescer.run("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, "result")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+from ai_chatbot_core.history import (
+    FullHistory,
+    SlidingWindow,
+    estimate_message_tokens,
+    estimate_tokens,
+)
+from ai_chatbot_core.types import Message, Model, StartMessage
+
+
+def make_history(turns, size=40):
+    messages = [StartMessage("System prompt")]
+    for turn in range(turns):
+        messages.append(Message(f"q{turn} " + "x" * size, "user"))
+        messages.append(Message(f"a{turn} " + "y" * size, "assistant"))
+    return messages
+
+
+class TestEstimateTokens(unittest.TestCase):
+    def test_ascii(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcd"), 1)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+
+    def test_non_ascii_counts_bytes(self):
+        self.assertEqual(estimate_tokens("привіт"), 3)
+
+    def test_message_overhead(self):
+        self.assertEqual(estimate_message_tokens(Message("abcd")), 5)
+
+
+class TestHistoryPolicies(unittest.TestCase):
+    def test_full_history(self):
+        messages = make_history(5)
+        selected = FullHistory().select(messages, Model.DEEPSEEK_R1)
+        self.assertEqual(selected, messages)
+        self.assertIsNot(selected, messages)
+
+    def test_sliding_window_fits_everything(self):
+        messages = make_history(5)
+        self.assertEqual(SlidingWindow().select(messages, Model.DEEPSEEK_R1), messages)
+
+    def test_sliding_window_token_budget(self):
+        messages = make_history(50)
+        budget = 200
+        selected = SlidingWindow(max_tokens=budget).select(messages, Model.DEEPSEEK_R1)
+        self.assertIs(selected[0], messages[0])
+        self.assertIs(selected[-1], messages[-1])
+        self.assertLess(len(selected), len(messages))
+        self.assertLessEqual(sum(map(estimate_message_tokens, selected)), budget)
+        self.assertEqual(selected[1:], messages[len(messages) - len(selected) + 1:])
+
+    def test_sliding_window_max_turns(self):
+        messages = make_history(10)
+        messages.append(Message("latest question"))
+        selected = SlidingWindow(max_turns=2).select(messages, Model.DEEPSEEK_R1)
+        self.assertEqual(selected, [messages[0]] + messages[-3:])
+
+    def test_sliding_window_always_keeps_latest(self):
+        messages = [StartMessage(), Message("z" * 1000)]
+        selected = SlidingWindow(max_tokens=10).select(messages, Model.DEEPSEEK_R1)
+        self.assertEqual(selected, messages)
+
+    def test_sliding_window_uses_model_context_limit(self):
+        policy = SlidingWindow(reserve_tokens=1000)
+        self.assertEqual(policy.get_budget(Model.ACE_MATH_7B_INSTRUCT), 3096)
+        self.assertEqual(policy.get_budget(Model.DEEPSEEK_R1), 127000)
+
+    def test_sliding_window_without_start_message(self):
+        messages = make_history(3)[1:]
+        selected = SlidingWindow(max_turns=1).select(messages, Model.DEEPSEEK_R1)
+        self.assertEqual(selected, messages[-2:])
+
+    def test_empty_history(self):
+        self.assertEqual(SlidingWindow().select([], Model.DEEPSEEK_R1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
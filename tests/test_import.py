@@ -0,0 +1,63 @@
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+
+import ai_chatbot_core
+from ai_chatbot_core import chat, chat_maneger, retry, transport
+
+# Upper bound for a cold `from ai_chatbot_core import ChatManager`, in
+# seconds. Most of it is asyncio; aiohttp alone used to add ~0.3 s.
+# Wall-clock budgets are flaky on shared machines, so the check only runs
+# when CHECK_IMPORT_TIME is set.
+IMPORT_BUDGET = 0.3
+
+MEASURE = """
+import sys, time
+started = time.perf_counter()
+from ai_chatbot_core import ChatManager
+elapsed = time.perf_counter() - started
+print(elapsed, "aiohttp" in sys.modules)
+"""
+
+
+def measure_import() -> tuple[float, bool]:
+    """Imports ChatManager in a fresh interpreter; returns the time and whether aiohttp was loaded."""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE], capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_lazy_attributes(self):
+        self.assertIs(ai_chatbot_core.Chat, chat.Chat)
+        self.assertIs(ai_chatbot_core.ChatManager, chat_maneger.ChatManager)
+        self.assertIs(ai_chatbot_core.Transport, transport.Transport)
+        self.assertIn("ChatManager", dir(ai_chatbot_core))
+
+    def test_submodules(self):
+        self.assertIs(ai_chatbot_core.retry, retry)
+        self.assertEqual(ai_chatbot_core.types.Model.DEEPSEEK_R1.value, "deepseek-ai/DeepSeek-R1")
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            ai_chatbot_core.missing
+        self.assertFalse(hasattr(ai_chatbot_core, "__wrapped__"))
+
+    def test_retry_errors_still_exported(self):
+        self.assertIn(asyncio.TimeoutError, retry.RETRY_ERRORS)
+
+    def test_aiohttp_not_loaded(self):
+        _, aiohttp_loaded = measure_import()
+        self.assertFalse(aiohttp_loaded)
+
+    @unittest.skipUnless(os.environ.get("CHECK_IMPORT_TIME"), "set CHECK_IMPORT_TIME to check the import time")
+    def test_import_time(self):
+        elapsed, _ = min(measure_import() for _ in range(3))
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from ai_chatbot_core.limiter import ConcurrencyLimiter
+from ai_chatbot_core.types import Model
+
+
+class TestConcurrencyLimiter(unittest.IsolatedAsyncioTestCase):
+    async def run_requests(self, limiter, models):
+        peak = {"all": 0}
+        active = {"all": 0}
+
+        async def request(model):
+            async with limiter.acquire(model):
+                active["all"] += 1
+                active[model] = active.get(model, 0) + 1
+                peak["all"] = max(peak["all"], active["all"])
+                peak[model] = max(peak.get(model, 0), active[model])
+                await asyncio.sleep(0.01)
+                active["all"] -= 1
+                active[model] -= 1
+
+        await asyncio.gather(*(request(model) for model in models))
+        return peak
+
+    async def test_global_limit(self):
+        limiter = ConcurrencyLimiter(max_in_flight=3)
+        peak = await self.run_requests(limiter, [Model.DEEPSEEK_R1] * 10)
+        self.assertEqual(peak["all"], 3)
+        self.assertEqual(limiter.acquired, 10)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.waiting, 0)
+        self.assertGreater(limiter.max_wait, 0)
+        self.assertGreater(limiter.average_wait, 0)
+
+    async def test_per_model_limit(self):
+        limiter = ConcurrencyLimiter(per_model={Model.DEEPSEEK_R1: 1})
+        models = [Model.DEEPSEEK_R1] * 4 + [Model.QWEN_QWQ_32B] * 4
+        peak = await self.run_requests(limiter, models)
+        self.assertEqual(peak[Model.DEEPSEEK_R1], 1)
+        self.assertEqual(peak[Model.QWEN_QWQ_32B], 4)
+
+    async def test_queue_depth(self):
+        limiter = ConcurrencyLimiter(max_in_flight=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.acquire():
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold()) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.in_flight, 1)
+        self.assertEqual(limiter.waiting, 2)
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(limiter.waiting, 0)
+
+    async def test_cancelled_waiter_releases_nothing(self):
+        limiter = ConcurrencyLimiter(max_in_flight=1, per_model={Model.DEEPSEEK_R1: 1})
+        async with limiter.acquire(Model.DEEPSEEK_R1):
+            task = asyncio.create_task(limiter.acquire(Model.QWEN_QWQ_32B).__aenter__())
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(limiter.waiting, 0)
+        async with limiter.acquire(Model.DEEPSEEK_R1):
+            self.assertEqual(limiter.in_flight, 1)
+
+    async def test_unlimited(self):
+        limiter = ConcurrencyLimiter()
+        peak = await self.run_requests(limiter, [Model.DEEPSEEK_R1] * 5)
+        self.assertEqual(peak["all"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
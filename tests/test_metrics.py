@@ -0,0 +1,114 @@
+import unittest
+
+from ai_chatbot_core.metrics import Counter, Histogram, Instrumentation, MetricsRegistry, RequestEvent
+from ai_chatbot_core.types import Model
+
+
+def make_event(**fields):
+    event = RequestEvent(Model.DEEPSEEK_R1)
+    event.attempts = 1
+    event.status = 200
+    event.ttfb = 0.2
+    event.latency = 0.5
+    event.request_bytes = 100
+    for name, value in fields.items():
+        setattr(event, name, value)
+    return event
+
+
+class TestCounter(unittest.TestCase):
+    def test_inc_and_expose(self):
+        counter = Counter("requests_total", "Requests.", ("model",))
+        counter.inc(model="a")
+        counter.inc(2, model="a")
+        counter.inc(model='b"x')
+        self.assertEqual(counter.get(model="a"), 3)
+        self.assertEqual(counter.expose(), [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{model="a"} 3',
+            'requests_total{model="b\\"x"} 1',
+        ])
+
+    def test_without_labels(self):
+        counter = Counter("total", "Total.")
+        counter.inc(0.5)
+        self.assertEqual(counter.expose()[-1], "total 0.5")
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe_and_expose(self):
+        histogram = Histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, model="a")
+        histogram.observe(0.1, model="a")
+        histogram.observe(5, model="a")
+        self.assertEqual(histogram.get_count(model="a"), 3)
+        self.assertAlmostEqual(histogram.get_sum(model="a"), 5.15)
+        self.assertEqual(histogram.expose()[2:], [
+            'latency_seconds_bucket{model="a",le="0.1"} 2',
+            'latency_seconds_bucket{model="a",le="1"} 2',
+            'latency_seconds_bucket{model="a",le="+Inf"} 3',
+            'latency_seconds_sum{model="a"} 5.15',
+            'latency_seconds_count{model="a"} 3',
+        ])
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_metrics_are_shared_by_name(self):
+        registry = MetricsRegistry()
+        self.assertIs(registry.counter("a", "A."), registry.counter("a", "A."))
+
+    def test_expose(self):
+        registry = MetricsRegistry()
+        registry.counter("b_total", "B.").inc()
+        registry.histogram("a_seconds", "A.", buckets=(1.0,)).observe(0.5)
+        text = registry.expose()
+        self.assertTrue(text.endswith("\n"))
+        self.assertLess(text.index("a_seconds"), text.index("b_total"))
+        self.assertIn("b_total 1\n", text)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_records_event(self):
+        registry = MetricsRegistry()
+        instrumentation = Instrumentation(registry)
+        instrumentation.emit(make_event(prompt_tokens=10, completion_tokens=5, think_chars=7, response_bytes=300))
+        instrumentation.emit(make_event(attempts=3, status=503))
+        instrumentation.emit(make_event(error="TimeoutError", status=None, ttfb=None))
+        model = Model.DEEPSEEK_R1.value
+        self.assertEqual(registry.counter("ai_chatbot_requests_total", "").get(model=model, status="200"), 1)
+        self.assertEqual(registry.counter("ai_chatbot_requests_total", "").get(model=model, status="TimeoutError"), 1)
+        self.assertEqual(registry.counter("ai_chatbot_request_errors_total", "").get(model=model), 2)
+        self.assertEqual(registry.counter("ai_chatbot_retries_total", "").get(model=model), 2)
+        self.assertEqual(registry.counter("ai_chatbot_prompt_tokens_total", "").get(model=model), 10)
+        self.assertEqual(registry.counter("ai_chatbot_completion_tokens_total", "").get(model=model), 5)
+        self.assertEqual(registry.counter("ai_chatbot_think_chars_total", "").get(model=model), 7)
+        self.assertEqual(registry.counter("ai_chatbot_request_bytes_total", "").get(model=model), 300)
+        self.assertEqual(registry.counter("ai_chatbot_response_bytes_total", "").get(model=model), 300)
+        self.assertEqual(registry.histogram("ai_chatbot_ttfb_seconds", "").get_count(model=model), 2)
+        self.assertEqual(registry.histogram("ai_chatbot_latency_seconds", "").get_count(model=model), 3)
+        self.assertIn('ai_chatbot_requests_total{model="deepseek-ai/DeepSeek-R1",status="200"} 1', registry.expose())
+
+    def test_hooks(self):
+        events = []
+        instrumentation = Instrumentation(hooks=[events.append])
+
+        def failing(event):
+            raise RuntimeError("boom")
+
+        instrumentation.add_hook(failing)
+        event = make_event()
+        with self.assertLogs("agent", level="ERROR"):
+            instrumentation.emit(event)
+        self.assertEqual(events, [event])
+
+    def test_unknown_model(self):
+        registry = MetricsRegistry()
+        event = make_event()
+        event.model = None
+        Instrumentation(registry).emit(event)
+        self.assertEqual(registry.counter("ai_chatbot_requests_total", "").get(model="unknown", status="200"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
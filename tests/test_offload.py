@@ -0,0 +1,41 @@
+import json
+import threading
+import unittest
+
+from ai_chatbot_core.chat import parse_completion
+from ai_chatbot_core.offload import PROCESSES, Offloader
+
+
+class TestOffloader(unittest.IsolatedAsyncioTestCase):
+    def test_should_offload(self):
+        offloader = Offloader(threshold=100)
+        self.assertFalse(offloader.should_offload(99))
+        self.assertTrue(offloader.should_offload(100))
+
+    def test_unknown_pool(self):
+        with self.assertRaises(ValueError):
+            Offloader(pool="fibers")
+
+    async def test_runs_in_thread(self):
+        offloader = Offloader(max_workers=1)
+        try:
+            name = await offloader.run(lambda: threading.current_thread().name)
+        finally:
+            await offloader.close()
+        self.assertTrue(name.startswith("offload"))
+        self.assertEqual(offloader.offloaded, 1)
+
+    async def test_runs_in_process(self):
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": "<think>hm</think> Hi"}}],
+        }).encode()
+        offloader = Offloader(max_workers=1, pool=PROCESSES)
+        try:
+            result = await offloader.run(parse_completion, body, True)
+        finally:
+            await offloader.close()
+        self.assertEqual(result, ("assistant", "Hi", None, 2, ["hm"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
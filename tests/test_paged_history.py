@@ -0,0 +1,182 @@
+import os
+import tempfile
+import unittest
+
+from ai_chatbot_core.history import SlidingWindow
+from ai_chatbot_core.paged_history import HistoryFile, PagedHistory
+from ai_chatbot_core.types import Message, Model, StartMessage
+
+
+class PagedHistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = HistoryFile(os.path.join(self.directory.name, "1"))
+        self.messages = [StartMessage("Prompt")] + [
+            Message(f'Message {i}\nwith "quotes"', "user" if i % 2 == 0 else "assistant") for i in range(30)
+        ]
+        self.file.write("model", self.messages)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def contents(self, messages):
+        return [(m.role, m.content) for m in messages]
+
+
+class TestHistoryFile(PagedHistoryTestCase):
+    def test_read(self):
+        self.assertEqual(len(self.file), 31)
+        self.assertEqual(self.file.read_model(), "model")
+        self.assertEqual(self.contents(self.file.read(0, 31)), self.contents(self.messages))
+        self.assertEqual(self.contents(self.file.read(5, 8)), self.contents(self.messages[5:8]))
+        self.assertEqual(self.file.read(30, 40)[0].content, self.messages[30].content)
+        self.assertEqual(self.file.read(31, 40), [])
+        self.assertIsInstance(self.file.read(0, 1)[0], StartMessage)
+
+    def test_append_and_remove_last(self):
+        self.file.append([Message("a"), Message("b")])
+        self.assertEqual(len(self.file), 33)
+        self.assertEqual(self.file.read(31, 33)[1].content, "b")
+        self.file.remove_last(3)
+        self.assertEqual(len(self.file), 30)
+        self.assertEqual(self.contents(self.file.read(0, 30)), self.contents(self.messages[:30]))
+        self.file.append([Message("c")])
+        self.assertEqual(self.file.read(30, 31)[0].content, "c")
+
+    def test_delete(self):
+        self.file.delete()
+        self.assertFalse(self.file.exists())
+        self.assertEqual(len(self.file), 0)
+        self.file.delete()
+
+
+class TestPagedHistory(PagedHistoryTestCase):
+    def test_only_ends_resident(self):
+        history = PagedHistory(self.file, tail_size=5, page_size=4, max_pages=2)
+        self.assertEqual(len(history), 31)
+        self.assertEqual(history.resident, 6)
+        self.assertEqual(history[-1].content, self.messages[-1].content)
+        self.assertEqual(self.contents(history[26:]), self.contents(self.messages[26:]))
+        self.assertEqual(history.page_loads, 0)
+
+    def test_pages_loaded_on_demand(self):
+        history = PagedHistory(self.file, tail_size=5, page_size=4, max_pages=2)
+        self.assertEqual(history[1].content, self.messages[1].content)
+        self.assertEqual(history[3].content, self.messages[3].content)
+        self.assertEqual(history.page_loads, 1)
+        self.assertEqual(self.contents(history), self.contents(self.messages))
+        self.assertEqual(self.contents(history[::-1]), self.contents(self.messages[::-1]))
+        self.assertLessEqual(history.resident, 6 + 8)
+        with self.assertRaises(IndexError):
+            history[31]
+
+    def test_window_read_once(self):
+        self.file.write("model", [StartMessage("Prompt")] + [
+            Message(f"Message {i}", "user" if i % 2 == 0 else "assistant") for i in range(400)
+        ])
+        history = PagedHistory(self.file, tail_size=4, page_size=8, max_pages=2)
+        policy = SlidingWindow(max_tokens=600)
+        window = policy.select(history, Model.DEEPSEEK_R1)
+        self.assertGreater(len(window), 50)
+        self.assertEqual(self.contents(window), self.contents(policy.select(list(history), Model.DEEPSEEK_R1)))
+        loads = history.page_loads
+        for turn in range(3):
+            history.append(Message(f"Question {turn}"))
+            history.append(Message(f"Answer {turn}", "assistant"))
+            window = policy.select(history, Model.DEEPSEEK_R1)
+            self.assertEqual(window[-1].content, f"Answer {turn}")
+            self.assertEqual(history.page_loads, loads)
+        self.assertLessEqual(history.resident, len(window) + 6 + 2 * 8)
+        self.assertEqual(self.contents(history[1:3]), [("user", "Message 0"), ("assistant", "Message 1")])
+
+    def test_spill(self):
+        history = PagedHistory(self.file, tail_size=4, page_size=4, max_pages=2)
+        self.assertEqual(self.contents(history[10:]), self.contents(self.messages[10:]))
+        self.assertEqual(history.resident, 22)
+        history.spill()
+        self.assertEqual(history.resident, 22)
+        self.contents(history[25:])
+        history.spill()
+        self.assertEqual(history.resident, 8)
+        for _ in range(10):
+            message = Message("new")
+            history.append(message)
+            self.file.append([message])
+        history.spill()
+        self.assertEqual(history.resident, 1 + 17)
+        history[-4:]
+        history.spill()
+        self.assertEqual(history.resident, 1 + 5)
+        self.assertEqual(self.contents(history[:31]), self.contents(self.messages))
+        self.assertEqual(history[-1].content, "new")
+
+    def test_spill_after_materialize(self):
+        history = PagedHistory(self.file, tail_size=2, page_size=4)
+        history.insert(3, Message("inserted"))
+        self.file.write("model", list(history))
+        history.spill()
+        self.assertEqual(history.resident, 3)
+        self.assertEqual(history[0].content, "Prompt")
+        self.assertEqual(history[3].content, "inserted")
+        self.assertEqual(len(history), 32)
+
+    def test_append_pop_and_set_head(self):
+        history = PagedHistory(self.file, tail_size=2)
+        start = StartMessage("Prompt")
+        history[0] = start
+        self.assertIs(history[0], start)
+        history.append(Message("new"))
+        self.assertEqual(history[-1].content, "new")
+        self.assertEqual(history.pop().content, "new")
+        self.assertEqual(len(history), 31)
+
+    def test_pop_into_paged_range(self):
+        history = PagedHistory(self.file, tail_size=1)
+        history.pop()
+        history.pop()
+        self.assertEqual(len(history), 29)
+        self.assertEqual(history[-1].content, self.messages[28].content)
+        history.append(Message("new"))
+        self.assertEqual(history[29].content, "new")
+        self.assertEqual(history[28].content, self.messages[28].content)
+
+    def test_changes_in_paged_range_materialize(self):
+        history = PagedHistory(self.file, tail_size=2, page_size=4)
+        history.insert(3, Message("inserted"))
+        del history[1]
+        history[2] = Message("replaced")
+        expected = list(self.messages)
+        expected.insert(3, Message("inserted"))
+        del expected[1]
+        expected[2] = Message("replaced")
+        self.assertEqual(self.contents(history), self.contents(expected))
+        self.assertEqual(history.resident, 31)
+
+    def test_freeze(self):
+        history = PagedHistory(self.file, tail_size=5, page_size=4, max_pages=2)
+        frozen = history.freeze()
+        history.append(Message("new"))
+        history[-2] = Message("replaced")
+        self.assertEqual(len(frozen), 31)
+        self.assertEqual(self.contents(frozen), self.contents(self.messages))
+        self.assertEqual(self.contents(frozen[3:6]), self.contents(self.messages[3:6]))
+        self.assertIsInstance(frozen[0], StartMessage)
+        self.assertEqual(frozen[-1].content, self.messages[-1].content)
+        self.assertEqual((history.page_loads, history.resident), (0, 7))
+
+    def test_clear(self):
+        history = PagedHistory(self.file, tail_size=2)
+        history.clear()
+        self.assertEqual(len(history), 0)
+        history.append(StartMessage("New"))
+        self.assertEqual(history, [history[0]])
+
+    def test_empty(self):
+        self.file.write("model", [])
+        history = PagedHistory(self.file)
+        self.assertEqual(len(history), 0)
+        self.assertEqual(list(history), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from ai_chatbot_core.rate_limit import RateLimit, RateLimiter, TokenBucket
+from ai_chatbot_core.types import Model
+
+from helpers import FakeClock
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=2, clock=clock)
+        self.assertEqual(bucket.reserve(1), 0)
+        self.assertEqual(bucket.reserve(1), 0)
+        self.assertEqual(bucket.reserve(1), 1)
+        self.assertEqual(bucket.reserve(1), 2)
+
+    def test_refill_capped_at_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=2, clock=clock)
+        bucket.reserve(2)
+        clock.now = 100
+        self.assertEqual(bucket.reserve(2), 0)
+        self.assertEqual(bucket.reserve(1), 1)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_request_quota(self):
+        limiter = RateLimiter(RateLimit(requests_per_minute=2), clock=self.clock)
+        self.assertEqual(limiter.reserve("key", Model.DEEPSEEK_R1), 0)
+        self.assertEqual(limiter.reserve("key", Model.DEEPSEEK_R1), 0)
+        self.assertEqual(limiter.reserve("key", Model.DEEPSEEK_R1), 30)
+
+    def test_token_quota(self):
+        limiter = RateLimiter(RateLimit(tokens_per_minute=600), clock=self.clock)
+        self.assertEqual(limiter.reserve("key", Model.DEEPSEEK_R1, tokens=600), 0)
+        self.assertEqual(limiter.reserve("key", Model.DEEPSEEK_R1, tokens=100), 10)
+
+    def test_keyed_by_api_key_and_model(self):
+        limiter = RateLimiter(RateLimit(requests_per_minute=1), clock=self.clock)
+        self.assertEqual(limiter.reserve("key1", Model.DEEPSEEK_R1), 0)
+        self.assertEqual(limiter.reserve("key2", Model.DEEPSEEK_R1), 0)
+        self.assertEqual(limiter.reserve("key1", Model.QWEN_QWQ_32B), 0)
+        self.assertGreater(limiter.reserve("key1", Model.DEEPSEEK_R1), 0)
+
+    def test_per_model_overrides_default(self):
+        limiter = RateLimiter(
+            RateLimit(requests_per_minute=1),
+            per_model={Model.QWEN2_5_1_5B_INSTRUCT: RateLimit(requests_per_minute=600)},
+            clock=self.clock,
+        )
+        for _ in range(10):
+            self.assertEqual(limiter.reserve("key", Model.QWEN2_5_1_5B_INSTRUCT), 0)
+
+    def test_unlimited(self):
+        limiter = RateLimiter(clock=self.clock)
+        for _ in range(100):
+            self.assertEqual(limiter.reserve("key", Model.DEEPSEEK_R1, tokens=10**6), 0)
+
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_acquire_sleeps(self, mock_sleep):
+        limiter = RateLimiter(RateLimit(requests_per_minute=1), clock=self.clock)
+        await limiter.acquire("key", Model.DEEPSEEK_R1)
+        mock_sleep.assert_not_called()
+        await limiter.acquire("key", Model.DEEPSEEK_R1)
+        mock_sleep.assert_awaited_once_with(60)
+        self.assertEqual(limiter.waits, 1)
+        self.assertEqual(limiter.total_wait, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+
+from ai_chatbot_core.retry import RetryPolicy, parse_retry_after
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+
+    def test_http_date(self):
+        date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(date), 30, delta=2)
+
+    def test_past_date(self):
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after(""))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_retryable_statuses(self):
+        policy = RetryPolicy()
+        for status in (408, 429, 502, 503, 504):
+            self.assertTrue(policy.is_retryable(status=status))
+        for status in (200, 400, 401, 404, 500):
+            self.assertFalse(policy.is_retryable(status=status))
+
+    def test_retryable_errors(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(error=aiohttp.ClientConnectionError()))
+        self.assertTrue(policy.is_retryable(error=asyncio.TimeoutError()))
+        self.assertFalse(policy.is_retryable(error=aiohttp.ClientPayloadError()))
+        self.assertFalse(policy.is_retryable(error=ValueError()))
+
+    def test_exponential_delay_without_jitter(self):
+        policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=5, jitter=False)
+        self.assertEqual([policy.get_delay(attempt) for attempt in range(1, 6)], [1, 2, 4, 5, None])
+
+    def test_jitter_within_bounds(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=1, max_delay=8)
+        for _ in range(100):
+            self.assertTrue(0 <= policy.get_delay(3) <= 4)
+
+    def test_retry_after(self):
+        policy = RetryPolicy(max_delay=10)
+        self.assertEqual(policy.get_delay(1, retry_after=3), 3)
+        self.assertIsNone(policy.get_delay(1, retry_after=60))
+
+    def test_single_attempt(self):
+        self.assertIsNone(RetryPolicy(max_attempts=1).get_delay(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from ai_chatbot_core.metrics import RequestEvent
+from ai_chatbot_core.routing import ModelRouter, ModelStats, Route
+from ai_chatbot_core.types import Model
+
+from helpers import FakeClock
+
+FAST = Model.QWEN2_5_1_5B_INSTRUCT
+LARGE = Model.DEEPSEEK_R1
+
+
+def make_event(model, status=200, ttfb=0.1, error=None):
+    event = RequestEvent(model)
+    event.status = status
+    event.ttfb = ttfb
+    event.latency = ttfb
+    event.error = error
+    return event
+
+
+class TestRoute(unittest.TestCase):
+    def test_accepts(self):
+        route = Route(FAST, max_tokens=100)
+        self.assertTrue(route.accepts(100))
+        self.assertFalse(route.accepts(101))
+        self.assertFalse(Route(FAST).accepts(FAST.context_limit + 1))
+
+
+class TestModelStats(unittest.TestCase):
+    def test_rolling_averages(self):
+        stats = ModelStats()
+        stats.record(True, 1.0, 0.5, now=1.0)
+        stats.record(False, 3.0, 0.5, now=2.0)
+        self.assertEqual((stats.requests, stats.errors), (2, 1))
+        self.assertEqual(stats.latency, 2.0)
+        self.assertEqual(stats.error_rate, 0.5)
+        self.assertEqual(stats.updated, 2.0)
+
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.router = ModelRouter([Route(FAST, max_tokens=100), LARGE], clock=self.clock)
+
+    def test_requires_routes(self):
+        with self.assertRaises(ValueError):
+            ModelRouter([])
+
+    def test_select_by_size(self):
+        self.assertEqual(self.router.select(50), [FAST, LARGE])
+        self.assertEqual(self.router.select(500), [LARGE])
+
+    def test_select_without_matching_route(self):
+        router = ModelRouter([Route(FAST, max_tokens=10)])
+        self.assertEqual(router.select(500), [FAST])
+
+    def test_failing_model_demoted(self):
+        for _ in range(5):
+            self.router.observe(make_event(FAST, status=500))
+        self.assertFalse(self.router.is_healthy(FAST))
+        self.assertEqual(self.router.select(50), [LARGE, FAST])
+        self.assertEqual(self.router.get_stats(FAST).errors, 5)
+
+    def test_slow_model_demoted(self):
+        router = ModelRouter([FAST, LARGE], max_latency=1.0, clock=self.clock)
+        router.observe(make_event(FAST, ttfb=5.0))
+        router.observe(make_event(LARGE, ttfb=0.5))
+        self.assertEqual(router.select(10), [LARGE, FAST])
+
+    def test_stale_stats_ignored(self):
+        for _ in range(5):
+            self.router.observe(make_event(FAST, status=500))
+        self.clock.now += 61
+        self.assertTrue(self.router.is_healthy(FAST))
+        self.assertEqual(self.router.select(50), [FAST, LARGE])
+
+    def test_abandoned_requests_ignored(self):
+        self.router.observe(make_event(FAST, status=None, error="CancelledError"))
+        self.assertEqual(self.router.get_stats(FAST).requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import json
+import unittest
+
+from ai_chatbot_core import serialization
+
+
+class TestSerialization(unittest.TestCase):
+    def test_dumps_is_compact_bytes(self):
+        data = serialization.dumps({"role": "user", "content": "Привіт"})
+        self.assertIsInstance(data, bytes)
+        self.assertNotIn(b" ", data)
+        self.assertEqual(json.loads(data), {"role": "user", "content": "Привіт"})
+
+    def test_round_trip(self):
+        obj = {"choices": [{"message": {"content": "a\nb", "role": "assistant"}}]}
+        self.assertEqual(serialization.loads(serialization.dumps(obj)), obj)
+        self.assertEqual(serialization.loads(json.dumps(obj)), obj)
+
+    def test_backend(self):
+        self.assertIn(serialization.BACKEND, ("json", "orjson"))
+
+
+if __name__ == "__main__":
+    unittest.main()
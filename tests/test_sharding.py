@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import unittest
+from collections import Counter
+
+from ai_chatbot_core.backends import Backend, BackendPool
+from ai_chatbot_core.chat_maneger import ChatManager
+from ai_chatbot_core.sharding import ShardedChatManager, ShardError, shard_for
+from benchmarks.mock_server import MockConfig, MockServer
+
+
+class TestShardFor(unittest.TestCase):
+    def test_range_and_stability(self):
+        for user_id in range(-50, 50):
+            shard = shard_for(user_id, 4)
+            self.assertTrue(0 <= shard < 4)
+            self.assertEqual(shard_for(user_id, 4), shard)
+        self.assertEqual(shard_for(123, 1), 0)
+
+    def test_balanced(self):
+        counts = Counter(shard_for(user_id, 4) for user_id in range(10000))
+        for shard in range(4):
+            self.assertGreater(counts[shard], 2000)
+
+    def test_growing_moves_few_users(self):
+        moved = sum(shard_for(user_id, 4) != shard_for(user_id, 5) for user_id in range(10000))
+        self.assertLess(moved, 3000)
+        for user_id in range(10000):
+            if shard_for(user_id, 4) != shard_for(user_id, 5):
+                self.assertEqual(shard_for(user_id, 5), 4)
+
+
+class TestShardedChatManager(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(MockConfig(latency=0.01, completion_tokens=3))
+        cls.server.start()
+        cls.factory = functools.partial(
+            ChatManager,
+            "test_api_key",
+            backends=BackendPool([Backend("mock", url=cls.server.url)]),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def test_responses_in_order_per_user(self):
+        async with ShardedChatManager(self.factory, shards=2) as manager:
+            self.assertTrue(manager.running)
+            responses = await asyncio.gather(*(
+                manager.get_response(user_id, f"Question {turn}")
+                for turn in range(3)
+                for user_id in range(6)
+            ))
+            self.assertEqual(set(responses), {"word word word"})
+            for user_id in range(6):
+                messages = await manager.get_messages(user_id)
+                self.assertEqual(
+                    [message["content"] for message in messages[1::2]],
+                    ["Question 0", "Question 1", "Question 2"],
+                )
+                self.assertEqual([message["role"] for message in messages[2::2]], ["assistant"] * 3)
+        self.assertFalse(manager.running)
+
+    async def test_stream_response(self):
+        async with ShardedChatManager(self.factory, shards=2) as manager:
+            chunks = [chunk async for chunk in manager.stream_response(1, "Hi")]
+            self.assertEqual("".join(chunks).strip(), "word word word")
+            self.assertEqual(len(await manager.get_messages(1)), 3)
+
+    async def test_clear_and_remove_chat(self):
+        async with ShardedChatManager(self.factory, shards=1) as manager:
+            await manager.get_response(1, "Hi")
+            await manager.clear_chat(1)
+            self.assertEqual(len(await manager.get_messages(1)), 1)
+            await manager.remove_chat(1)
+            self.assertEqual(await manager.get_messages(1), [])
+
+    async def test_not_running(self):
+        manager = ShardedChatManager(self.factory, shards=1)
+        with self.assertRaises(ShardError):
+            await manager.get_response(1, "Hi")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import os
+import tempfile
+import unittest
+
+from ai_chatbot_core.snapshot import (
+    MAGIC,
+    SnapshotError,
+    SnapshotWriter,
+    encode_varint,
+    read_snapshot,
+    write_snapshot,
+)
+from ai_chatbot_core.types import Message, StartMessage
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "chats.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def contents(self, messages):
+        return [(m.role, m.content) for m in messages]
+
+    def test_encode_varint(self):
+        self.assertEqual(encode_varint(0), b"\x00")
+        self.assertEqual(encode_varint(127), b"\x7f")
+        self.assertEqual(encode_varint(128), b"\x80\x01")
+        self.assertEqual(encode_varint(300), b"\xac\x02")
+
+    def test_round_trip(self):
+        prompt = StartMessage("Prompt")
+        chats = [
+            (1, "model-a", [prompt, Message("Hi"), Message("Hello, ünïcode ✓", "assistant")]),
+            (-7, "model-b", [prompt, Message("x" * 1000), Message("Note", "system")]),
+            (2 ** 40, "model-a", []),
+        ]
+        self.assertEqual(write_snapshot(self.path, chats), (3, 6))
+        restored = list(read_snapshot(self.path))
+        self.assertEqual(
+            [(user_id, model, self.contents(messages)) for user_id, model, messages in restored],
+            [(user_id, model, self.contents(messages)) for user_id, model, messages in chats],
+        )
+
+    def test_system_prompts_shared(self):
+        chats = [(user_id, "model", [StartMessage("Prompt"), Message("Hi")]) for user_id in range(3)]
+        write_snapshot(self.path, chats)
+        restored = list(read_snapshot(self.path))
+        self.assertIsInstance(restored[0][2][0], StartMessage)
+        self.assertIs(restored[0][2][0], restored[2][2][0])
+        self.assertIsNot(restored[0][2][1], restored[2][2][1])
+
+    def test_repeated_strings_written_once(self):
+        prompt = "A long system prompt. " * 50
+        chats = [(user_id, "model", [StartMessage(prompt), Message("Hi")]) for user_id in range(100)]
+        write_snapshot(self.path, chats)
+        self.assertLess(os.path.getsize(self.path), len(prompt) + 100 * 16)
+
+    def test_writer_streams_chats(self):
+        file = io.BytesIO()
+        writer = SnapshotWriter(file)
+        self.assertEqual(file.getvalue()[:len(MAGIC)], MAGIC)
+        writer.write_chat(1, "model", [Message("Hi")])
+        size = len(file.getvalue())
+        writer.write_chat(2, "model", [Message("Hi")])
+        self.assertGreater(len(file.getvalue()), size)
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as file:
+            file.write(b"{}\n")
+        with self.assertRaises(SnapshotError):
+            list(read_snapshot(self.path))
+
+    def test_unknown_version(self):
+        with open(self.path, "wb") as file:
+            file.write(MAGIC + b"\x63\x00")
+        with self.assertRaisesRegex(SnapshotError, "version"):
+            list(read_snapshot(self.path))
+
+    def test_truncated(self):
+        write_snapshot(self.path, [(1, "model", [Message("Hello world")])])
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 4)
+        with self.assertRaises(SnapshotError):
+            list(read_snapshot(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
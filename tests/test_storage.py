@@ -0,0 +1,300 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from ai_chatbot_core.chat import Chat
+from ai_chatbot_core.chat_maneger import ChatManager
+from ai_chatbot_core.history import SlidingWindow
+from ai_chatbot_core.paged_history import PagedHistory
+from ai_chatbot_core.snapshot import read_snapshot
+from ai_chatbot_core.storage import JSONLStorage, MemoryStorage, SQLiteStorage
+from ai_chatbot_core.types import Message, Model, StartMessage
+
+
+class StorageTests:
+    async def test_load_missing(self):
+        self.assertIsNone(await self.storage.load(1))
+
+    async def test_save_and_load(self):
+        await self.storage.save(1, Model.QWEN_QWQ_32B, [StartMessage("Prompt"), Message("Hi")])
+        model, messages = await self.storage.load(1)
+        self.assertEqual(model, Model.QWEN_QWQ_32B)
+        self.assertIsInstance(messages[0], StartMessage)
+        self.assertEqual([m.get_content() for m in messages], [
+            {"role": "system", "content": "Prompt"},
+            {"role": "user", "content": "Hi"},
+        ])
+
+    async def test_append(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage()])
+        await self.storage.append(1, [Message("Question")])
+        await self.storage.append(1, [Message("Answer", "assistant")])
+        _, messages = await self.storage.load(1)
+        self.assertEqual([m.content for m in messages[1:]], ["Question", "Answer"])
+
+    async def test_remove_last(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage(), Message("Keep"), Message("Drop")])
+        await self.storage.remove_last(1)
+        _, messages = await self.storage.load(1)
+        self.assertEqual([m.content for m in messages[1:]], ["Keep"])
+
+    async def test_save_replaces(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage(), Message("Old")])
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage()])
+        _, messages = await self.storage.load(1)
+        self.assertEqual(len(messages), 1)
+
+    async def test_delete(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage()])
+        await self.storage.delete(1)
+        self.assertIsNone(await self.storage.load(1))
+
+
+class TestMemoryStorage(StorageTests, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.storage = MemoryStorage()
+
+
+class TestSQLiteStorage(StorageTests, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "chats.db")
+        self.storage = SQLiteStorage(self.path)
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+        self.directory.cleanup()
+
+    async def test_wal_mode(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage()])
+        await self.storage.flush()
+        with open(self.path + "-wal", "rb"):
+            pass
+
+    async def test_shared_between_instances(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage(), Message("Hi")])
+        await self.storage.flush()
+        other = SQLiteStorage(self.path)
+        _, messages = await other.load(1)
+        await other.close()
+        self.assertEqual(messages[1].content, "Hi")
+
+    async def test_writes_are_batched(self):
+        storage = SQLiteStorage(self.path, batch_size=4, flush_interval=60)
+        await storage.save(1, Model.DEEPSEEK_R1, [StartMessage()])
+        other = SQLiteStorage(self.path)
+        self.assertIsNone(await other.load(1))
+        await storage.append(1, [Message("Hi")])
+        _, messages = await other.load(1)
+        self.assertEqual(len(messages), 2)
+        await other.close()
+        await storage.close()
+
+
+class TestJSONLStorage(StorageTests, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = JSONLStorage(self.directory.name, tail_size=4, page_size=8)
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+        self.directory.cleanup()
+
+    async def test_load_is_paged(self):
+        messages = [StartMessage("Prompt")] + [Message(f"Message {i}") for i in range(100)]
+        await self.storage.save(1, Model.DEEPSEEK_R1, messages)
+        _, history = await self.storage.load(1)
+        self.assertIsInstance(history, PagedHistory)
+        self.assertEqual(history.resident, 5)
+        self.assertEqual(history[-1].content, "Message 99")
+        self.assertEqual(history.page_loads, 0)
+        self.assertEqual(history[10].content, "Message 9")
+        self.assertEqual(history.page_loads, 1)
+        self.assertEqual([m.content for m in history], [m.content for m in messages])
+
+    async def test_appends_after_paged_load(self):
+        await self.storage.save(1, Model.DEEPSEEK_R1, [StartMessage()] + [Message(str(i)) for i in range(20)])
+        _, history = await self.storage.load(1)
+        history.append(Message("new"))
+        await self.storage.append(1, [history[-1]])
+        _, reloaded = await self.storage.load(1)
+        self.assertEqual(len(reloaded), 22)
+        self.assertEqual(reloaded[-1].content, "new")
+        self.assertEqual(reloaded[5].content, "4")
+
+
+class TestChatManagerStorage(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "chats.db")
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_history_survives_restart(self):
+        storage = SQLiteStorage(self.path)
+        async with ChatManager("key", start_message="Prompt", storage=storage) as manager:
+            chat = await manager.connect_chat(1)
+            await chat.add_message("user", "Hello")
+            await chat.add_message("assistant", "Hi there")
+        await storage.close()
+
+        storage = SQLiteStorage(self.path)
+        async with ChatManager("key", start_message="Prompt", storage=storage) as manager:
+            self.assertEqual(len(manager.chats), 0)
+            chat = await manager.connect_chat(1)
+            self.assertEqual([m.content for m in chat.messages], ["Prompt", "Hello", "Hi there"])
+            other = await manager.connect_chat(2)
+            self.assertIs(chat.messages[0], other.messages[0])
+        await storage.close()
+
+    async def test_concurrent_connect_shares_one_chat(self):
+        storage = SQLiteStorage(self.path)
+        async with ChatManager("key", start_message="Prompt", storage=storage) as manager:
+            first, second = await asyncio.gather(manager.connect_chat(7), manager.connect_chat(7))
+            self.assertIs(first, second)
+            self.assertIs(manager.chats[7], first)
+            await first.add_message("user", "Hello")
+            manager.chats.clear()
+            loaded = await asyncio.gather(manager.get_chat(7), manager.connect_chat(7), manager.get_chat(7))
+            self.assertIs(loaded[0], loaded[1])
+            self.assertIs(loaded[1], loaded[2])
+        await storage.close()
+
+        storage = SQLiteStorage(self.path)
+        _, messages = await storage.load(7)
+        self.assertEqual([m.content for m in messages], ["Prompt", "Hello"])
+        await storage.close()
+
+    async def test_evicted_chat_reloaded(self):
+        manager = ChatManager("key", max_chats=1, storage=MemoryStorage())
+        chat = await manager.connect_chat(1)
+        await chat.add_message("user", "Remember me")
+        await manager.connect_chat(2)
+        self.assertNotIn(1, manager.chats)
+        chat = await manager.connect_chat(1)
+        self.assertEqual(chat.messages[-1].content, "Remember me")
+        self.assertIs(chat.storage, manager.storage)
+
+    async def test_turns_serialized_across_eviction(self):
+        async def request(chat, data, model, sink=None):
+            await asyncio.sleep(0.05 if b"first" in data else 0)
+            return "assistant", "re:" + chat.messages[-1].content
+
+        manager = ChatManager("key", max_chats=1, storage=MemoryStorage())
+        with patch.object(Chat, "_request", autospec=True, side_effect=request):
+            chat = await manager.connect_chat(1)
+            first = asyncio.ensure_future(chat.get_response("first"))
+            await asyncio.sleep(0)
+            await manager.connect_chat(2)
+            reloaded = await manager.connect_chat(1)
+            self.assertIs(reloaded.get_lock(), chat.get_lock())
+            self.assertEqual(await reloaded.get_response("second"), "re:second")
+            self.assertEqual(await first, "re:first")
+        expected = ["first", "re:first", "second", "re:second"]
+        _, stored = await manager.storage.load(1)
+        self.assertEqual([m.content for m in stored[1:]], expected)
+        self.assertEqual([m.content for m in reloaded.messages[1:]], expected)
+
+    async def test_evicted_chat_freed_without_storage(self):
+        evicted = []
+        manager = ChatManager("key", max_chats=1, on_evict=evicted.append)
+        chat = await manager.connect_chat(1)
+        await chat.add_message("user", "Forget me")
+        await manager.connect_chat(2)
+        self.assertEqual(evicted, [chat])
+        self.assertIsNone(manager.storage)
+        self.assertIsNone(await manager.get_chat(1))
+        self.assertEqual(len((await manager.connect_chat(1)).messages), 1)
+
+    async def test_remove_chat_deletes_from_storage(self):
+        manager = ChatManager("key", storage=MemoryStorage())
+        await manager.connect_chat(1)
+        await manager.remove_chat(1)
+        self.assertIsNone(await manager.storage.load(1))
+        self.assertIsNone(await manager.get_chat(1))
+
+    async def test_clear_chat_saved(self):
+        manager = ChatManager("key", max_chats=1, storage=MemoryStorage())
+        chat = await manager.connect_chat(1)
+        await chat.add_message("user", "Forget me")
+        await chat.clear_chat()
+        await manager.connect_chat(2)
+        chat = await manager.connect_chat(1)
+        self.assertEqual(len(chat.messages), 1)
+
+
+    async def test_loaded_history_spills_after_flush(self):
+        storage = JSONLStorage(self.directory.name, tail_size=10, page_size=50)
+        await storage.save(1, Model.DEEPSEEK_R1, [StartMessage("Prompt")] + [
+            Message(f"Message {index}", "user" if index % 2 == 0 else "assistant") for index in range(1000)
+        ])
+        policy = SlidingWindow(max_turns=10)
+        async with ChatManager("key", start_message="Prompt", storage=storage, history_policy=policy) as manager:
+            chat = await manager.connect_chat(1)
+            await chat.get_messages()
+            loads = chat.messages.page_loads
+            for turn in range(50):
+                window = await chat.get_messages()
+                await chat.add_message("user", f"Question {turn}")
+                await chat.add_message("assistant", f"Answer {turn}")
+                await storage.flush()
+                self.assertLessEqual(chat.messages.resident, 1 + len(window) + 3)
+            self.assertEqual(chat.messages.page_loads, loads)
+            self.assertEqual(len(chat.messages), 1101)
+            self.assertEqual(chat.messages[500].content, "Message 499")
+        await storage.close()
+
+    async def test_long_history_loaded_lazily(self):
+        storage = JSONLStorage(self.directory.name, tail_size=10, page_size=50)
+        async with ChatManager("key", start_message="Prompt", storage=storage) as manager:
+            chat = await manager.connect_chat(1)
+            for index in range(1000):
+                await chat.add_message("user" if index % 2 == 0 else "assistant", f"Message {index}")
+        await storage.close()
+
+        storage = JSONLStorage(self.directory.name, tail_size=10, page_size=50)
+        policy = SlidingWindow(max_turns=2)
+        async with ChatManager("key", start_message="Prompt", storage=storage, history_policy=policy) as manager:
+            chat = await manager.connect_chat(1)
+            self.assertEqual(len(chat.messages), 1001)
+            self.assertLessEqual(chat.messages.resident, 11)
+            self.assertIs(chat.messages[0], (await manager.connect_chat(2)).messages[0])
+            selected = await chat.get_messages()
+            self.assertEqual([m["content"] for m in selected], ["Prompt", "Message 996", "Message 997", "Message 998", "Message 999"])
+            self.assertEqual(chat.messages.page_loads, 0)
+            await chat.add_message("user", "Message 1000")
+            await chat._remove_last_message()
+            await chat.add_message("user", "Message 1000b")
+        await storage.close()
+
+        storage = JSONLStorage(self.directory.name)
+        _, history = await storage.load(1)
+        self.assertEqual(len(history), 1002)
+        self.assertEqual(history[-1].content, "Message 1000b")
+        await storage.close()
+
+    async def test_snapshot_reads_paged_history_from_file(self):
+        storage = JSONLStorage(self.directory.name, tail_size=10, page_size=50)
+        async with ChatManager("key", start_message="Prompt", storage=storage) as manager:
+            chat = await manager.connect_chat(1)
+            for index in range(500):
+                await chat.add_message("user", f"Message {index}")
+        await storage.close()
+
+        storage = JSONLStorage(self.directory.name, tail_size=10, page_size=50)
+        path = os.path.join(self.directory.name, "chats.snapshot")
+        async with ChatManager("key", start_message="Prompt", storage=storage) as manager:
+            chat = await manager.connect_chat(1)
+            self.assertEqual(await manager.snapshot(path), 1)
+            self.assertEqual((chat.messages.page_loads, chat.messages.resident), (0, 11))
+        await storage.close()
+        [(user_id, _, messages)] = list(read_snapshot(path))
+        self.assertEqual(user_id, 1)
+        self.assertEqual([m.content for m in messages], ["Prompt"] + [f"Message {index}" for index in range(500)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import unittest
+
+from ai_chatbot_core.summary import SUMMARY_PREFIX, Summarizer
+from ai_chatbot_core.types import Message, Model, StartMessage
+
+
+def history(turns, size=100):
+    messages = [StartMessage("Prompt")]
+    for index in range(turns):
+        messages.append(Message(f"Question {index} " + "x" * size))
+        messages.append(Message(f"Answer {index} " + "y" * size, "assistant"))
+    return messages
+
+
+class TestSummarizer(unittest.TestCase):
+    def test_below_threshold(self):
+        self.assertEqual(Summarizer(threshold_tokens=10000).get_cut(history(5)), 0)
+
+    def test_cut_keeps_recent_turns(self):
+        messages = history(6)
+        cut = Summarizer(threshold_tokens=100, keep_turns=2).get_cut(messages)
+        self.assertEqual(cut, 9)
+        self.assertEqual(messages[cut].content.split()[:2], ["Question", "4"])
+
+    def test_too_short_to_summarize(self):
+        self.assertEqual(Summarizer(threshold_tokens=10, keep_turns=2).get_cut(history(2)), 0)
+        self.assertEqual(Summarizer(threshold_tokens=10, keep_turns=2).get_cut(history(3)), 3)
+
+    def test_payload(self):
+        summarizer = Summarizer(model=Model.MICROSOFT_PHI_4, prompt="Summarize.")
+        messages = history(2, size=0)[1:]
+        payload = json.loads(summarizer.get_payload(messages, Model.DEEPSEEK_R1))
+        self.assertEqual(payload["model"], Model.MICROSOFT_PHI_4.value)
+        self.assertEqual(payload["messages"][0], {"role": "system", "content": "Summarize."})
+        self.assertIn("user: Question 0", payload["messages"][1]["content"])
+        self.assertIn("assistant: Answer 1", payload["messages"][1]["content"])
+
+    def test_payload_uses_chat_model_by_default(self):
+        payload = json.loads(Summarizer().get_payload(history(1)[1:], Model.DEEPSEEK_R1))
+        self.assertEqual(payload["model"], Model.DEEPSEEK_R1.value)
+
+    def test_message(self):
+        message = Summarizer.get_message("They talked.")
+        self.assertEqual(message.role, "system")
+        self.assertEqual(message.content, SUMMARY_PREFIX + "They talked.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from ai_chatbot_core.think import ThinkFilter
+
+
+def run_filter(chunks):
+    think_filter = ThinkFilter()
+    text = "".join(think_filter.feed(chunk) for chunk in chunks)
+    return text + think_filter.flush()
+
+
+class TestThinkFilter(unittest.TestCase):
+    def test_no_think(self):
+        self.assertEqual(run_filter(["Hello ", "world"]), "Hello world")
+
+    def test_single_chunk(self):
+        self.assertEqual(run_filter(["a <think>hidden</think> b"]), "a  b")
+
+    def test_tags_split_across_chunks(self):
+        chunks = ["a <th", "ink>hid", "den</thi", "nk> b"]
+        self.assertEqual(run_filter(chunks), "a  b")
+
+    def test_character_by_character(self):
+        text = "<think>x\ny</think>answer <think>z</think>!"
+        self.assertEqual(run_filter(list(text)), "answer !")
+
+    def test_partial_tag_that_is_not_a_tag(self):
+        self.assertEqual(run_filter(["a <thi", "s is text"]), "a <this is text")
+        self.assertEqual(run_filter(["x <"]), "x <")
+
+    def test_holds_back_only_partial_tag(self):
+        think_filter = ThinkFilter()
+        self.assertEqual(think_filter.feed("answer <thi"), "answer ")
+        self.assertEqual(think_filter.feed("nk>"), "")
+        self.assertTrue(think_filter.inside)
+
+    def test_unterminated_think(self):
+        self.assertEqual(run_filter(["answer <think>never ", "closed"]), "answer ")
+
+    def test_unterminated_think_with_partial_close_tag(self):
+        self.assertEqual(run_filter(["<think>abc</thi"]), "")
+
+    def test_sink_receives_think_content(self):
+        pieces = []
+        think_filter = ThinkFilter(pieces.append)
+        chunks = ["a<think>one ", "two</th", "ink>b<think>three"]
+        visible = "".join(think_filter.feed(chunk) for chunk in chunks) + think_filter.flush()
+        self.assertEqual(visible, "ab")
+        self.assertEqual("".join(pieces), "one twothree")
+        self.assertEqual(think_filter.think_chars, len("one twothree"))
+
+    def test_sink_gets_held_back_text_that_was_not_a_tag(self):
+        pieces = []
+        think_filter = ThinkFilter(pieces.append)
+        think_filter.feed("<think>x</th")
+        think_filter.feed("ing</think>")
+        self.assertEqual("".join(pieces), "x</thing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+
+from ai_chatbot_core.backends import Backend, BackendPool
+from ai_chatbot_core.limiter import ConcurrencyLimiter
+from ai_chatbot_core.metrics import Instrumentation, RequestEvent
+from ai_chatbot_core.rate_limit import RateLimit, RateLimiter
+from ai_chatbot_core.retry import RetryPolicy
+from ai_chatbot_core.transport import Transport
+
+
+def make_response(status, headers=None):
+    response = AsyncMock()
+    response.status = status
+    response.headers = headers or {}
+    response.content_length = None
+    return response
+
+
+class TestTransport(unittest.IsolatedAsyncioTestCase):
+    async def test_session_created_lazily(self):
+        transport = Transport()
+        self.assertTrue(transport.closed)
+        session = await transport.get_session()
+        self.assertIsInstance(session, aiohttp.ClientSession)
+        self.assertFalse(transport.closed)
+        await transport.close()
+
+    async def test_session_reused(self):
+        async with Transport() as transport:
+            session1 = await transport.get_session()
+            session2 = await transport.get_session()
+            self.assertIs(session1, session2)
+
+    async def test_connector_settings(self):
+        async with Transport(limit=10, limit_per_host=4) as transport:
+            session = await transport.get_session()
+            self.assertEqual(session.connector.limit, 10)
+            self.assertEqual(session.connector.limit_per_host, 4)
+
+    async def test_close(self):
+        transport = Transport()
+        session = await transport.get_session()
+        await transport.close()
+        self.assertTrue(session.closed)
+        self.assertTrue(transport.closed)
+
+    async def test_reopen_after_close(self):
+        transport = Transport()
+        session1 = await transport.get_session()
+        await transport.close()
+        session2 = await transport.get_session()
+        self.assertIsNot(session1, session2)
+        await transport.close()
+
+
+
+class TestTransportRequest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.transport = Transport(retry=RetryPolicy(max_attempts=3, base_delay=0))
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+
+    async def request_status(self):
+        async with self.transport.request("http://test", "key", b"{}") as response:
+            return response.status
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_retries_retryable_status(self, mock_post):
+        mock_post.return_value.__aenter__.side_effect = [make_response(503), make_response(429), make_response(200)]
+        self.assertEqual(await self.request_status(), 200)
+        self.assertEqual(mock_post.call_count, 3)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_gives_up_after_max_attempts(self, mock_post):
+        mock_post.return_value.__aenter__.return_value = make_response(502)
+        self.assertEqual(await self.request_status(), 502)
+        self.assertEqual(mock_post.call_count, 3)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_does_not_retry_other_statuses(self, mock_post):
+        mock_post.return_value.__aenter__.return_value = make_response(400)
+        self.assertEqual(await self.request_status(), 400)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_instrumentation_records_attempts(self, mock_post):
+        events = []
+        self.transport.instrumentation = Instrumentation(hooks=[events.append])
+        response = make_response(200)
+        response.content_length = 42
+        mock_post.return_value.__aenter__.side_effect = [make_response(503), response]
+        event = RequestEvent()
+        async with self.transport.request("http://test", "key", b"{}", event=event):
+            pass
+        self.assertEqual(events, [event])
+        self.assertEqual((event.attempts, event.retries, event.status), (2, 1, 200))
+        self.assertEqual((event.request_bytes, event.response_bytes), (2, 42))
+        self.assertTrue(event.ok)
+        self.assertLessEqual(event.ttfb, event.latency)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_ttfb_excludes_waits(self, mock_post):
+        async def acquire(*args):
+            await asyncio.sleep(0.05)
+
+        self.transport.retry = RetryPolicy(max_attempts=2, base_delay=0.05, jitter=False)
+        self.transport.rate_limiter = RateLimiter(RateLimit(requests_per_minute=100))
+        mock_post.return_value.__aenter__.side_effect = [make_response(503), make_response(200)]
+        event = RequestEvent()
+        with patch.object(self.transport.rate_limiter, "acquire", side_effect=acquire):
+            async with self.transport.request("http://test", "key", b"{}", event=event):
+                pass
+        self.assertGreaterEqual(event.queue_wait, 0.1)
+        self.assertEqual(event.backoff_wait, 0.05)
+        self.assertLess(event.ttfb, 0.05)
+        self.assertGreaterEqual(event.latency, event.queue_wait + event.backoff_wait)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_instrumentation_records_errors(self, mock_post):
+        events = []
+        self.transport.instrumentation = Instrumentation(hooks=[events.append])
+        mock_post.return_value.__aenter__.side_effect = aiohttp.ClientConnectionError()
+        with self.assertRaises(aiohttp.ClientConnectionError):
+            await self.request_status()
+        self.assertEqual(events[0].error, "ClientConnectionError")
+        self.assertEqual(events[0].attempts, 3)
+        self.assertFalse(events[0].ok)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_retries_connection_errors(self, mock_post):
+        mock_post.return_value.__aenter__.side_effect = [aiohttp.ClientConnectionError(), make_response(200)]
+        self.assertEqual(await self.request_status(), 200)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_raises_last_error(self, mock_post):
+        mock_post.return_value.__aenter__.side_effect = aiohttp.ClientConnectionError()
+        with self.assertRaises(aiohttp.ClientConnectionError):
+            await self.request_status()
+        self.assertEqual(mock_post.call_count, 3)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_honors_retry_after(self, mock_post):
+        mock_post.return_value.__aenter__.side_effect = [
+            make_response(429, {"Retry-After": "120"}),
+            make_response(200),
+        ]
+        self.assertEqual(await self.request_status(), 429)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_timeout_passed_to_request(self, mock_post):
+        mock_post.return_value.__aenter__.return_value = make_response(200)
+        self.transport.timeout = aiohttp.ClientTimeout(total=5)
+        await self.request_status()
+        self.assertEqual(mock_post.call_args.kwargs["timeout"].total, 5)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_limiter_slot_released_between_attempts(self, mock_post):
+        limiter = ConcurrencyLimiter(max_in_flight=1)
+        self.transport.limiter = limiter
+        mock_post.return_value.__aenter__.side_effect = [make_response(503), make_response(200)]
+        async with self.transport.request("http://test", "key", b"{}"):
+            self.assertEqual(limiter.in_flight, 1)
+        self.assertEqual(limiter.acquired, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_rate_limiter_checked_per_attempt(self, mock_post):
+        rate_limiter = RateLimiter(RateLimit(requests_per_minute=100))
+        self.transport.rate_limiter = rate_limiter
+        mock_post.return_value.__aenter__.side_effect = [make_response(503), make_response(200)]
+        with patch.object(rate_limiter, "acquire", wraps=rate_limiter.acquire) as acquire:
+            await self.request_status()
+        self.assertEqual(acquire.call_count, 2)
+        acquire.assert_called_with("key", None, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_authorization_header(self, mock_post):
+        mock_post.return_value.__aenter__.return_value = make_response(200)
+        await self.request_status()
+        self.assertEqual(mock_post.call_args.kwargs["headers"]["Authorization"], "Bearer key")
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_backend_failover(self, mock_post):
+        a = Backend("key-a", "http://a")
+        b = Backend("key-b", "http://b")
+        self.transport.backends = BackendPool([a, b])
+        self.transport.retry = RetryPolicy(max_attempts=3, base_delay=60)
+        mock_post.return_value.__aenter__.side_effect = [make_response(429, {"Retry-After": "30"}), make_response(200)]
+        self.assertEqual(await self.request_status(), 200)
+        urls = [call.args[0] for call in mock_post.call_args_list]
+        self.assertEqual(urls, ["http://a", "http://b"])
+        self.assertEqual(mock_post.call_args.kwargs["headers"]["Authorization"], "Bearer key-b")
+        self.assertFalse(self.transport.backends.is_available(a))
+        self.assertEqual((a.in_flight, b.in_flight), (0, 0))
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_backend_failover_on_backend_errors(self, mock_post):
+        for status in (401, 403, 500):
+            a = Backend("key-a", "http://a")
+            b = Backend("key-b", "http://b")
+            self.transport.backends = BackendPool([a, b])
+            mock_post.reset_mock()
+            mock_post.return_value.__aenter__.side_effect = [make_response(status), make_response(200)]
+            self.assertEqual(await self.request_status(), 200)
+            self.assertEqual([call.args[0] for call in mock_post.call_args_list], ["http://a", "http://b"])
+            self.assertEqual(a.errors, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_backend_errors_returned_without_alternative(self, mock_post):
+        a = Backend("key-a", "http://a")
+        self.transport.backends = BackendPool([a])
+        mock_post.return_value.__aenter__.side_effect = [make_response(401), make_response(200)]
+        self.assertEqual(await self.request_status(), 401)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch('aiohttp.ClientSession.post')
+    async def test_backend_in_flight_tracked(self, mock_post):
+        a = Backend("key-a", "http://a")
+        self.transport.backends = BackendPool([a])
+        mock_post.return_value.__aenter__.return_value = make_response(200)
+        async with self.transport.request("http://ignored", "ignored", b"{}"):
+            self.assertEqual(a.in_flight, 1)
+        self.assertEqual((a.in_flight, a.requests), (0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import json
 import unittest
-from ai_chatbot_core.types import Message, StartMessage
+from ai_chatbot_core.types import CONTEXT_LIMITS, DEFAULT_CONTEXT_LIMIT, Message, Model, StartMessage
 
 class TestTypes(unittest.TestCase):
     def test_message_creation(self):
@@ -17,6 +18,26 @@ class TestTypes(unittest.TestCase):
         expected_repr = {"role": "system", "content": "Test message"}
         self.assertEqual(message.get_content(), expected_repr)
 
+    def test_message_to_json(self):
+        message = Message("Hi \"there\"", role="assistant")
+        self.assertEqual(json.loads(message.to_json()), message.get_content())
+        self.assertIs(message.to_json(), message.to_json())
+
+    def test_message_to_json_invalidated_on_change(self):
+        message = Message("Before")
+        message.to_json()
+        message.content = "After"
+        message.role = "assistant"
+        self.assertEqual(json.loads(message.to_json()), {"role": "assistant", "content": "After"})
+
+    def test_message_has_no_instance_dict(self):
+        self.assertFalse(hasattr(Message("Hi"), "__dict__"))
+        self.assertFalse(hasattr(StartMessage(), "__dict__"))
+
+    def test_message_role_interned(self):
+        role = "".join(["assi", "stant"])
+        self.assertIs(Message("a", role).role, Message("b", "assistant").role)
+
     def test_start_message_creation(self):
         start_message = StartMessage(content=None)
         self.assertEqual(start_message.content, "You are a helpful assistant.")
@@ -26,6 +47,12 @@ class TestTypes(unittest.TestCase):
         start_message = StartMessage("You are a coding assistant.")
         self.assertEqual(start_message.content, "You are a coding assistant.")
         self.assertEqual(start_message.role, "system")
-        
+
+    def test_every_model_has_context_limit(self):
+        for model in Model:
+            self.assertIn(model, CONTEXT_LIMITS)
+            self.assertGreater(model.context_limit, 0)
+        self.assertGreater(DEFAULT_CONTEXT_LIMIT, 0)
+
 if __name__ == '__main__':
     unittest.main()